@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+
+from apps.cards import resolver
+from apps.cards.models import ABOUT_RENDERED_FIELDS, Card
+
+
+class Command(BaseCommand):
+    help = "Preenche o HTML sanitizado do \"Sobre\" (Card.about_html) a partir do Markdown, em lotes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Cartões atualizados por lote")
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Confere todos os cartões com Markdown (padrão: apenas os ainda sem hash); "
+            "use depois de mudar ABOUT_RENDER_VERSION",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options["batch_size"])
+        base = Card.objects.exclude(Q(about_markdown__isnull=True) | Q(about_markdown=""))
+        if not options["all"]:
+            base = base.filter(about_markdown_hash="")
+
+        updated = 0
+        last_pk = None
+        while True:
+            # Keyset over the pk, as cards leave the "missing" filter while we walk
+            batch = base.order_by("pk").only("pk", "nickname", "about_markdown", *ABOUT_RENDERED_FIELDS)
+            if last_pk is not None:
+                batch = batch.filter(pk__gt=last_pk)
+            cards = list(batch[:batch_size])
+            if not cards:
+                break
+            changed = [card for card in cards if card.render_about()]
+            for card in changed:
+                # Cached public pages hold the old HTML
+                card.content_rev = F("content_rev") + 1
+            # bulk_update skips Card.save() and its signals: one UPDATE per batch
+            Card.objects.bulk_update(changed, [*ABOUT_RENDERED_FIELDS, "content_rev"])
+            # ...so drop the resolver entries, which carry the old revision
+            resolver.invalidate(*(card.nickname for card in changed))
+            updated += len(changed)
+            last_pk = cards[-1].pk
+            self.stdout.write(f"{updated} cartões atualizados…")
+
+        self.stdout.write(self.style.SUCCESS(f"HTML do \"Sobre\" preenchido em {updated} cartões."))
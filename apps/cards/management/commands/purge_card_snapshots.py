@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from apps.cards import snapshots
+
+
+class Command(BaseCommand):
+    help = (
+        "Remove os snapshots estáticos das páginas públicas (CARD_SNAPSHOT_ROOT). Sem argumentos, "
+        "remove só os obsoletos: cartão apagado, despublicado, renomeado ou com revisão mais nova."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("nicknames", nargs="*", help="Apelidos cujos snapshots serão removidos")
+        parser.add_argument("--all", action="store_true", help="Remove todos os snapshots")
+
+    def handle(self, *args, **options):
+        removed = snapshots.purge(options["nicknames"] or None, everything=options["all"])
+        self.stdout.write(self.style.SUCCESS(f"{removed} snapshots removidos de {snapshots.snapshot_root()}."))
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import hashlib
 from functools import lru_cache
 
 import bleach
@@ -8,6 +9,8 @@ from markdown_it import MarkdownIt
 
 MAX_MARKDOWN_CHARS = 20_000
 MAX_HTML_CHARS = 100_000
+# Bump when the rendering/sanitizing rules change; `backfill_about_html --all` re-renders
+ABOUT_RENDER_VERSION = 1
 
 ALLOWED_TAGS = [
     "a",
@@ -101,3 +104,11 @@ def sanitize_about_markdown(raw_markdown: str) -> str:
 def has_about_content(raw_markdown: str | None) -> bool:
     return bool((raw_markdown or "").strip())
 
+
+
+def about_markdown_hash(raw_markdown: str | None) -> str:
+    """Hash of the source a stored ``Card.about_html`` was rendered from ("" when empty)."""
+    text = (raw_markdown or "").strip()
+    if not text:
+        return ""
+    return hashlib.sha256(f"{ABOUT_RENDER_VERSION}:{text}".encode()).hexdigest()
@@ -0,0 +1,17 @@
+# Generated manually: revision counter for the public page cache
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cards", "0013_card_about_markdown"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="card",
+            name="content_rev",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
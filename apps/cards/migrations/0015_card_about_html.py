@@ -0,0 +1,22 @@
+# Generated manually: stored sanitized "Sobre" HTML (filled by `manage.py backfill_about_html`)
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cards", "0014_card_content_rev"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="card",
+            name="about_html",
+            field=models.TextField(blank=True, default="", editable=False),
+        ),
+        migrations.AddField(
+            model_name="card",
+            name="about_markdown_hash",
+            field=models.CharField(blank=True, default="", editable=False, max_length=64),
+        ),
+    ]
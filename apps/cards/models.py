@@ -5,6 +5,19 @@ from django.db import models
 from django.utils import timezone
 from django.db.models.functions import Lower
 from apps.common.models import BaseModel
+from .markdown import about_markdown_hash, has_about_content, sanitize_about_markdown
+
+ABOUT_RENDERED_FIELDS = ("about_html", "about_markdown_hash")
+# Card fields the public page shows or is served by; saving only other fields keeps content_rev
+PUBLIC_FIELDS = frozenset({
+    "title", "description", "about_markdown", *ABOUT_RENDERED_FIELDS,
+    "avatar", "avatar_w64", "avatar_w128", "avatar_rev",
+    "nickname", "status", "mode", "deactivation_marked", "tabs_order",
+})
+
+
+def touches_public_fields(update_fields) -> bool:
+    return update_fields is None or not PUBLIC_FIELDS.isdisjoint(update_fields)
 
 
 class Card(BaseModel):
@@ -23,6 +36,9 @@ class Card(BaseModel):
     title = models.CharField(max_length=120)
     description = models.TextField(blank=True)
     about_markdown = models.TextField(blank=True, null=True, default="")
+    # Sanitized HTML of about_markdown, rendered on save; the hash says which source it came from
+    about_html = models.TextField(blank=True, default="", editable=False)
+    about_markdown_hash = models.CharField(max_length=64, blank=True, default="", editable=False)
     # Processed avatar files (original JPEG + thumbs)
     avatar = models.ImageField(upload_to="uploads/cards/avatars/", max_length=255, blank=True, null=True)
     avatar_w64 = models.ImageField(upload_to="uploads/cards/avatars/", max_length=255, blank=True, null=True)
@@ -45,6 +61,8 @@ class Card(BaseModel):
     tabs_order = models.CharField(max_length=64, default="links,gallery,services")
     # Número para notificações (telefone E.164 opcional)
     notification_phone = models.CharField(max_length=20, blank=True, null=True)
+    # Revision of everything the public page shows; addresses apps.cards.page_cache entries
+    content_rev = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
         constraints = [
@@ -55,6 +73,47 @@ class Card(BaseModel):
             models.Index(fields=["owner", "status"]),
         ]
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or "about_markdown" in update_fields:
+            self.render_about()
+            if update_fields is not None:
+                kwargs["update_fields"] = update_fields = {*update_fields, *ABOUT_RENDERED_FIELDS}
+        if self._state.adding or not touches_public_fields(update_fields):
+            return super().save(*args, **kwargs)
+        # Incremented in SQL, so a stale instance never moves the revision backwards
+        self.content_rev = models.F("content_rev") + 1
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, "content_rev"}
+        super().save(*args, **kwargs)
+        self.refresh_from_db(fields=["content_rev"])
+
+    def render_about(self, html: str | None = None) -> bool:
+        """Refresh ``about_html`` if ``about_markdown`` changed; ``html`` skips a render already done.
+
+        Content over the size limits renders as empty, as the viewer always did.
+        """
+        digest = about_markdown_hash(self.about_markdown)
+        if digest == self.about_markdown_hash:
+            return False
+        if html is None:
+            try:
+                html = sanitize_about_markdown(self.about_markdown or "")
+            except ValueError:
+                html = ""
+        self.about_html = html
+        self.about_markdown_hash = digest
+        return True
+
+    def public_about_html(self) -> str:
+        """Stored about HTML; cards not backfilled yet (no hash) render on the fly."""
+        if self.about_markdown_hash or not has_about_content(self.about_markdown):
+            return self.about_html or ""
+        try:
+            return sanitize_about_markdown(self.about_markdown or "")
+        except ValueError:
+            return ""
+
     def can_publish(self) -> bool:
         if not self.title or len(self.title.strip()) < 3:
             return False
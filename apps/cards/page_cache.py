@@ -0,0 +1,169 @@
+"""Full-page cache of the public card page, addressed by ``Card.content_rev``.
+
+``Card.save()`` increments ``content_rev`` and signals do the same when a link,
+social link, gallery item, scheduling service or menu entry of the card
+changes, so an entry is keyed by ``(card, content_rev, scheme/host)`` and is
+never invalidated explicitly: a new revision simply addresses a new key.
+
+Rendered pages hold ``CSRF_PLACEHOLDER`` where the CSRF token goes; it is
+swapped for the visitor's token on the way out. The ETag covers the
+revision and the visitor's CSRF secret. The revision comes from
+``resolver.resolve``, so a cached page or a 304 usually needs no query.
+
+Tab panels are cached the same way, one fragment per tab (``fragment`` /
+``fragments``), so the bundled tab payload and the single-tab endpoints share
+entries. Fragments carry no CSRF token.
+"""
+from __future__ import annotations
+
+import functools
+import hashlib
+from pathlib import Path
+from typing import Callable
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.http import HttpResponse, HttpResponseNotModified
+from django.middleware.csrf import get_token
+from django.template.utils import get_app_template_dirs
+from django.utils.http import parse_etags
+
+from . import resolver, snapshots
+from .models import Card
+
+PAGE_KEY = "cards:page:{card_id}:{rev}:{variant}"
+FRAGMENT_KEY = "cards:frag:{card_id}:{rev}:{name}"
+CSRF_PLACEHOLDER = "__card_page_csrf_token__"
+DEFAULT_PAGE_CACHE_TIMEOUT = 24 * 60 * 60
+
+
+def page_cache_enabled() -> bool:
+    return bool(getattr(settings, "CARD_PAGE_CACHE_ENABLED", False))
+
+
+def _timeout() -> int:
+    return int(getattr(settings, "CARD_PAGE_CACHE_TIMEOUT", DEFAULT_PAGE_CACHE_TIMEOUT))
+
+
+def bump_content_rev(card_id) -> None:
+    # update() so bumping never fires Card save signals
+    if card_id:
+        Card.objects.filter(pk=card_id).update(content_rev=F("content_rev") + 1)
+        nickname = Card.objects.filter(pk=card_id).values_list("nickname", flat=True).first()
+        # The resolver caches the revision along with the nickname
+        resolver.invalidate(nickname)
+        snapshots.schedule(card_id, nickname)
+
+
+@functools.cache
+def _templates_digest() -> str:
+    base = Path(settings.BASE_DIR)
+    # The project's templates and its apps', not the ones installed packages ship
+    roots = [
+        base / "templates",
+        *(d for d in get_app_template_dirs("templates") if d.is_relative_to(base) and "site-packages" not in d.parts),
+    ]
+    digest = hashlib.sha256()
+    for path in sorted(p for root in roots for p in root.rglob("*.html")):
+        digest.update(str(path.relative_to(base)).encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()[:12]
+
+
+def page_format_version() -> str:
+    """Release the cached HTML belongs to, so pages rendered by older code are not served.
+
+    ``RELEASE_ID`` (the build's commit, set at deploy); without it, a digest
+    of the template files, read once per process.
+    """
+    return getattr(settings, "RELEASE_ID", "") or _templates_digest()
+
+
+def _variant(request) -> str:
+    # Share metadata carries absolute URLs
+    return hashlib.sha256(f"{request.scheme}://{request.get_host()}".encode()).hexdigest()[:16]
+
+
+def page_key(request, ref: resolver.CardRef) -> str:
+    return PAGE_KEY.format(
+        card_id=ref.card_id, rev=f"{page_format_version()}.{ref.content_rev}", variant=_variant(request)
+    )
+
+
+def page_etag(request, ref: resolver.CardRef) -> str:
+    """Strong ETag of the page as this visitor gets it (call after ``get_token``)."""
+    raw = f"{page_key(request, ref)}:{request.META.get('CSRF_COOKIE', '')}"
+    return '"%s"' % hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+def fragment_key(ref: resolver.CardRef, name: str) -> str:
+    return FRAGMENT_KEY.format(card_id=ref.card_id, rev=f"{page_format_version()}.{ref.content_rev}", name=name)
+
+
+def fragment_etag(ref: resolver.CardRef, name: str) -> str:
+    return '"%s"' % hashlib.sha256(fragment_key(ref, name).encode()).hexdigest()[:32]
+
+
+def fragment(ref: resolver.CardRef, name: str, render: Callable[[], str]) -> str:
+    """Fragment ``name`` of the card at ``ref``'s revision, rendered by ``render()`` on a miss."""
+    return fragments(ref, [name], lambda _name: render())[name]
+
+
+def fragments(ref: resolver.CardRef, names: list[str], render: Callable[[str], str]) -> dict[str, str]:
+    """Several fragments in one cache round trip; ``render(name)`` fills the misses."""
+    if not page_cache_enabled():
+        return {name: render(name) for name in names}
+    keys = {name: fragment_key(ref, name) for name in names}
+    found = cache.get_many(list(keys.values()))
+    result, missing = {}, {}
+    for name, key in keys.items():
+        if key in found:
+            result[name] = found[key]
+        else:
+            result[name] = missing[key] = render(name)
+    if missing:
+        cache.set_many(missing, timeout=_timeout())
+    return result
+
+
+def serve_fragment(request, ref: resolver.CardRef, name: str, render_body: Callable[[], str]) -> HttpResponse:
+    """Answer a fragment-only response (no CSRF token), revalidated by ETag against the revision."""
+    if not page_cache_enabled():
+        return HttpResponse(render_body())
+    etag = fragment_etag(ref, name)
+    if etag in parse_etags(request.headers.get("If-None-Match", "")):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(render_body())
+    response["ETag"] = etag
+    response["Cache-Control"] = "no-cache"
+    return response
+
+
+def serve(request, ref: resolver.CardRef, render_page: Callable[[dict], HttpResponse]) -> HttpResponse:
+    """Answer the public page of the card ``ref`` points to from the cache, rendering it on a miss.
+
+    ``render_page(extra_context)`` renders the page normally; on a miss it
+    gets ``csrf_token=CSRF_PLACEHOLDER`` so the stored HTML carries no token.
+    """
+    if not page_cache_enabled():
+        return render_page({})
+    token = get_token(request)
+    etag = page_etag(request, ref)
+    if etag in parse_etags(request.headers.get("If-None-Match", "")):
+        response = HttpResponseNotModified()
+    else:
+        key = page_key(request, ref)
+        body = cache.get(key)
+        if body is None:
+            rendered = render_page({"csrf_token": CSRF_PLACEHOLDER})
+            if rendered.status_code != 200:
+                return rendered
+            body = rendered.content.decode(rendered.charset)
+            cache.set(key, body, timeout=_timeout())
+        response = HttpResponse(body.replace(CSRF_PLACEHOLDER, token))
+    response["ETag"] = etag
+    # The body carries the visitor's CSRF token: browsers only, always revalidated
+    response["Cache-Control"] = "private, no-cache"
+    return response
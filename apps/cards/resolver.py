@@ -0,0 +1,165 @@
+"""Nickname → card resolution for the public pages.
+
+Every public view starts from ``/@<nickname>``. ``resolve`` answers it from
+two cache layers before touching the database:
+
+- a per-process LRU with a short TTL (``CARD_RESOLVER_LOCAL_TTL`` seconds),
+  which no other process can invalidate, so it bounds how long a change takes
+  to show up there;
+- the shared cache (Redis), invalidated by signals when a card is saved
+  (publish, archive, nickname change and every ``content_rev`` bump).
+
+The database lookup goes through ``LOWER(nickname)``, the expression of the
+``uniq_card_nickname_lower`` index; ``nickname__iexact`` compiles to
+``UPPER(...)`` and cannot use it. Unknown nicknames are cached too, briefly.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.functions import Lower
+from django.http import Http404
+
+from .models import Card
+
+NICKNAME_KEY = "cards:nick:{nickname}"
+DEFAULT_RESOLVER_TIMEOUT = 60 * 60
+DEFAULT_LOCAL_TTL = 5
+LOCAL_MAX_ENTRIES = 2048
+# Unknown nicknames: short, so a freshly claimed one shows up quickly even if a signal is missed
+MISSING_TIMEOUT = 60
+_MISSING = "-"
+
+
+class CardRef(NamedTuple):
+    card_id: str
+    status: str
+    mode: str
+    content_rev: int
+    deactivation_marked: bool
+
+    @property
+    def is_public(self) -> bool:
+        return self.status == "published" and not self.deactivation_marked
+
+
+class _LocalLRU:
+    """Small thread-safe LRU whose entries expire after ``ttl`` seconds."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data: OrderedDict[str, tuple[float, object]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, ttl: float):
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is None:
+                return None
+            stored_at, value = hit
+            if time.monotonic() - stored_at > ttl:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+_local = _LocalLRU(LOCAL_MAX_ENTRIES)
+
+
+def _local_ttl() -> float:
+    return float(getattr(settings, "CARD_RESOLVER_LOCAL_TTL", DEFAULT_LOCAL_TTL))
+
+
+def _key(nickname: str) -> str:
+    return NICKNAME_KEY.format(nickname=nickname.lower())
+
+
+def by_nickname(nickname: str, qs: QuerySet | None = None) -> QuerySet:
+    """Cards whose nickname matches case-insensitively, through the ``LOWER(nickname)`` index."""
+    qs = Card.objects.all() if qs is None else qs
+    return qs.alias(nickname_lower=Lower("nickname")).filter(nickname__isnull=False, nickname_lower=nickname.lower())
+
+
+def _load(nickname: str) -> CardRef | None:
+    row = (
+        by_nickname(nickname)
+        .values_list("pk", "status", "mode", "content_rev", "deactivation_marked")
+        .first()
+    )
+    return CardRef(str(row[0]), *row[1:]) if row else None
+
+
+def resolve(nickname: str) -> CardRef | None:
+    if not nickname:
+        return None
+    key = _key(nickname)
+    ttl = _local_ttl()
+    value = _local.get(key, ttl) if ttl > 0 else None
+    if value is None:
+        value = cache.get(key)
+        if value is None:
+            ref = _load(nickname)
+            value = tuple(ref) if ref else _MISSING
+            cache.set(key, value, timeout=MISSING_TIMEOUT if ref is None else DEFAULT_RESOLVER_TIMEOUT)
+        if ttl > 0:
+            _local.set(key, value)
+    return None if value == _MISSING else CardRef(*value)
+
+
+def resolve_public(nickname: str) -> CardRef:
+    ref = resolve(nickname)
+    if ref is None or not ref.is_public:
+        raise Http404()
+    return ref
+
+
+def get_public_card(nickname: str) -> Card:
+    """Published, active card of ``nickname``, fetched by primary key."""
+    for _ in range(2):
+        ref = resolve_public(nickname)
+        # Checked again on the row: a cached ref may be a few seconds old
+        card = Card.objects.filter(pk=ref.card_id, status="published", deactivation_marked=False).first()
+        if card is not None and (card.nickname or "").lower() == nickname.lower():
+            return card
+        # Stale ref: drop it and resolve once more from the database
+        invalidate(nickname)
+    raise Http404()
+
+
+def invalidate(*nicknames: str | None) -> None:
+    keys = [_key(nickname) for nickname in sorted({n.lower() for n in nicknames if n})]
+    if not keys:
+        return
+
+    # Once right away and once after commit, so a ref loaded from the
+    # pre-commit row in between is not kept
+    def drop():
+        for key in keys:
+            _local.discard(key)
+        cache.delete_many(keys)
+
+    drop()
+    transaction.on_commit(drop)
@@ -1,7 +1,10 @@
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
-from .models import Card, LinkButton, GalleryItem
+from .models import Card, LinkButton, GalleryItem, SocialLink, touches_public_fields
+from . import resolver, snapshots
+from .page_cache import bump_content_rev
 from apps.metering.utils import create_event
+from apps.scheduling.models import SchedulingService
 
 
 @receiver(pre_save, sender=Card)
@@ -27,3 +30,34 @@ def link_button_created(sender, instance: LinkButton, created, **kwargs):
 def gallery_item_created(sender, instance: GalleryItem, created, **kwargs):
     # Billing for gallery disabled: do not create metering events
     return
+
+
+@receiver(post_save, sender=LinkButton)
+@receiver(post_delete, sender=LinkButton)
+@receiver(post_save, sender=SocialLink)
+@receiver(post_delete, sender=SocialLink)
+@receiver(post_save, sender=GalleryItem)
+@receiver(post_delete, sender=GalleryItem)
+@receiver(post_save, sender=SchedulingService)
+@receiver(post_delete, sender=SchedulingService)
+def card_content_changed(sender, instance, **kwargs):
+    # Public page shows these; a new revision addresses a fresh page cache entry
+    bump_content_rev(instance.card_id)
+
+
+@receiver(pre_save, sender=Card)
+def card_remember_nickname(sender, instance: Card, **kwargs):
+    instance._nickname_before = None
+    if instance.pk and not instance._state.adding:
+        instance._nickname_before = Card.objects.filter(pk=instance.pk).values_list("nickname", flat=True).first()
+
+
+@receiver(post_save, sender=Card)
+@receiver(post_delete, sender=Card)
+def card_resolution_changed(sender, instance: Card, update_fields=None, **kwargs):
+    if not touches_public_fields(update_fields):
+        return
+    # Status, mode and content_rev are cached with the nickname; a new one may have been cached as unknown
+    resolver.invalidate(getattr(instance, "_nickname_before", None), instance.nickname)
+    # Static snapshot: dropped (nginx falls back to Django) and rendered again
+    snapshots.schedule(instance.pk, getattr(instance, "_nickname_before", None), instance.nickname)
@@ -0,0 +1,225 @@
+"""Static snapshots of the public card pages, served by nginx without Django.
+
+With ``CARD_SNAPSHOTS_ENABLED`` on, every save of a card and every
+``content_rev`` bump drops the card's snapshot once the transaction commits
+and queues ``tasks.publish_card_snapshot``, which renders ``/@<nick>`` (the
+delivery menu for delivery cards) into ``CARD_SNAPSHOT_ROOT``::
+
+    _v/<card_id>.<rev>.<random>/index.html[.gz|.br]   one directory per render
+    @<nick> -> _v/<card_id>.<rev>.<random>             symlink, swapped atomically
+
+nginx answers ``/@<nick>`` from ``@<nick>/index.html`` (``gzip_static`` /
+``brotli_static``) and falls back to the viewer when there is none; tabs,
+slots and every other fragment still go to Django. Snapshots carry no CSRF
+token, so nginx only serves them to visitors that already have the CSRF
+cookie, which the page's script sends instead. The ``.br`` files need the
+optional ``brotli`` package.
+"""
+from __future__ import annotations
+
+import gzip
+import logging
+import os
+import secrets
+import shutil
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db import transaction
+from django.http import HttpRequest
+from django.urls import set_urlconf
+
+from .models import Card
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+log = logging.getLogger(__name__)
+
+VERSIONS_DIR = "_v"
+INDEX = "index.html"
+VIEWER_URLCONF = "config.urls_viewer"
+# Version directories nobody links to are left alone this long: a render may be about to swap them in
+ORPHAN_GRACE_SECONDS = 10 * 60
+
+
+def snapshots_enabled() -> bool:
+    return bool(getattr(settings, "CARD_SNAPSHOTS_ENABLED", False))
+
+
+def snapshot_root() -> Path:
+    root = getattr(settings, "CARD_SNAPSHOT_ROOT", None)
+    return Path(root) if root else Path(settings.BASE_DIR) / "snapshots"
+
+
+def link_path(nickname: str) -> Path:
+    return snapshot_root() / f"@{nickname.lower()}"
+
+
+def _version_rev(target: Path) -> int | None:
+    # <card_id>.<rev>.<random>
+    parts = target.name.split(".")
+    return int(parts[1]) if len(parts) == 3 and parts[1].isdigit() else None
+
+
+class _SnapshotRequest(HttpRequest):
+    """Anonymous GET of ``path`` on ``VIEWER_BASE_URL``, the host share metadata points to."""
+
+    def __init__(self, path: str):
+        super().__init__()
+        base = urlsplit(getattr(settings, "VIEWER_BASE_URL", "") or "http://localhost:9000")
+        self._base_scheme = base.scheme or "http"
+        self._base_host = base.netloc or "localhost"
+        self.method = "GET"
+        self.path = self.path_info = path
+        self.META = {"SERVER_NAME": base.hostname or "localhost", "SERVER_PORT": str(base.port or "")}
+        self.user = AnonymousUser()
+
+    def _get_scheme(self) -> str:
+        return self._base_scheme
+
+    def get_host(self) -> str:
+        # Configured, not client supplied: no ALLOWED_HOSTS check needed
+        return self._base_host
+
+
+def render(card: Card) -> bytes:
+    """HTML of the card's public page as an anonymous visitor gets it, minus the CSRF token."""
+    from .views_public import _render_card_public
+
+    request = _SnapshotRequest(f"/@{card.nickname.lower()}")
+    # The worker may run with the dashboard's URLconf
+    set_urlconf(VIEWER_URLCONF)
+    try:
+        if card.mode == "delivery":
+            from apps.delivery.views_public import _render_menu_home
+
+            response = _render_menu_home(request, card, {"csrf_token": ""})
+        else:
+            response = _render_card_public(request, card, {"csrf_token": ""})
+    finally:
+        set_urlconf(None)
+    return response.content
+
+
+def _encodings(html: bytes) -> dict[str, bytes]:
+    files = {INDEX: html, f"{INDEX}.gz": gzip.compress(html, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        files[f"{INDEX}.br"] = brotli.compress(html, quality=11)
+    return files
+
+
+def write(card: Card, html: bytes) -> bool:
+    """Store ``html`` as the snapshot of ``card`` at its current revision and swap it in.
+
+    Returns False when the card moved past this revision meanwhile (or a newer
+    snapshot is already in place): the render queued for that change wins.
+    """
+    root = snapshot_root()
+    versions = root / VERSIONS_DIR
+    versions.mkdir(parents=True, exist_ok=True)
+    target = versions / f"{card.pk}.{card.content_rev}.{secrets.token_hex(4)}"
+    # Readable by nginx, which runs as another user
+    target.mkdir(mode=0o755)
+    for name, data in _encodings(html).items():
+        (target / name).write_bytes(data)
+
+    link = link_path(card.nickname)
+    current = Card.objects.filter(pk=card.pk).values_list("content_rev", flat=True).first()
+    previous = link.resolve() if link.is_symlink() else None
+    previous_rev = _version_rev(previous) if previous is not None else None
+    if current != card.content_rev or (previous_rev is not None and previous_rev > card.content_rev):
+        shutil.rmtree(target, ignore_errors=True)
+        return False
+
+    # rename() over the old link is atomic: nginx sees either snapshot, never a half-written one
+    tmp_link = root / f".{link.name}.{secrets.token_hex(4)}"
+    os.symlink(os.path.relpath(target, root), tmp_link)
+    os.replace(tmp_link, link)
+    if previous is not None and previous != target:
+        shutil.rmtree(previous, ignore_errors=True)
+    return True
+
+
+def remove(*nicknames: str | None) -> int:
+    removed = 0
+    for nickname in {n.lower() for n in nicknames if n}:
+        link = link_path(nickname)
+        if not link.is_symlink():
+            continue
+        target = link.resolve()
+        link.unlink(missing_ok=True)
+        shutil.rmtree(target, ignore_errors=True)
+        removed += 1
+    return removed
+
+
+def publish(card_id) -> bool:
+    """Render and swap in the snapshot of ``card_id``; a card that is not public loses it instead."""
+    card = Card.objects.filter(pk=card_id).first()
+    if card is None:
+        return False
+    if card.status != "published" or card.deactivation_marked or not card.nickname:
+        remove(card.nickname)
+        return False
+    return write(card, render(card))
+
+
+def schedule(card_id, *nicknames: str | None) -> None:
+    """After commit, drop the card's snapshot (nginx falls back to Django) and queue a new render."""
+    if not snapshots_enabled() or not card_id:
+        return
+    from .tasks import publish_card_snapshot
+
+    def _dispatch():
+        remove(*nicknames)
+        try:
+            publish_card_snapshot.delay(str(card_id))
+        except Exception as exc:
+            log.warning("failed to queue card snapshot for %s: %s", card_id, exc)
+
+    transaction.on_commit(_dispatch)
+
+
+def purge(nicknames: list[str] | None = None, everything: bool = False) -> int:
+    """Remove snapshots: of ``nicknames``, all of them, or (default) only the stale ones.
+
+    Stale: the card is gone, no longer public, was renamed, or moved past the
+    snapshot's revision (e.g. a bulk update that skipped the signals); plus
+    version directories no link points to.
+    """
+    root = snapshot_root()
+    if nicknames:
+        return remove(*nicknames)
+    if not root.is_dir():
+        return 0
+    links = {path.name[1:]: path for path in root.glob("@*") if path.is_symlink()}
+    if everything:
+        removed = remove(*links)
+        shutil.rmtree(root / VERSIONS_DIR, ignore_errors=True)
+        return removed
+
+    public = {
+        (nickname or "").lower(): rev
+        for nickname, rev in Card.objects.filter(
+            status="published", deactivation_marked=False, nickname__isnull=False
+        ).values_list("nickname", "content_rev")
+    }
+    stale = [
+        nickname for nickname, path in links.items()
+        if nickname not in public or _version_rev(path.resolve()) != public[nickname]
+    ]
+    removed = remove(*stale)
+
+    linked = {path.resolve() for path in root.glob("@*") if path.is_symlink()}
+    cutoff = time.time() - ORPHAN_GRACE_SECONDS
+    for version in (root / VERSIONS_DIR).glob("*"):
+        if version not in linked and version.stat().st_mtime < cutoff:
+            shutil.rmtree(version, ignore_errors=True)
+            removed += 1
+    return removed
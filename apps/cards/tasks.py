@@ -0,0 +1,22 @@
+import logging
+
+from celery import shared_task
+
+from . import snapshots
+from .models import Card
+
+log = logging.getLogger(__name__)
+
+
+@shared_task
+def publish_card_snapshot(card_id: str | None = None):
+    """Renderiza o snapshot estático da página pública de um cartão (ou de todos os publicados)."""
+    if card_id:
+        cards = Card.objects.filter(pk=card_id)
+    else:
+        cards = Card.objects.filter(status="published", deactivation_marked=False, nickname__isnull=False)
+    published = 0
+    for pk in cards.values_list("pk", flat=True).iterator():
+        published += snapshots.publish(pk)
+    log.info("card snapshots published for %s card(s)", published)
+    return {"published": published}
@@ -12,7 +12,8 @@ from django.views.decorators.http import require_POST
 from itertools import permutations
 from django.core.cache import cache
 from .models import Card, LinkButton, CardAddress, GalleryItem, SocialLink, PLATFORM_CHOICES
-from .markdown import MAX_MARKDOWN_CHARS, has_about_content, sanitize_about_markdown
+from .markdown import MAX_MARKDOWN_CHARS, about_markdown_hash, has_about_content, sanitize_about_markdown
+from . import resolver
 from apps.common.images import process_avatar, process_gallery
 from apps.common.validators import validate_upload
 from django.core.exceptions import ValidationError
@@ -21,6 +22,7 @@ from apps.billing.services import has_active_payment_method
 from django.conf import settings
 from django.utils.text import slugify
 from apps.scheduling.models import SchedulingService
+from apps.search.cep import lookup_cep, remember_cep
 
 TAB_LABELS = {
     "menu": "Cardápio",
@@ -155,12 +157,8 @@ def card_detail(request, id):
 @login_required
 def about_partial(request, id):
     card = get_object_or_404(Card, id=id, owner=request.user)
-    preview_html = ""
+    preview_html = card.public_about_html()
     error = None
-    try:
-        preview_html = sanitize_about_markdown(card.about_markdown or "")
-    except ValueError as exc:  # pragma: no cover - persisted content should already be valid
-        error = str(exc)
     ctx = {
         "card": card,
         "about_markdown": card.about_markdown or "",
@@ -179,7 +177,11 @@ def preview_about(request, id):
         return HttpResponseForbidden("Card marked for deactivation")
     markdown_value = (request.POST.get("about_markdown") or "").strip()
     try:
-        preview_html = sanitize_about_markdown(markdown_value)
+        if card.about_markdown_hash and about_markdown_hash(markdown_value) == card.about_markdown_hash:
+            # Unchanged text: the stored render is the preview
+            preview_html = card.about_html
+        else:
+            preview_html = sanitize_about_markdown(markdown_value)
         status = 200
         error = None
     except ValueError as exc:
@@ -215,6 +217,7 @@ def save_about(request, id):
         resp.status_code = 422
         return resp
     card.about_markdown = markdown_value
+    card.render_about(html=preview_html)
     card.save(update_fields=["about_markdown"])
     ctx = {
         "card": card,
@@ -249,7 +252,7 @@ def publish_card(request, id):
     if nickname in getattr(settings, "RESERVED_NICKNAMES", set()):
         return HttpResponse("reserved nickname", status=422)
     # availability (case-insensitive)
-    exists = Card.objects.filter(nickname__iexact=nickname).exclude(id=card.id).exists()
+    exists = resolver.by_nickname(nickname).exclude(id=card.id).exists()
     if exists:
         return HttpResponse("nickname taken", status=409)
     # business rule: additional validations
@@ -280,7 +283,7 @@ def check_nickname(request):
     raw = request.GET.get("value") or request.GET.get("nickname") or ""
     value = raw.strip().lower()
     ok = bool(re.fullmatch(r"[a-z0-9_.]{3,32}", value)) and (value not in getattr(settings, "RESERVED_NICKNAMES", set()))
-    available = ok and (not Card.objects.filter(nickname__iexact=value).exists())
+    available = ok and (not resolver.by_nickname(value).exists())
     if request.headers.get("HX-Request"):
         # Return human‑readable inline feedback for the modal (status 200 to avoid noisy errors)
         if not ok:
@@ -399,6 +402,11 @@ def cep_lookup(request):
         return render(request, "cards/_address_fields.html", {"error": "CEP inválido."})
     cache_key = f"cep:{norm}"
     data = cache.get(cache_key)
+    if not data:
+        record = lookup_cep(norm)
+        if record is not None and record.cidade:
+            data = record.address_parts()
+            cache.set(cache_key, data, 60 * 60 * 24)
     if not data:
         try:
             with urllib.request.urlopen(f"https://viacep.com.br/ws/{norm}/json/", timeout=4) as resp:
@@ -413,6 +421,7 @@ def cep_lookup(request):
                 "cidade": jd.get("localidade") or "",
                 "uf": (jd.get("uf") or "").upper(),
             }
+            remember_cep(norm, **data)
             cache.set(cache_key, data, 60 * 60 * 24)
     if not data:
         return render(request, "cards/_address_fields.html", {"error": "CEP não encontrado ou indisponível."})
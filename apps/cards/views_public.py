@@ -1,10 +1,14 @@
+import functools
 import random
-from django.shortcuts import render, get_object_or_404
+from django.http import Http404
+from django.shortcuts import render
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
 from django.views.decorators.csrf import ensure_csrf_cookie
 from django.urls import reverse
 from django.templatetags.static import static
 from .models import Card, LinkButton, SocialLink, GalleryItem
-from .markdown import has_about_content, sanitize_about_markdown
+from . import page_cache, resolver
 from apps.scheduling.models import SchedulingService
 
 #from apps.delivery.views_public import menu_home as delivery_menu_home
@@ -17,28 +21,20 @@ except Exception:  # pragma: no cover - delivery app may not be loaded in some c
 
 
 def _get_card_by_nickname(nickname: str) -> Card:
-    q = Card.objects.filter(nickname__iexact=nickname, status="published", deactivation_marked=False)
-    return get_object_or_404(q)
+    return resolver.get_public_card(nickname)
 
 
 @ensure_csrf_cookie
 def card_public(request, nickname: str):
-    card = _get_card_by_nickname(nickname)
-    if getattr(card, "mode", "appointment") == "delivery" and delivery_menu_home:
+    ref = resolver.resolve_public(nickname)
+    if ref.mode == "delivery" and delivery_menu_home:
         return delivery_menu_home(request, nickname)
-    links = LinkButton.objects.filter(card=card).order_by("order", "created_at")
-    socials = SocialLink.objects.filter(card=card, is_active=True).order_by("order", "created_at")
-    gallery = GalleryItem.objects.filter(card=card, visible_in_gallery=True).order_by("importance", "order", "created_at")
-    services = _services_with_media(card) if card.mode != "delivery" else []
-    about_html = ""
-    about_enabled = False
-    if has_about_content(card.about_markdown):
-        try:
-            about_html = sanitize_about_markdown(card.about_markdown or "")
-            about_enabled = bool(about_html.strip())
-        except ValueError:
-            about_html = ""
-            about_enabled = False
+    return page_cache.serve(
+        request, ref, lambda extra: _render_card_public(request, _get_card_by_nickname(nickname), extra)
+    )
+
+
+def _tab_order(card: Card, about_enabled: bool) -> list[str]:
     allowed_base = ["links", "gallery"]
     if card.mode != "delivery":
         allowed_base.append("services")
@@ -53,6 +49,17 @@ def card_public(request, nickname: str):
         tab_order = ["links", "gallery"] + (["services"] if card.mode != "delivery" else [])
         if about_enabled:
             tab_order.append("about")
+    return tab_order
+
+
+def _render_card_public(request, card: Card, extra: dict):
+    links = LinkButton.objects.filter(card=card).order_by("order", "created_at")
+    socials = SocialLink.objects.filter(card=card, is_active=True).order_by("order", "created_at")
+    gallery = GalleryItem.objects.filter(card=card, visible_in_gallery=True).order_by("importance", "order", "created_at")
+    services = _services_with_media(card) if card.mode != "delivery" else []
+    about_html = card.public_about_html()
+    about_enabled = bool(about_html.strip())
+    tab_order = _tab_order(card, about_enabled)
     # Sharing metadata (Open Graph / Twitter)
     share_title = card.title
     if card.nickname:
@@ -62,7 +69,8 @@ def card_public(request, nickname: str):
         share_description = f"Conheça o cartão digital de {card.title}."
     share_description = " ".join(share_description.split())
     share_description = share_description[:240]
-    share_url = request.build_absolute_uri()
+    # Canonical URL (no query string): the page is cached per card, not per URL
+    share_url = request.build_absolute_uri(request.path)
     avatar_field = card.avatar or card.avatar_w128 or card.avatar_w64
     if avatar_field and getattr(avatar_field, "name", None):
         share_image = request.build_absolute_uri(
@@ -84,26 +92,84 @@ def card_public(request, nickname: str):
         "share_description": share_description,
         "share_url": share_url,
         "share_image": share_image,
+        **extra,
     })
 
+TAB_TEMPLATES = {
+    "links": "public/tabs_links.html",
+    "gallery": "public/tabs_gallery.html",
+    "services": "public/tabs_services.html",
+    "about": "public/tabs_about.html",
+}
+
+
+def _enabled_tabs(card: Card) -> list[str]:
+    """Tabs the public page shows, in ``tabs_order``: allowed for the mode and not empty."""
+    about_enabled = bool(card.public_about_html().strip())
+    present = {
+        "links": LinkButton.objects.filter(card=card).exists(),
+        "gallery": GalleryItem.objects.filter(card=card, visible_in_gallery=True).exists(),
+        "services": card.mode != "delivery" and SchedulingService.objects.filter(card=card, is_active=True).exists(),
+        "about": about_enabled,
+    }
+    return [key for key in _tab_order(card, about_enabled) if present[key]]
+
+
+def _render_tab(request, card: Card, key: str) -> str:
+    context = {"card": card}
+    if key == "links":
+        context["links"] = LinkButton.objects.filter(card=card).order_by("order", "created_at")
+    elif key == "gallery":
+        context["gallery"] = GalleryItem.objects.filter(card=card, visible_in_gallery=True).order_by("importance", "order", "created_at")
+    elif key == "services":
+        context["services"] = _services_with_media(card)
+    else:
+        context["about_html"] = card.public_about_html()
+    return render_to_string(TAB_TEMPLATES[key], context, request)
+
+
+def tabs_bundle(request, nickname: str):
+    """Every enabled tab in one response, as ``hx-swap-oob`` fragments in ``tabs_order``.
+
+    Each fragment fills the inner HTML of its ``#panel-<key>`` on the page, so the
+    panels keep their ``hidden`` state. Fragments and the order are cached per
+    revision; a warm bundle needs no query.
+    """
+    ref = resolver.resolve_public(nickname)
+    card = functools.cache(lambda: _get_card_by_nickname(nickname))
+
+    def render_body() -> str:
+        order = page_cache.fragment(ref, "tab_order", lambda: ",".join(_enabled_tabs(card())))
+        names = {f"tab:{key}": key for key in order.split(",") if key}
+        html = page_cache.fragments(ref, list(names), lambda name: _render_tab(request, card(), names[name]))
+        tabs = [{"key": key, "html": mark_safe(html[name])} for name, key in names.items()]
+        return render_to_string("public/tabs_bundle.html", {"tabs": tabs}, request)
+
+    return page_cache.serve_fragment(request, ref, "tabs", render_body)
+
+
+def _tab_response(request, nickname: str, key: str):
+    ref = resolver.resolve_public(nickname)
+    if key == "services" and ref.mode == "delivery":
+        # Services tab not available for delivery-mode cards
+        raise Http404()
+    name = f"tab:{key}"
+    return page_cache.serve_fragment(
+        request,
+        ref,
+        name,
+        lambda: page_cache.fragment(ref, name, lambda: _render_tab(request, _get_card_by_nickname(nickname), key)),
+    )
+
+
 def tabs_links(request, nickname: str):
-    card = _get_card_by_nickname(nickname)
-    links = LinkButton.objects.filter(card=card).order_by("order", "created_at")
-    return render(request, "public/tabs_links.html", {"card": card, "links": links})
+    return _tab_response(request, nickname, "links")
 
 def tabs_gallery(request, nickname: str):
-    card = _get_card_by_nickname(nickname)
-    gallery = GalleryItem.objects.filter(card=card, visible_in_gallery=True).order_by("importance", "order", "created_at")
-    return render(request, "public/tabs_gallery.html", {"card": card, "gallery": gallery})
+    return _tab_response(request, nickname, "gallery")
 
 def tabs_services(request, nickname: str):
-    card = _get_card_by_nickname(nickname)
-    if card.mode == "delivery":
-        # Services tab not available for delivery-mode cards
-        from django.http import Http404
-        raise Http404()
-    services = _services_with_media(card)
-    return render(request, "public/tabs_services.html", {"card": card, "services": services})
+    return _tab_response(request, nickname, "services")
 
 
 def _services_with_media(card: Card) -> list[dict[str, object]]:
@@ -1,14 +1,83 @@
+"""Sliding-window rate limiter shared by every throttled endpoint.
+
+Each check is a single atomic Redis round-trip: one Lua script trims, counts
+and (if every window has room) records the hit in one sorted set per window,
+so concurrent workers can never overshoot a limit. Several windows (e.g. 5/min
+and 50/h) are evaluated together and a hit is only recorded when all of them
+allow it.
+
+Backends other than django-redis (e.g. locmem in tests or a bare dev setup)
+fall back to an in-process log with the same semantics; every deployed
+service, the viewer included, shares the Redis cache.
+"""
 from __future__ import annotations
 
+import math
+import threading
+import uuid
+from collections import deque
 from dataclasses import dataclass
 from time import time
-from typing import Optional
+from typing import Sequence
 
 from django.core.cache import caches
 
 
 cache = caches["default"]
 
+# (limit, window_seconds)
+Rate = tuple[int, int]
+
+# KEYS: one sorted set per window. ARGV[1] cost, ARGV[2] member prefix, then
+# (limit, window_ms) pairs. Returns {allowed, remaining, retry_after_ms}.
+SLIDING_WINDOW_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local cost = tonumber(ARGV[1])
+local need = math.max(cost, 1)
+local allowed = 1
+local retry = 0
+local counts = {}
+for i, key in ipairs(KEYS) do
+  local limit = tonumber(ARGV[1 + i * 2])
+  local window = tonumber(ARGV[2 + i * 2])
+  redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+  local count = redis.call('ZCARD', key)
+  counts[i] = count
+  if count + need > limit then
+    allowed = 0
+    local wait = window
+    if need <= limit then
+      local oldest = redis.call('ZRANGE', key, count + need - limit - 1, count + need - limit - 1, 'WITHSCORES')
+      if oldest[2] then
+        wait = tonumber(oldest[2]) + window - now
+      end
+    end
+    if wait > retry then
+      retry = wait
+    end
+  end
+end
+local remaining = -1
+for i, key in ipairs(KEYS) do
+  local limit = tonumber(ARGV[1 + i * 2])
+  local window = tonumber(ARGV[2 + i * 2])
+  local used = counts[i]
+  if allowed == 1 and cost > 0 then
+    for n = 1, cost do
+      redis.call('ZADD', key, now, ARGV[2] .. ':' .. n)
+    end
+    redis.call('PEXPIRE', key, window)
+    used = used + cost
+  end
+  local left = math.max(0, limit - used)
+  if remaining < 0 or left < remaining then
+    remaining = left
+  end
+end
+return {allowed, remaining, retry}
+"""
+
 
 @dataclass
 class LimitResult:
@@ -21,19 +90,91 @@ def _key(namespace: str, ident: str) -> str:
     return f"rl:{namespace}:{ident}"
 
 
-def rate_limit(namespace: str, ident: str, limit: int, window_seconds: int) -> LimitResult:
-    key = _key(namespace, ident)
-    now = int(time())
-    bucket = now // window_seconds
-    bucket_key = f"{key}:{bucket}"
-
-    current = cache.get(bucket_key, 0)
-    if current >= limit:
-        # compute retry after until next bucket
-        retry_after = (bucket + 1) * window_seconds - now
-        return LimitResult(False, 0, retry_after)
-    cache.add(bucket_key, 0, timeout=window_seconds)
-    new_val = cache.incr(bucket_key)
-    remaining = max(0, limit - new_val)
-    return LimitResult(True, remaining, 0)
+def _window_keys(namespace: str, ident: str, rates: Sequence[Rate]) -> list[str]:
+    base = _key(namespace, ident)
+    return [f"{base}:{int(window)}" for _, window in rates]
+
+
+# ---- Redis path ----
+
+_script = None
+
+
+def _redis_check(keys: list[str], rates: Sequence[Rate], cost: int) -> LimitResult | None:
+    """Run the Lua script; ``None`` when the default cache is not django-redis."""
+    global _script
+    try:
+        from django_redis import get_redis_connection
+
+        if _script is None:
+            _script = get_redis_connection("default").register_script(SLIDING_WINDOW_LUA)
+    except (ImportError, NotImplementedError):
+        return None
+    args: list = [cost, uuid.uuid4().hex]
+    for limit, window in rates:
+        args.extend([int(limit), int(window) * 1000])
+    allowed, remaining, retry_ms = _script(keys=[cache.make_key(k) for k in keys], args=args)
+    return LimitResult(bool(allowed), int(remaining), math.ceil(int(retry_ms) / 1000))
+
 
+# ---- Local fallback ----
+
+_local_log: dict[str, deque] = {}
+_local_lock = threading.Lock()
+
+
+def _local_check(keys: list[str], rates: Sequence[Rate], cost: int) -> LimitResult:
+    need = max(cost, 1)
+    with _local_lock:
+        now = time()
+        logs = []
+        allowed = True
+        retry = 0.0
+        for key, (limit, window) in zip(keys, rates):
+            log = _local_log.setdefault(key, deque())
+            while log and log[0] <= now - window:
+                log.popleft()
+            logs.append(log)
+            if len(log) + need > limit:
+                allowed = False
+                wait = float(window)
+                if need <= limit:
+                    wait = log[len(log) + need - limit - 1] + window - now
+                retry = max(retry, wait)
+        remaining = None
+        for log, (limit, _) in zip(logs, rates):
+            if allowed and cost > 0:
+                log.extend([now] * cost)
+            left = max(0, limit - len(log))
+            remaining = left if remaining is None else min(remaining, left)
+    return LimitResult(allowed, remaining or 0, math.ceil(retry))
+
+
+# ---- Public API ----
+
+def check_rate_limits(namespace: str, ident: str, rates: Sequence[Rate], *, cost: int = 1) -> LimitResult:
+    """Record ``cost`` hits for ``ident`` if every ``(limit, window_seconds)`` allows it.
+
+    ``cost=0`` only inspects the windows: it is allowed while at least one more
+    hit would fit.
+    """
+    if not rates:
+        raise ValueError("At least one rate is required.")
+    cost = max(0, int(cost))
+    keys = _window_keys(namespace, ident, rates)
+    result = _redis_check(keys, rates, cost)
+    if result is None:
+        result = _local_check(keys, rates, cost)
+    return result
+
+
+def reset_rate_limit(namespace: str, ident: str, rates: Sequence[Rate]) -> None:
+    keys = _window_keys(namespace, ident, rates)
+    with _local_lock:
+        for key in keys:
+            _local_log.pop(key, None)
+    cache.delete_many(keys)
+
+
+def rate_limit(namespace: str, ident: str, limit: int, window_seconds: int) -> LimitResult:
+    return check_rate_limits(namespace, ident, [(limit, window_seconds)])
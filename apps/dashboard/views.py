@@ -6,18 +6,20 @@ from django.contrib.auth.decorators import login_required
 from django.views.decorators.csrf import ensure_csrf_cookie
 from django.shortcuts import render, redirect, get_object_or_404
 from django.template.loader import render_to_string
+from django.urls import reverse
 from django.utils import timezone
 from apps.billing.models import UsageEvent, Invoice, CustomerProfile
-from apps.scheduling.models import Appointment, SchedulingService, RescheduleRequest
+from apps.scheduling.models import Appointment, CalendarFeed, LocalDate, SchedulingService, RescheduleRequest
 from django.http import HttpResponse, JsonResponse, HttpResponseBadRequest, HttpResponseForbidden
 from django.utils.dateparse import parse_date
 from zoneinfo import ZoneInfo
 from math import ceil
-from django.db.models import Q, Prefetch
+from django.db.models import Count, F, OuterRef, Prefetch, Q, Subquery, Value, Window
+from django.db.models.functions import Coalesce, NullIf, RowNumber, TruncDate
 from django.utils.formats import date_format
-from django.db import transaction
+from django.db import IntegrityError, transaction
 
-from apps.scheduling.slots import generate_slots
+from apps.scheduling.slots import generate_slots, generate_slots_range, is_double_booking
 from apps.notifications.api import enqueue
 from apps.common.phone import mask_phone
 
@@ -27,6 +29,8 @@ RESCHEDULE_LABELS = {
     "rejected": "Pedido recusado",
     "expired": "Pedido expirado",
 }
+# Events listed in a month-view cell; the rest show up as "+N"
+MONTH_EVENTS_PER_DAY = 3
 
 
 def _client_ip(request) -> str:
@@ -127,6 +131,7 @@ def agenda(request):
             "anchor": today_local,
             "tz_label": tz_name,
             "reschedule_pending_count": pending_reschedules,
+            "calendar_feed_url": _calendar_feed_url(request),
         })
 
     if view == "day":
@@ -180,41 +185,33 @@ def agenda(request):
         "month_start": start_date,
         "month_end": end_date,
         "reschedule_pending_count": pending_reschedules,
+        "calendar_feed_url": _calendar_feed_url(request),
     }
     # Build month view helper weeks (list of weeks x 7 days) if needed
     if view == "month":
         # Fetch appointments for whole displayed month range
         start_dt = dt.datetime.combine(start_date, dt.time(0, 0, tzinfo=tz))
         end_dt = dt.datetime.combine(end_date, dt.time(23, 59, tzinfo=tz))
-        aps = _user_appointments(request, start_dt, end_dt).select_related("service")
+        aps = _user_appointments(request, start_dt, end_dt)
         status_filter = request.GET.get("status")
         if status_filter in {"pending", "confirmed", "denied", "cancelled"}:
             aps = aps.filter(status=status_filter)
-        # Group events by local date (appointment timezone)
-        from zoneinfo import ZoneInfo as _ZI
-        events_by_date: dict[str, list[dict]] = {}
-        for ap in aps:
-            ap_tz = _ZI(ap.timezone or getattr(ap.service, "timezone", None) or "UTC")
-            s_local = ap.start_at_utc.astimezone(ap_tz)
-            key = s_local.date().isoformat()
-            events_by_date.setdefault(key, []).append({
-                "id": ap.id,
-                "time": s_local.strftime("%H:%M"),
-                "service": ap.service.name,
-                "status": ap.status,
-            })
+        summary_by_date = _month_summary(aps)
         # Build month grid with events embedded
         month_weeks = []
         cur = start_date
         for _ in range(6):
             week = []
             for _ in range(7):
-                key = cur.isoformat()
+                summary = summary_by_date.get(cur, {})
+                events = summary.get("events", [])
                 week.append({
                     "date": cur,
                     "label": cur.strftime('%d'),
                     "in_month": cur.month == anchor.month,
-                    "events": events_by_date.get(key, []),
+                    "events": events,
+                    "counts": summary.get("counts", {}),
+                    "more": summary.get("total", 0) - len(events),
                 })
                 cur += dt.timedelta(days=1)
             month_weeks.append(week)
@@ -223,12 +220,51 @@ def agenda(request):
     return render(request, "dashboard/agenda.html", context)
 
 
+def _month_summary(qs, per_day: int = MONTH_EVENTS_PER_DAY) -> dict[dt.date, dict]:
+    """Per local day (appointment timezone): counts by status and the first ``per_day`` events.
+
+    Both come from aggregate/window queries, so a busy month never materializes
+    more than ``per_day`` rows per cell.
+    """
+    tz_name = Coalesce(NullIf("timezone", Value("")), NullIf("service__timezone", Value("")), Value("UTC"))
+    qs = qs.order_by().annotate(tz_name=tz_name, day_local=LocalDate("start_at_utc", tz_name))
+    summary: dict[dt.date, dict] = {}
+    for row in qs.values("day_local", "status").annotate(n=Count("id")):
+        day = summary.setdefault(row["day_local"], {"counts": {}, "total": 0, "events": []})
+        day["counts"][row["status"]] = row["n"]
+        day["total"] += row["n"]
+    ranked = (
+        qs.annotate(
+            rank=Window(
+                RowNumber(),
+                partition_by=[F("day_local")],
+                order_by=[F("start_at_utc").asc(), F("id").asc()],
+            )
+        )
+        .filter(rank__lte=per_day)
+        .values("id", "day_local", "start_at_utc", "tz_name", "status", "service__name")
+        .order_by("day_local", "rank")
+    )
+    for row in ranked:
+        try:
+            tz = ZoneInfo(row["tz_name"])
+        except Exception:
+            tz = ZoneInfo("UTC")
+        summary[row["day_local"]]["events"].append({
+            "id": row["id"],
+            "time": row["start_at_utc"].astimezone(tz).strftime("%H:%M"),
+            "service": row["service__name"],
+            "status": row["status"],
+        })
+    return summary
+
+
 def _user_appointments(request, start: dt.datetime, end: dt.datetime):
-    # Appointments whose service's card belongs to the logged user
+    # Appointments whose service's card belongs to the logged user (denormalized owner)
     return (
         Appointment.objects
         .select_related("service", "service__card", "service__card__owner", "service__card__owner__customerprofile")
-        .filter(service__card__owner=request.user)
+        .filter(owner=request.user)
         .filter(start_at_utc__lt=end, end_at_utc__gt=start)
     )
 
@@ -374,23 +410,16 @@ def agenda_list_partial(request):
         except Exception:
             return HttpResponseBadRequest("invalid end")
     else:
-        # Provisional end: +60 days; we will trim to DAYS_WINDOW groups
+        # Horizon: +60 days; only the first DAYS_WINDOW days with appointments are loaded
         end_dt_local = start_dt_local + dt.timedelta(days=60)
 
     start_utc = start_dt_local.astimezone(ZoneInfo("UTC"))
     end_utc = end_dt_local.astimezone(ZoneInfo("UTC"))
 
-    reschedule_prefetch = Prefetch(
-        "reschedule_requests",
-        queryset=RescheduleRequest.objects.order_by("-created_at"),
-    )
     qs = (
         Appointment.objects
-        .filter(service__card__owner=request.user)
+        .filter(owner=request.user)
         .filter(start_at_utc__gte=start_utc, start_at_utc__lte=end_utc)
-        .select_related("service", "service__card", "service__card__owner", "service__card__owner__customerprofile")
-        .prefetch_related(reschedule_prefetch)
-        .order_by("start_at_utc")
     )
     if status_ in {"pending", "confirmed", "denied", "cancelled", "no_show"}:
         qs = qs.filter(status=status_)
@@ -420,81 +449,61 @@ def agenda_list_partial(request):
             | Q(service__card__nickname__icontains=q)
         )
 
-    # Build day groups (in user's timezone)
+    # The next DAYS_WINDOW local days (user's timezone) that have appointments, bucketed in the DB
+    qs = qs.annotate(day_local=TruncDate("start_at_utc", tzinfo=tz_user))
+    days = list(
+        qs.order_by("day_local").values_list("day_local", flat=True).distinct()[:DAYS_WINDOW]
+    )
+
     groups: list[dict] = []
-    current_day: dt.date | None = None
-    items_this_day: list[dict] = []
-    days_count = 0
-    last_day_end_local: dt.datetime | None = None
-    current_day_max_end_local_user: dt.datetime | None = None
-
-    def flush_day(day: dt.date, items: list[dict]):
-        nonlocal groups
-        if day is None:
-            return
-        # Localized label per Django's current LANGUAGE_CODE (e.g., pt-BR)
-        try:
-            label = date_format(day, "D, d M").title()
-        except Exception:
-            label = day.strftime("%a, %d %b").title()
-        groups.append({
-            "date_iso": day.isoformat(),
-            "label": label,
-            "count": len(items),
-            "items": items[:],
-        })
+    next_cursor = None
+    if days:
+        window_start = dt.datetime.combine(days[0], dt.time(0, 0), tzinfo=tz_user)
+        window_end = dt.datetime.combine(days[-1] + dt.timedelta(days=1), dt.time(0, 0), tzinfo=tz_user)
+        # Only the requests _reschedule_meta reads: pending ones and the latest of each appointment
+        latest_request = (
+            RescheduleRequest.objects
+            .filter(appointment_id=OuterRef("appointment_id"))
+            .order_by("-created_at")
+            .values("pk")[:1]
+        )
+        reschedule_prefetch = Prefetch(
+            "reschedule_requests",
+            queryset=RescheduleRequest.objects
+            .filter(Q(status="requested") | Q(pk=Subquery(latest_request)))
+            .order_by("-created_at"),
+        )
+        appointments = (
+            qs.filter(start_at_utc__gte=window_start, start_at_utc__lt=window_end)
+            .select_related("service", "service__card", "service__card__owner", "service__card__owner__customerprofile")
+            .prefetch_related(reschedule_prefetch)
+            .order_by("start_at_utc")
+        )
 
-    for ap in qs.iterator(chunk_size=200):
-        tz_name_ap = ap.timezone or getattr(ap.service, "timezone", None) or tz_name
-        try:
-            ap_tz = ZoneInfo(tz_name_ap)
-        except Exception:
-            ap_tz = tz_user
-        s_local = ap.start_at_utc.astimezone(ap_tz)
-        e_local = ap.end_at_utc.astimezone(ap_tz)
-        end_local_user = e_local.astimezone(tz_user)
-        reschedule_requests = list(ap.reschedule_requests.all())
-        res_meta = _reschedule_meta(ap, reschedule_requests)
-        pending_request = res_meta["pending_request"]
-        d = s_local.date()
-        if current_day is None:
-            current_day = d
-            items_this_day = []
-            current_day_max_end_local_user = end_local_user
-        if d != current_day:
-            flush_day(current_day, items_this_day)
-            days_count += 1
-            if current_day_max_end_local_user is not None:
-                last_day_end_local = current_day_max_end_local_user
-            if days_count >= DAYS_WINDOW:
-                current_day = None
-                items_this_day = []
-                current_day_max_end_local_user = None
-                break
-            current_day = d
-            items_this_day = []
-            current_day_max_end_local_user = end_local_user
-        else:
-            if current_day_max_end_local_user is None or end_local_user > current_day_max_end_local_user:
-                current_day_max_end_local_user = end_local_user
-
-        dto = _item_dto(ap, res_meta=res_meta)
-        items_this_day.append(dto)
-
-    # If we broke early due to DAYS_WINDOW, compute next_cursor
-    if last_day_end_local is None:
-        # We either exhausted all items or still in the last day
-        if current_day is not None:
-            flush_day(current_day, items_this_day)
-            if current_day_max_end_local_user is not None:
-                last_day_end_local = current_day_max_end_local_user
-            if last_day_end_local is None and groups:
-                last_day = dt.date.fromisoformat(groups[-1]["date_iso"])  # type: ignore[arg-type]
-                last_day_end_local = dt.datetime.combine(last_day, dt.time(23, 59, 59, tzinfo=tz_user))
+        by_day: dict[dt.date, list[Appointment]] = {day: [] for day in days}
+        for ap in appointments:
+            by_day[ap.day_local].append(ap)
 
-    next_cursor = None
-    if groups and last_day_end_local is not None:
-        next_cursor = last_day_end_local.astimezone(ZoneInfo("UTC")).isoformat()
+        for day in days:
+            items = []
+            for ap in by_day[day]:
+                res_meta = _reschedule_meta(ap, list(ap.reschedule_requests.all()))
+                items.append(_item_dto(ap, res_meta=res_meta))
+            # Localized label per Django's current LANGUAGE_CODE (e.g., pt-BR)
+            try:
+                label = date_format(day, "D, d M").title()
+            except Exception:
+                label = day.strftime("%a, %d %b").title()
+            groups.append({
+                "date_iso": day.isoformat(),
+                "label": label,
+                "count": len(items),
+                "items": items,
+            })
+        # Next page starts after the latest end of the last day shown
+        last_ends = [ap.end_at_utc for ap in by_day[days[-1]]]
+        last_day_end = max(last_ends) if last_ends else window_end - dt.timedelta(seconds=1)
+        next_cursor = last_day_end.astimezone(ZoneInfo("UTC")).isoformat()
 
     context = {
         "groups": groups,
@@ -557,7 +566,7 @@ def _fmt_address_or_link(ap: Appointment) -> str:
 def agenda_list_confirm(request, id):
     if request.method != "POST":
         return HttpResponseBadRequest("POST required")
-    ap = get_object_or_404(Appointment, id=id, service__card__owner=request.user)
+    ap = get_object_or_404(Appointment, id=id, owner=request.user)
     if ap.status != "pending":
         return HttpResponseBadRequest("invalid state")
     ap.status = "confirmed"
@@ -588,7 +597,7 @@ def agenda_list_confirm(request, id):
 def agenda_list_reject(request, id):
     if request.method != "POST":
         return HttpResponseBadRequest("POST required")
-    ap = get_object_or_404(Appointment, id=id, service__card__owner=request.user)
+    ap = get_object_or_404(Appointment, id=id, owner=request.user)
     # Using "denied" to mirror current calendar endpoints behavior
     if ap.status != "pending":
         return HttpResponseBadRequest("invalid state")
@@ -620,7 +629,7 @@ def agenda_list_reject(request, id):
 def agenda_list_cancel(request, id):
     if request.method != "POST":
         return HttpResponseBadRequest("POST required")
-    ap = get_object_or_404(Appointment, id=id, service__card__owner=request.user)
+    ap = get_object_or_404(Appointment, id=id, owner=request.user)
     if ap.status not in {"pending", "confirmed"}:
         return HttpResponseBadRequest("invalid state")
     ap.status = "cancelled"
@@ -807,14 +816,20 @@ def _load_appointment_with_reschedules(ap_id, user):
         .prefetch_related(
             Prefetch("reschedule_requests", queryset=RescheduleRequest.objects.order_by("-created_at"))
         )
-        .get(id=ap_id, service__card__owner=user)
+        .get(id=ap_id, owner=user)
     )
 
 
+def _calendar_feed_url(request) -> str:
+    # Calendar clients poll this ICS feed instead of the HTML agenda
+    feed, _ = CalendarFeed.objects.get_or_create(owner=request.user)
+    return request.build_absolute_uri(reverse("scheduling:owner_calendar_feed", args=[feed.token]))
+
+
 def _pending_reschedules_count(user) -> int:
     return (
         RescheduleRequest.objects
-        .filter(appointment__service__card__owner=user, status="requested")
+        .filter(appointment__owner=user, status="requested")
         .count()
     )
 
@@ -828,7 +843,7 @@ def agenda_event_sidebar(request, id):
             Prefetch("reschedule_requests", queryset=RescheduleRequest.objects.order_by("-created_at"))
         ),
         id=id,
-        service__card__owner=request.user,
+        owner=request.user,
     )
     res_meta = _reschedule_meta(ap, list(ap.reschedule_requests.all()))
     ctx = _agenda_sidebar_context(ap, request=request, res_meta=res_meta)
@@ -839,7 +854,7 @@ def agenda_event_sidebar(request, id):
 def agenda_event_approve(request, id):
     if request.method != "POST":
         return HttpResponseBadRequest("POST required")
-    ap = get_object_or_404(Appointment, id=id, service__card__owner=request.user)
+    ap = get_object_or_404(Appointment, id=id, owner=request.user)
     if ap.status != "pending":
         return HttpResponseBadRequest("invalid state")
     ap.status = "confirmed"
@@ -866,7 +881,7 @@ def agenda_event_approve(request, id):
 def agenda_event_deny(request, id):
     if request.method != "POST":
         return HttpResponseBadRequest("POST required")
-    ap = get_object_or_404(Appointment, id=id, service__card__owner=request.user)
+    ap = get_object_or_404(Appointment, id=id, owner=request.user)
     if ap.status != "pending":
         return HttpResponseBadRequest("invalid state")
     ap.status = "denied"
@@ -900,7 +915,7 @@ def _reschedule_queryset(request):
             "appointment__service__card__owner__customerprofile",
             "approved_by",
         )
-        .filter(appointment__service__card__owner=request.user)
+        .filter(appointment__owner=request.user)
     )
 
 
@@ -944,6 +959,7 @@ def _slot_options_for_date(
     day: dt.date,
     *,
     preferred: dt.datetime | None = None,
+    raw_slots: list[dict] | None = None,
 ) -> list[dict[str, object]]:
     tz = _appointment_tz(ap)
     now_ref = timezone.now()
@@ -955,7 +971,9 @@ def _slot_options_for_date(
             preferred_utc = None
 
     options: list[dict[str, object]] = []
-    for raw in generate_slots(ap.service, day, ignore_appointment_id=ap.id):
+    if raw_slots is None:
+        raw_slots = generate_slots(ap.service, day, ignore_appointment_id=ap.id)
+    for raw in raw_slots:
         try:
             start = dt.datetime.fromisoformat(raw["start_at_utc"])
             end = dt.datetime.fromisoformat(raw["end_at_utc"])
@@ -1008,8 +1026,15 @@ def _slot_calendar(
     initial_slots: list[dict[str, object]] = []
     selected_value = ""
 
+    # One pass over the contiguous window instead of generate_slots per day
+    slots_by_day = generate_slots_range(
+        ap.service,
+        today_local,
+        today_local + dt.timedelta(days=max(0, days - 1)),
+        ignore_appointment_id=ap.id,
+    )
     for day in candidate_dates:
-        slots = _slot_options_for_date(ap, day, preferred=preferred)
+        slots = _slot_options_for_date(ap, day, preferred=preferred, raw_slots=slots_by_day.get(day))
         if not slots:
             continue
         available_dates.append(day)
@@ -1267,29 +1292,35 @@ def reschedule_approve(request, id):
         return HttpResponseBadRequest("Horário indisponível")
     owner_message = (request.POST.get("message") or "").strip()
     old_day_iso = None
-    with transaction.atomic():
-        req = RescheduleRequest.objects.select_for_update().get(id=req.id)
-        if req.status != "requested":
-            return HttpResponseBadRequest("Solicitação já tratada")
-        end_check = _validate_slot_choice(req, new_start)
-        if not end_check:
-            return HttpResponseBadRequest("Horário indisponível")
-        ap = req.appointment
-        ap_tz = _appointment_tz(ap)
-        old_start_local = ap.start_at_utc.astimezone(ap_tz)
-        old_day_iso = old_start_local.date().isoformat()
-        req.status = "approved"
-        req.owner_message = owner_message
-        req.approved_by = request.user
-        req.new_start_at_utc = new_start
-        req.new_end_at_utc = end_check
-        req.action_ip = _client_ip(request)
-        req.save()
-        ap.start_at_utc = new_start
-        ap.end_at_utc = end_check
-        ap.status = "confirmed"
-        ap.save(update_fields=["start_at_utc", "end_at_utc", "status", "updated_at"])
-        RescheduleRequest.objects.filter(appointment=ap, status="requested").exclude(id=req.id).update(status="expired")
+    try:
+        with transaction.atomic():
+            req = RescheduleRequest.objects.select_for_update().get(id=req.id)
+            if req.status != "requested":
+                return HttpResponseBadRequest("Solicitação já tratada")
+            end_check = _validate_slot_choice(req, new_start)
+            if not end_check:
+                return HttpResponseBadRequest("Horário indisponível")
+            ap = req.appointment
+            ap_tz = _appointment_tz(ap)
+            old_start_local = ap.start_at_utc.astimezone(ap_tz)
+            old_day_iso = old_start_local.date().isoformat()
+            req.status = "approved"
+            req.owner_message = owner_message
+            req.approved_by = request.user
+            req.new_start_at_utc = new_start
+            req.new_end_at_utc = end_check
+            req.action_ip = _client_ip(request)
+            req.save()
+            ap.start_at_utc = new_start
+            ap.end_at_utc = end_check
+            ap.status = "confirmed"
+            ap.save(update_fields=["start_at_utc", "end_at_utc", "status", "updated_at"])
+            RescheduleRequest.objects.filter(appointment=ap, status="requested").exclude(id=req.id).update(status="expired")
+    except IntegrityError as exc:
+        # Another booking took the time after the slot check
+        if not is_double_booking(exc):
+            raise
+        return HttpResponseBadRequest("Horário indisponível")
     _notify_customer_reschedule(req, "approved")
     trigger_payload: dict[str, object] = {
         "reschedule:reload": True,
@@ -6,3 +6,6 @@ class DeliveryConfig(AppConfig):
     name = "apps.delivery"
     verbose_name = "Delivery"
 
+    def ready(self):
+        # Import signals
+        from . import signals  # noqa: F401
@@ -0,0 +1,28 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.cards.page_cache import bump_content_rev
+from .models import MenuGroup, MenuItem, ModifierGroup, ModifierOption
+
+
+@receiver(post_save, sender=MenuGroup)
+@receiver(post_delete, sender=MenuGroup)
+@receiver(post_save, sender=MenuItem)
+@receiver(post_delete, sender=MenuItem)
+def menu_changed(sender, instance, **kwargs):
+    # The menu is part of the card's public page (apps.cards.page_cache)
+    bump_content_rev(instance.card_id)
+
+
+@receiver(post_save, sender=ModifierGroup)
+@receiver(post_delete, sender=ModifierGroup)
+def modifier_group_changed(sender, instance: ModifierGroup, **kwargs):
+    bump_content_rev(MenuItem.objects.filter(pk=instance.item_id).values_list("card_id", flat=True).first())
+
+
+@receiver(post_save, sender=ModifierOption)
+@receiver(post_delete, sender=ModifierOption)
+def modifier_option_changed(sender, instance: ModifierOption, **kwargs):
+    bump_content_rev(
+        ModifierGroup.objects.filter(pk=instance.modifier_group_id).values_list("item__card_id", flat=True).first()
+    )
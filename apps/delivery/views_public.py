@@ -20,11 +20,11 @@ import json, re, urllib.request
 #from apps.cards.views_public import _get_card_by_nickname
 from .models import MenuGroup, MenuItem, ModifierGroup, ModifierOption, Order, OrderItem, OrderItemOption, OrderItemText
 from apps.cards.models import Card, LinkButton, GalleryItem, SocialLink
-from apps.cards.markdown import has_about_content, sanitize_about_markdown
+from apps.cards import page_cache, resolver
+from apps.search.cep import lookup_cep, remember_cep
 
 def _get_card_by_nickname(nickname: str) -> Card:
-    q = Card.objects.filter(nickname__iexact=nickname, status="published", deactivation_marked=False)
-    return get_object_or_404(q)
+    return resolver.get_public_card(nickname)
 
 
 def _ensure_delivery_card(nickname: str):
@@ -36,21 +36,20 @@ def _ensure_delivery_card(nickname: str):
 
 @ensure_csrf_cookie
 def menu_home(request, nickname: str):
-    card = _ensure_delivery_card(nickname)
+    ref = resolver.resolve_public(nickname)
+    if ref.mode != "delivery":
+        raise Http404()
+    return page_cache.serve(request, ref, lambda extra: _render_menu_home(request, _ensure_delivery_card(nickname), extra))
+
+
+def _render_menu_home(request, card: Card, extra: dict):
     groups = (
         MenuGroup.objects.filter(card=card, is_active=True)
         .order_by("order", "created_at")
     )
     # Tabs order: menu, links, gallery (customizable)
-    about_html = ""
-    about_enabled = False
-    if has_about_content(card.about_markdown):
-        try:
-            about_html = sanitize_about_markdown(card.about_markdown or "")
-            about_enabled = bool(about_html.strip())
-        except ValueError:
-            about_html = ""
-            about_enabled = False
+    about_html = card.public_about_html()
+    about_enabled = bool(about_html.strip())
     allowed_base = ["menu", "links", "gallery"]
     if about_enabled:
         allowed_base.append("about")
@@ -80,7 +79,8 @@ def menu_home(request, nickname: str):
         share_description = f"Conheça o cartão digital de {card.title}."
     share_description = " ".join(share_description.split())
     share_description = share_description[:240]
-    share_url = request.build_absolute_uri()
+    # Canonical URL (no query string): the page is cached per card, not per URL
+    share_url = request.build_absolute_uri(request.path)
     avatar_field = card.avatar or card.avatar_w128 or card.avatar_w64
     if avatar_field and getattr(avatar_field, "name", None):
         share_image = request.build_absolute_uri(
@@ -104,6 +104,7 @@ def menu_home(request, nickname: str):
             "share_description": share_description,
             "share_url": share_url,
             "share_image": share_image,
+            **extra,
         },
     )
 
@@ -463,17 +464,23 @@ def cep_lookup_public(request, nickname: str):
     if not re.fullmatch(r"\d{8}", norm):
         ctx["error"] = "CEP inválido."
         return render(request, "public/_checkout_addr_fields.html", ctx)
+    record = lookup_cep(norm)
+    if record is not None and record.cidade:
+        ctx.update(record.address_parts())
+        return render(request, "public/_checkout_addr_fields.html", ctx)
     try:
         with urllib.request.urlopen(f"https://viacep.com.br/ws/{norm}/json/", timeout=4) as resp:
             raw = resp.read()
             jd = json.loads(raw.decode("utf-8"))
         if not jd.get("erro"):
-            ctx.update({
+            parts = {
                 "logradouro": jd.get("logradouro") or "",
                 "bairro": jd.get("bairro") or "",
                 "cidade": jd.get("localidade") or "",
                 "uf": (jd.get("uf") or "").upper(),
-            })
+            }
+            remember_cep(norm, **parts)
+            ctx.update(parts)
         else:
             ctx["error"] = "CEP não encontrado."
     except Exception:
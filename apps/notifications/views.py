@@ -10,24 +10,16 @@ from django.http import JsonResponse, HttpResponse, HttpResponseBadRequest, Http
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 from django.utils import timezone
-from django.core.cache import cache
 from django.db import IntegrityError
 
+from apps.common.rate_limit import check_rate_limits
+
 from .models import Notification
 from .tasks import send_notification, normalize_phone_e164
 
 log = logging.getLogger(__name__)
 
 
-def _rate_limit_key(prefix: str, key: str, window: str) -> str:
-    return f"notif:{prefix}:{key}:{window}"
-
-
-def _now_windows():
-    now = timezone.now()
-    return now.strftime("%Y%m%d%H%M"), now.strftime("%Y%m%d%H")
-
-
 @csrf_exempt
 @require_POST
 def api_create_notification(request):
@@ -58,20 +50,16 @@ def api_create_notification(request):
     except Exception:
         return HttpResponseBadRequest("invalid destination")
 
-    # Rate limit: 5 SMS/min, 50/h per destination
-    mm, hh = _now_windows()
-    k_min = _rate_limit_key("min", f"{typ}:{to}", mm)
-    k_hour = _rate_limit_key("hour", f"{typ}:{to}", hh)
-    min_count = cache.get_or_set(k_min, 0, timeout=70)
-    hour_count = cache.get_or_set(k_hour, 0, timeout=3600)
+    # Rate limit: 5 SMS/min, 50/h per destination (10/min, 200/h for email)
     if typ == "sms":
-        min_cap, hour_cap = 5, 50
+        rates = [(5, 60), (50, 3600)]
     else:
-        min_cap, hour_cap = 10, 200
-    if min_count >= min_cap or hour_count >= hour_cap:
-        return HttpResponse(status=429)
-    cache.incr(k_min)
-    cache.incr(k_hour)
+        rates = [(10, 60), (200, 3600)]
+    rl = check_rate_limits("notif", f"{typ}:{to}", rates)
+    if not rl.allowed:
+        response = HttpResponse(status=429)
+        response["Retry-After"] = str(rl.retry_after)
+        return response
 
     # Idempotency: if provided and exists, return existing
     if idem:
@@ -0,0 +1,124 @@
+"""ICS (RFC 5545) feed of an owner's appointments.
+
+Calendar clients poll the feed every few minutes, so the cheap path matters
+most: ``feed_etag`` is one aggregate query (count and latest ``updated_at`` of
+the appointments and their services) and an unchanged feed is answered with
+304 before anything is rendered. A changed feed is streamed from a keyset
+paginated queryset ordered by ``(start_at_utc, id)``, one chunk at a time.
+"""
+from __future__ import annotations
+
+import datetime as dt
+import hashlib
+from typing import Iterator
+
+from django.db.models import Count, Max, Q, QuerySet
+from django.utils import timezone
+
+from .models import BLOCKING_STATUSES, Appointment
+
+# Past appointments kept in the feed
+FEED_PAST_DAYS = 30
+FEED_CHUNK_SIZE = 500
+# Bump when the rendered output changes, so clients drop feeds cached by ETag
+FEED_FORMAT_VERSION = 1
+PRODID = "-//Cartão do New//Agenda//PT-BR"
+STATUS_MAP = {"pending": "TENTATIVE", "confirmed": "CONFIRMED"}
+
+
+def feed_queryset(owner_id) -> QuerySet:
+    since = timezone.now() - dt.timedelta(days=FEED_PAST_DAYS)
+    return Appointment.objects.filter(
+        owner_id=owner_id,
+        status__in=BLOCKING_STATUSES,
+        end_at_utc__gte=since,
+    )
+
+
+def feed_etag(qs: QuerySet) -> str:
+    """Strong ETag of the feed: changes with any insert, delete or update in it."""
+    agg = qs.aggregate(n=Count("id"), last=Max("updated_at"), service_last=Max("service__updated_at"))
+    raw = f"{FEED_FORMAT_VERSION}:{agg['n']}:{agg['last']}:{agg['service_last']}"
+    return '"%s"' % hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+def _escape(text: str) -> str:
+    return (
+        (text or "")
+        .replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def _fold(line: str) -> str:
+    """Fold a content line at 75 octets without splitting UTF-8 sequences."""
+    out = []
+    current = ""
+    size = 0
+    for ch in line:
+        width = len(ch.encode("utf-8"))
+        if size + width > 75:
+            out.append(current)
+            # Continuation lines start with a space, which counts toward the limit
+            current, size = " ", 1
+        current += ch
+        size += width
+    out.append(current)
+    return "\r\n".join(out) + "\r\n"
+
+
+def _utc(value: dt.datetime) -> str:
+    return value.astimezone(dt.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def render_event(ap: Appointment) -> str:
+    contact = " / ".join(x for x in (ap.user_phone, ap.user_email) if x)
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{ap.id}@agenda",
+        f"DTSTAMP:{_utc(ap.updated_at)}",
+        f"LAST-MODIFIED:{_utc(ap.updated_at)}",
+        f"DTSTART:{_utc(ap.start_at_utc)}",
+        f"DTEND:{_utc(ap.end_at_utc)}",
+        f"SUMMARY:{_escape(f'{ap.service.name} — {ap.user_name}')}",
+        f"DESCRIPTION:{_escape(f'Código {ap.public_code}. Contato: {contact}' if contact else f'Código {ap.public_code}')}",
+        f"STATUS:{STATUS_MAP.get(ap.status, 'CONFIRMED')}",
+        "END:VEVENT",
+    ]
+    return "".join(_fold(line) for line in lines)
+
+
+def _keyset_chunks(qs: QuerySet, size: int) -> Iterator[list[Appointment]]:
+    qs = qs.select_related("service").only(
+        "id", "service", "public_code", "user_name", "user_email", "user_phone", "status",
+        "start_at_utc", "end_at_utc", "updated_at", "service__name",
+    ).order_by("start_at_utc", "id")
+    last = None
+    while True:
+        page = qs
+        if last is not None:
+            page = qs.filter(Q(start_at_utc__gt=last[0]) | Q(start_at_utc=last[0], id__gt=last[1]))
+        chunk = list(page[:size])
+        if not chunk:
+            return
+        yield chunk
+        if len(chunk) < size:
+            return
+        last = (chunk[-1].start_at_utc, chunk[-1].id)
+
+
+def iter_feed(qs: QuerySet, *, name: str = "Agenda", chunk_size: int = FEED_CHUNK_SIZE) -> Iterator[str]:
+    yield "".join(_fold(line) for line in (
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{PRODID}",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{_escape(name)}",
+    ))
+    for chunk in _keyset_chunks(qs, chunk_size):
+        yield "".join(render_event(ap) for ap in chunk)
+    yield "END:VCALENDAR\r\n"
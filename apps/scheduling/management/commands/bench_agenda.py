@@ -0,0 +1,94 @@
+import datetime as dt
+import json
+import statistics
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.utils import timezone
+
+from apps.scheduling.models import BLOCKING_STATUSES, Appointment
+
+
+def _agenda_queries(lookup: dict, now: dt.datetime) -> dict:
+    """The agenda's hot queries, filtered by ``lookup`` (join or denormalized owner)."""
+    base = Appointment.objects.filter(**lookup)
+    return {
+        # Agenda da semana/mês: intervalo por início
+        "range": base.filter(
+            start_at_utc__gte=now - dt.timedelta(days=7), start_at_utc__lte=now + dt.timedelta(days=31)
+        ).order_by("start_at_utc").values("id", "start_at_utc", "end_at_utc"),
+        # Próximos ativos
+        "upcoming": base.filter(status__in=BLOCKING_STATUSES, start_at_utc__gte=now).order_by("start_at_utc")[:50],
+        # Contadores por status
+        "by_status": base.filter(start_at_utc__gte=now - dt.timedelta(days=31)).values("status").annotate(n=Count("id")),
+    }
+
+
+def _plan_nodes(node: dict):
+    yield node
+    for child in node.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+def _explain(qs, repeat: int) -> dict:
+    execution, planning = [], []
+    plan = None
+    for _ in range(max(1, repeat)):
+        raw = json.loads(qs.explain(analyze=True, format="json"))
+        entry = raw[0] if isinstance(raw, list) else raw
+        execution.append(entry["Execution Time"])
+        planning.append(entry["Planning Time"])
+        plan = entry["Plan"]
+    nodes = list(_plan_nodes(plan))
+    return {
+        "execution_ms": round(statistics.median(execution), 3),
+        "planning_ms": round(statistics.median(planning), 3),
+        "indexes": sorted({node["Index Name"] for node in nodes if "Index Name" in node}),
+        "seq_scans": sorted({node["Relation Name"] for node in nodes if node["Node Type"] == "Seq Scan"}),
+        "rows": plan.get("Actual Rows"),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara com EXPLAIN ANALYZE as consultas da agenda filtrando pelo dono via join "
+        "(serviço → cartão) e pela coluna desnormalizada Appointment.owner (requer Postgres)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="E-mail ou id do dono (padrão: quem tem mais agendamentos)")
+        parser.add_argument("--repeat", type=int, default=5, help="Execuções por consulta (mediana)")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("bench_agenda precisa de Postgres (EXPLAIN ANALYZE em JSON).")
+        owner_id = self._owner_id(options["user"])
+        now = timezone.now()
+        forms = {
+            "join": _agenda_queries({"service__card__owner_id": owner_id}, now),
+            "owner": _agenda_queries({"owner_id": owner_id}, now),
+        }
+        report = {"owner_id": str(owner_id), "repeat": options["repeat"], "queries": {}}
+        for name in forms["join"]:
+            before = _explain(forms["join"][name], options["repeat"])
+            after = _explain(forms["owner"][name], options["repeat"])
+            report["queries"][name] = {
+                "before": before,
+                "after": after,
+                "speedup": round(before["execution_ms"] / after["execution_ms"], 1) if after["execution_ms"] else None,
+            }
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def _owner_id(self, value):
+        if value:
+            User = get_user_model()
+            user = User.objects.filter(email=value).first() if "@" in value else User.objects.filter(pk=value).first()
+            if user is None:
+                raise CommandError(f"Usuário não encontrado: {value}")
+            return user.pk
+        top = Appointment.objects.values("owner_id").annotate(n=Count("id")).order_by("-n").first()
+        if top is None:
+            raise CommandError("Nenhum agendamento no banco.")
+        return top["owner_id"]
@@ -0,0 +1,106 @@
+import datetime as dt
+import json
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.scheduling.slots import _merge, _sweep_slots
+
+# Round-the-clock service: 288 five-minute starts per day
+OPEN_HOURS = 24
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[rank]
+
+
+def _scan_slots(windows, blocks, *, duration, before, after, min_start):
+    """Previous per-slot scan over every block, kept as the baseline."""
+    slots = []
+    for win_start, win_end in windows:
+        cursor = win_start
+        while cursor + duration <= win_end:
+            s = cursor
+            e = s + duration
+            claim_start = s - before
+            claim_end = e + after
+            if s >= min_start:
+                conflict = any(not (claim_end <= b0 or b1 <= claim_start) for b0, b1 in blocks)
+                if not conflict and claim_start >= win_start and claim_end <= win_end:
+                    slots.append((s, e))
+            cursor = cursor + duration
+    return slots
+
+
+class Command(BaseCommand):
+    help = (
+        "Micro-benchmark do cálculo de horários: serviço sintético com slots curtos e centenas de "
+        "agendamentos por dia, comparando a varredura antiga com o sweep-line (sem banco)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=50, help="Dias sintéticos avaliados")
+        parser.add_argument("--bookings", type=int, default=200, help="Agendamentos por dia")
+        parser.add_argument("--duration", type=int, default=5, help="Duração do slot em minutos")
+        parser.add_argument("--buffer", type=int, default=0, help="Buffer antes/depois em minutos")
+        parser.add_argument("--windows", type=int, default=3, help="Janelas de atendimento por dia")
+        parser.add_argument("--seed", type=int, default=42, help="Semente do gerador")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        duration = dt.timedelta(minutes=max(1, options["duration"]))
+        buffer = dt.timedelta(minutes=max(0, options["buffer"]))
+        days = [
+            self._synthetic_day(rng, day, options["windows"], options["bookings"], duration, buffer)
+            for day in range(max(1, options["days"]))
+        ]
+        min_start = dt.datetime(2000, 1, 1, tzinfo=dt.timezone.utc)
+        kwargs = {"duration": duration, "before": buffer, "after": buffer, "min_start": min_start}
+
+        report = {
+            "days": len(days),
+            "bookings_per_day": options["bookings"],
+            "duration_min": int(duration.total_seconds() // 60),
+            "engines": {},
+        }
+        results = {}
+        for name, engine in (("scan", _scan_slots), ("sweep", _sweep_slots)):
+            samples = []
+            slots = []
+            for windows, blocks in days:
+                started = time.perf_counter()
+                slots.append(engine(windows, blocks, **kwargs))
+                samples.append((time.perf_counter() - started) * 1000.0)
+            results[name] = slots
+            report["engines"][name] = {
+                "p50_ms": round(_percentile(samples, 50), 3),
+                "p95_ms": round(_percentile(samples, 95), 3),
+                "mean_ms": round(statistics.fmean(samples), 3),
+                "slots": sum(len(day) for day in slots),
+            }
+        report["identical"] = results["scan"] == results["sweep"]
+        scan, sweep = report["engines"]["scan"]["mean_ms"], report["engines"]["sweep"]["mean_ms"]
+        report["speedup"] = round(scan / sweep, 1) if sweep else None
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def _synthetic_day(self, rng: random.Random, offset: int, window_count: int, bookings: int, duration, buffer):
+        open_at = dt.datetime.combine(dt.date(2030, 1, 1) + dt.timedelta(days=offset), dt.time.min, tzinfo=dt.timezone.utc)
+        close_at = open_at + dt.timedelta(hours=OPEN_HOURS)
+        span = (close_at - open_at) / max(1, window_count)
+        # Windows separated by short breaks
+        windows = _merge(
+            (open_at + span * i, open_at + span * (i + 1) - dt.timedelta(minutes=15)) for i in range(max(1, window_count))
+        )
+        # Bookings land on the slot grid, one or two slots long
+        grid = int((close_at - open_at) / duration)
+        blocks = []
+        for position in rng.sample(range(grid), min(bookings, grid)):
+            start = open_at + duration * position
+            blocks.append((start - buffer, start + duration * rng.choice([1, 1, 2]) + buffer))
+        return windows, _merge(blocks)
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.scheduling import overlaps
+from apps.scheduling.models import Appointment
+
+
+class Command(BaseCommand):
+    help = (
+        "Lista agendamentos ativos (pendentes/confirmados) cujos intervalos com buffers se sobrepõem "
+        "no mesmo serviço, o que impede a constraint scheduling_appointment_no_overlap (migração 0007). "
+        "Com --cancel, cancela o agendamento feito depois em cada conflito, como a migração faria."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--cancel", action="store_true", help="Cancela os agendamentos posteriores em conflito")
+
+    def handle(self, *args, **options):
+        clashes = overlaps.plan(Appointment)
+        if not clashes:
+            self.stdout.write(self.style.SUCCESS("Nenhuma sobreposição entre agendamentos ativos."))
+            return
+        codes = dict(
+            Appointment.objects.filter(
+                pk__in=[c.cancelled_id for c in clashes] + [c.kept_id for c in clashes]
+            ).values_list("pk", "public_code")
+        )
+        for clash in clashes:
+            self.stdout.write(
+                f"serviço {clash.service_id}: {codes.get(clash.cancelled_id)} sobrepõe {codes.get(clash.kept_id)} (anterior)"
+            )
+        if not options["cancel"]:
+            raise CommandError(
+                f"{len(clashes)} agendamentos em conflito; rode com --cancel ou resolva-os antes de migrar."
+            )
+        cancelled = overlaps.cancel(Appointment, clashes)
+        self.stdout.write(self.style.SUCCESS(f"{cancelled} agendamentos cancelados."))
@@ -0,0 +1,44 @@
+# Generated manually: compiled weekly availability bitmap on SchedulingService
+from django.db import migrations, models
+
+MINUTES_PER_DAY = 24 * 60
+BITMAP_BYTES = 7 * MINUTES_PER_DAY // 8
+
+
+def _compile(rules):
+    bits = bytearray(BITMAP_BYTES)
+    for rule in rules:
+        if rule.weekday is None or not 0 <= rule.weekday <= 6 or not (rule.start_time and rule.end_time):
+            continue
+        if rule.start_time.second or rule.start_time.microsecond or rule.end_time.second or rule.end_time.microsecond:
+            return None
+        start = rule.start_time.hour * 60 + rule.start_time.minute
+        end = rule.end_time.hour * 60 + rule.end_time.minute
+        base = rule.weekday * MINUTES_PER_DAY
+        for minute in range(base + start, base + end):
+            bits[minute >> 3] |= 1 << (minute & 7)
+    return bytes(bits)
+
+
+def compile_bitmaps(apps, schema_editor):
+    SchedulingService = apps.get_model("scheduling", "SchedulingService")
+    ServiceAvailability = apps.get_model("scheduling", "ServiceAvailability")
+    for service_id in SchedulingService.objects.values_list("pk", flat=True).iterator():
+        rules = ServiceAvailability.objects.filter(service_id=service_id, rule_type="weekly")
+        SchedulingService.objects.filter(pk=service_id).update(availability_bitmap=_compile(rules))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scheduling", "0004_serviceoption_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="schedulingservice",
+            name="availability_bitmap",
+            field=models.BinaryField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(compile_bitmaps, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated manually: buffered claim interval on Appointment
+import datetime as dt
+
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import migrations, models
+
+
+def fill_claims(apps, schema_editor):
+    SchedulingService = apps.get_model("scheduling", "SchedulingService")
+    Appointment = apps.get_model("scheduling", "Appointment")
+    for service_id, before, after in SchedulingService.objects.values_list("pk", "buffer_before", "buffer_after").iterator():
+        Appointment.objects.filter(service_id=service_id).update(
+            claim_start_utc=models.F("start_at_utc") - dt.timedelta(minutes=before),
+            claim_end_utc=models.F("end_at_utc") + dt.timedelta(minutes=after),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scheduling", "0005_schedulingservice_availability_bitmap"),
+    ]
+
+    operations = [
+        # "=" on the service uuid inside a GiST exclusion constraint
+        BtreeGistExtension(),
+        migrations.AddField(
+            model_name="appointment",
+            name="claim_start_utc",
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="appointment",
+            name="claim_end_utc",
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.RunPython(fill_claims, migrations.RunPython.noop),
+    ]
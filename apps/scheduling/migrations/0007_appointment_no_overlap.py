@@ -0,0 +1,87 @@
+# Generated manually: exclusion constraint against double booking
+import logging
+from collections import defaultdict
+
+import apps.scheduling.models
+import django.contrib.postgres.constraints
+import django.contrib.postgres.fields.ranges
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+log = logging.getLogger(__name__)
+
+BLOCKING_STATUSES = ("pending", "confirmed")
+
+
+def cancel_overlapping_claims(apps, schema_editor):
+    # Existing clashes would abort AddConstraint: per service, in booking order, a claim
+    # overlapping one already kept is cancelled (a frozen copy of apps.scheduling.overlaps;
+    # `manage.py check_booking_overlaps` lists them beforehand)
+    Appointment = apps.get_model("scheduling", "Appointment")
+    blocking = Appointment.objects.filter(status__in=BLOCKING_STATUSES)
+    other = blocking.filter(
+        service_id=OuterRef("service_id"),
+        claim_start_utc__lt=OuterRef("claim_end_utc"),
+        claim_end_utc__gt=OuterRef("claim_start_utc"),
+    ).exclude(pk=OuterRef("pk"))
+    rows = (
+        blocking.filter(Exists(other))
+        .order_by("service_id", "created_at", "pk")
+        .values_list("pk", "service_id", "claim_start_utc", "claim_end_utc")
+    )
+    by_service = defaultdict(list)
+    for pk, service_id, start, end in rows.iterator():
+        by_service[service_id].append((pk, start, end))
+
+    cancelled = []
+    for service_id, claims in by_service.items():
+        kept = []
+        for pk, start, end in claims:
+            hit = next((k for k in kept if start < k[2] and end > k[1]), None)
+            if hit is None:
+                kept.append((pk, start, end))
+                continue
+            log.warning("cancelling appointment %s: overlaps %s on service %s", pk, hit[0], service_id)
+            cancelled.append(pk)
+    if cancelled:
+        Appointment.objects.filter(pk__in=cancelled).update(status="cancelled", updated_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scheduling", "0006_appointment_claim"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="appointment",
+            name="claim_start_utc",
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AlterField(
+            model_name="appointment",
+            name="claim_end_utc",
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.RunPython(cancel_overlapping_claims, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="appointment",
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(
+                condition=models.Q(("status__in", ("pending", "confirmed"))),
+                expressions=[
+                    ("service", "="),
+                    (
+                        apps.scheduling.models.TsTzRange(
+                            "claim_start_utc",
+                            "claim_end_utc",
+                            django.contrib.postgres.fields.ranges.RangeBoundary(),
+                        ),
+                        "&&",
+                    ),
+                ],
+                name="scheduling_appointment_no_overlap",
+            ),
+        ),
+    ]
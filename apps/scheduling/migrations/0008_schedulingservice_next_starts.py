@@ -0,0 +1,22 @@
+# Generated manually: precomputed next free starts on SchedulingService
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scheduling", "0007_appointment_no_overlap"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="schedulingservice",
+            name="next_starts",
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.AddField(
+            model_name="schedulingservice",
+            name="next_starts_at",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated manually: denormalized owner on Appointment, backfilled in batches
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+BATCH_SIZE = 2000
+
+
+def fill_owner(apps, schema_editor):
+    Appointment = apps.get_model("scheduling", "Appointment")
+    SchedulingService = apps.get_model("scheduling", "SchedulingService")
+    owner_of_service = SchedulingService.objects.filter(pk=models.OuterRef("service_id")).values("card__owner_id")[:1]
+    while True:
+        # Non-atomic migration: every batch commits on its own, so locks stay short
+        ids = list(Appointment.objects.filter(owner__isnull=True).values_list("pk", flat=True)[:BATCH_SIZE])
+        if not ids:
+            break
+        Appointment.objects.filter(pk__in=ids).update(owner_id=models.Subquery(owner_of_service))
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("scheduling", "0009_calendarfeed"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="appointment",
+            name="owner",
+            field=models.ForeignKey(
+                db_index=False,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.RunPython(fill_owner, migrations.RunPython.noop),
+    ]
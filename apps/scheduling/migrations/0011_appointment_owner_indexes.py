@@ -0,0 +1,37 @@
+# Generated manually: owner NOT NULL and the agenda indexes, built concurrently
+import django.db.models.deletion
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("scheduling", "0010_appointment_owner"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="appointment",
+            name="owner",
+            field=models.ForeignKey(
+                db_index=False,
+                editable=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="appointment",
+            index=models.Index(fields=["owner", "start_at_utc"], include=["end_at_utc"], name="sched_appt_owner_start_idx"),
+        ),
+        AddIndexConcurrently(
+            model_name="appointment",
+            index=models.Index(fields=["owner", "status", "start_at_utc"], name="sched_appt_owner_status_idx"),
+        ),
+    ]
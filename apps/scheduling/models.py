@@ -1,5 +1,10 @@
+import datetime as dt
+import secrets
 import uuid
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import DateTimeRangeField, RangeBoundary, RangeOperators
 from django.db import models
+from django.db.models import Func, Q
 from django.conf import settings
 from django.core.validators import MinValueValidator
 from django.utils import timezone
@@ -23,6 +28,11 @@ class SchedulingService(BaseModel):
     cancel_min = models.PositiveIntegerField(default=0)
     resched_min = models.PositiveIntegerField(default=0)
     is_active = models.BooleanField(default=True)
+    # Weekly availability compiled by apps.scheduling.bitmaps (rebuilt by signal)
+    availability_bitmap = models.BinaryField(blank=True, null=True, editable=False)
+    # Next free starts (UTC ISO strings) kept by apps.scheduling.next_slots
+    next_starts = models.JSONField(default=list, blank=True, editable=False)
+    next_starts_at = models.DateTimeField(null=True, blank=True, editable=False)
 
     class Meta:
         indexes = [models.Index(fields=["card", "is_active"])]
@@ -78,6 +88,25 @@ class CustomForm(BaseModel):
     schema_json = models.JSONField(default=dict)
 
 
+class TsTzRange(Func):
+    function = "TSTZRANGE"
+    output_field = DateTimeRangeField()
+
+
+class LocalDate(Func):
+    """Date of a timestamptz in a per-row timezone name: ``(ts AT TIME ZONE tz)::date``."""
+
+    arg_joiner = " AT TIME ZONE "
+    template = "(%(expressions)s)::date"
+    output_field = models.DateField()
+
+
+# Statuses that hold their time; only these take part in the overlap constraint
+BLOCKING_STATUSES = ("pending", "confirmed")
+CLAIM_FIELDS = frozenset({"start_at_utc", "end_at_utc"})
+OVERLAP_CONSTRAINT = "scheduling_appointment_no_overlap"
+
+
 class Appointment(BaseModel):
     STATUS_CHOICES = [
         ("pending", "Pending"),
@@ -88,6 +117,10 @@ class Appointment(BaseModel):
     LOC_CHOICES = [("local", "Local"), ("remote", "Remote"), ("onsite", "Onsite")]
 
     service = models.ForeignKey(SchedulingService, on_delete=models.CASCADE)
+    # service.card.owner, denormalized so the agenda filters without joining services and cards
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+", editable=False, db_index=False
+    )
     user_name = models.CharField(max_length=120)
     user_email = models.EmailField()
     user_phone = models.CharField(max_length=40, blank=True)
@@ -103,16 +136,48 @@ class Appointment(BaseModel):
     price_cents = models.IntegerField(default=0, validators=[MinValueValidator(0)])
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
     token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    # Buffered interval [start - buffer_before, end + buffer_after); upcoming ones follow buffer changes
+    claim_start_utc = models.DateTimeField(editable=False)
+    claim_end_utc = models.DateTimeField(editable=False)
 
     class Meta:
         indexes = [
             models.Index(fields=["service", "start_at_utc"]),
             models.Index(fields=["status"]),
+            # Agenda range scans; end_at_utc included for the overlap filter
+            models.Index(fields=["owner", "start_at_utc"], include=["end_at_utc"], name="sched_appt_owner_start_idx"),
+            models.Index(fields=["owner", "status", "start_at_utc"], name="sched_appt_owner_status_idx"),
+        ]
+        constraints = [
+            # Same overlap rule as slots._conflicts: claims sharing any instant collide
+            ExclusionConstraint(
+                name=OVERLAP_CONSTRAINT,
+                expressions=[
+                    ("service", RangeOperators.EQUAL),
+                    (TsTzRange("claim_start_utc", "claim_end_utc", RangeBoundary()), RangeOperators.OVERLAPS),
+                ],
+                condition=Q(status__in=BLOCKING_STATUSES),
+            ),
         ]
 
+    def set_claim(self) -> None:
+        service = self.service
+        self.claim_start_utc = self.start_at_utc - dt.timedelta(minutes=service.buffer_before)
+        self.claim_end_utc = self.end_at_utc + dt.timedelta(minutes=service.buffer_after)
+
     def save(self, *args, **kwargs):
         from apps.common.codes import generate_unique_code
 
+        if self.owner_id is None:
+            self.owner_id = (
+                SchedulingService.objects.filter(pk=self.service_id).values_list("card__owner_id", flat=True).first()
+            )
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or CLAIM_FIELDS & set(update_fields):
+            self.set_claim()
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "claim_start_utc", "claim_end_utc"}
+
         if not self.public_code:
             def _exists(code: str) -> bool:
                 qs = type(self).objects.filter(public_code=f"A{code}")
@@ -152,3 +217,14 @@ class RescheduleRequest(BaseModel):
         indexes = [
             models.Index(fields=["appointment", "status", "created_at"]),
         ]
+
+
+def _feed_token() -> str:
+    return secrets.token_urlsafe(24)
+
+
+class CalendarFeed(BaseModel):
+    """Tokenized ICS feed of an owner's appointments (see apps.scheduling.ics)."""
+
+    owner = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="calendar_feed")
+    token = models.CharField(max_length=64, unique=True, default=_feed_token)
@@ -0,0 +1,103 @@
+"""Precomputed "next available starts" of each service.
+
+``SchedulingService.next_starts`` keeps the next ``NEXT_STARTS_COUNT`` free
+starts (UTC ISO strings) so the services tab can show "próximo horário" for
+every service without generating slots per request. A Celery beat job
+(``tasks.refresh_next_starts``) recomputes them; in between, the signals keep
+the list honest:
+
+- a new or moved blocking appointment drops the starts it conflicts with,
+  right away, in the database;
+- a freed time (cancellation, reschedule, deletion) or a rules change can
+  open earlier starts, which only a recompute finds, so that service's
+  refresh is queued after commit.
+
+Reads drop starts that are already inside the lead time.
+"""
+from __future__ import annotations
+
+import datetime as dt
+import logging
+from zoneinfo import ZoneInfo
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import SchedulingService
+from .slots import _min_start, generate_slots_range
+
+NEXT_STARTS_COUNT = 5
+NEXT_STARTS_HORIZON_DAYS = 60
+# Days computed per generate_slots_range call while looking ahead
+SCAN_CHUNK_DAYS = 7
+
+log = logging.getLogger(__name__)
+
+
+def compute_next_starts(service: SchedulingService, *, count: int = NEXT_STARTS_COUNT) -> list[str]:
+    """First ``count`` bookable starts within the horizon, earliest first."""
+    min_start = _min_start(service)
+    tz = ZoneInfo(service.timezone or "UTC")
+    first_day = min_start.astimezone(tz).date()
+    last_day = first_day + dt.timedelta(days=NEXT_STARTS_HORIZON_DAYS)
+    starts: list[str] = []
+    day = first_day
+    while day <= last_day and len(starts) < count:
+        chunk_end = min(last_day, day + dt.timedelta(days=SCAN_CHUNK_DAYS - 1))
+        for slots in generate_slots_range(service, day, chunk_end).values():
+            starts.extend(slot["start_at_utc"] for slot in slots)
+            if len(starts) >= count:
+                break
+        day = chunk_end + dt.timedelta(days=1)
+    return starts[:count]
+
+
+def refresh_next_starts(service: SchedulingService) -> list[str]:
+    starts = compute_next_starts(service) if service.is_active else []
+    # update() so refreshing never fires SchedulingService save signals
+    SchedulingService.objects.filter(pk=service.pk).update(next_starts=starts, next_starts_at=timezone.now())
+    return starts
+
+
+def schedule_refresh(service_id) -> None:
+    """Queue a recompute after commit; best effort, the beat job catches up anyway."""
+    from .tasks import refresh_next_starts as refresh_task
+
+    def _dispatch():
+        try:
+            refresh_task.delay(str(service_id))
+        except Exception as exc:
+            log.warning("failed to queue next_starts refresh for %s: %s", service_id, exc)
+
+    transaction.on_commit(_dispatch)
+
+
+def drop_conflicting_starts(service: SchedulingService, start: dt.datetime, end: dt.datetime) -> None:
+    """Remove the stored starts a blocking appointment over ``[start, end)`` rules out.
+
+    Same overlap rule as ``slots._conflicts``: the candidate's claim
+    ``[s - before, s + duration + after)`` against the appointment expanded by
+    the buffers. A shortened list is topped up by a queued refresh.
+    """
+    stored = SchedulingService.objects.filter(pk=service.pk).values_list("next_starts", flat=True).first()
+    if not stored:
+        return
+    before = dt.timedelta(minutes=service.buffer_before)
+    after = dt.timedelta(minutes=service.buffer_after)
+    duration = dt.timedelta(minutes=service.duration_minutes)
+    block_start, block_end = start - before, end + after
+    kept = []
+    for iso in stored:
+        s = dt.datetime.fromisoformat(iso)
+        if not (block_start < s + duration + after and s - before < block_end):
+            kept.append(iso)
+    if len(kept) != len(stored):
+        SchedulingService.objects.filter(pk=service.pk).update(next_starts=kept)
+        schedule_refresh(service.pk)
+
+
+def upcoming_starts(service: SchedulingService) -> list[dt.datetime]:
+    """Stored starts still bookable now (outside the lead time)."""
+    min_start = _min_start(service)
+    starts = (dt.datetime.fromisoformat(iso) for iso in service.next_starts or [])
+    return [s for s in starts if s >= min_start]
@@ -0,0 +1,109 @@
+"""Blocking appointments whose claims overlap on the same service.
+
+The ``scheduling_appointment_no_overlap`` constraint rejects them, but rows
+written before it can hold such pairs: the old slot check used UTC-day
+bounds and raced check-then-insert. Migration 0007 resolves them before
+adding the constraint; ``manage.py check_booking_overlaps`` lists them (and
+can resolve them) first.
+
+Resolution: per service, in booking order (``created_at``, then pk), a
+claim that overlaps one already kept is cancelled, so the first booking of
+a clash always stays. Migration 0007 carries its own copy of this, so
+changes here do not rewrite history.
+
+Claims follow the service's buffers: ``refresh_claims`` recomputes them when
+the buffers change, and ``widening_clashes`` finds the bookings that wider
+buffers would make overlap, which the buffer change is refused for.
+"""
+from __future__ import annotations
+
+import datetime as dt
+from collections import defaultdict
+from typing import NamedTuple
+
+from django.db.models import Exists, F, OuterRef, Q
+from django.utils import timezone
+
+from . import next_slots, slot_cache
+from .models import BLOCKING_STATUSES
+
+
+class Clash(NamedTuple):
+    cancelled_id: object
+    kept_id: object
+    service_id: object
+
+
+def overlapping(Appointment):
+    """Blocking appointments that overlap at least one other blocking claim of their service."""
+    other = Appointment.objects.filter(
+        status__in=BLOCKING_STATUSES,
+        service_id=OuterRef("service_id"),
+        # [start, end) ranges, as in the constraint
+        claim_start_utc__lt=OuterRef("claim_end_utc"),
+        claim_end_utc__gt=OuterRef("claim_start_utc"),
+    ).exclude(pk=OuterRef("pk"))
+    return Appointment.objects.filter(Q(status__in=BLOCKING_STATUSES), Exists(other))
+
+
+def plan(Appointment) -> list[Clash]:
+    """Which appointments to cancel, each with the earlier booking it clashes with."""
+    by_service = defaultdict(list)
+    rows = (
+        overlapping(Appointment)
+        .order_by("service_id", "created_at", "pk")
+        .values_list("pk", "service_id", "claim_start_utc", "claim_end_utc")
+    )
+    for pk, service_id, start, end in rows.iterator():
+        by_service[service_id].append((pk, start, end))
+
+    clashes = []
+    for service_id, claims in by_service.items():
+        kept = []
+        for pk, start, end in claims:
+            hit = next((k for k in kept if start < k[2] and end > k[1]), None)
+            if hit is None:
+                kept.append((pk, start, end))
+            else:
+                clashes.append(Clash(pk, hit[0], service_id))
+    return clashes
+
+
+def cancel(Appointment, clashes: list[Clash]) -> int:
+    # update(): no signals, so no cancellation notices go out for rows that were never valid
+    cancelled = Appointment.objects.filter(pk__in=[clash.cancelled_id for clash in clashes]).update(
+        # Calendar feeds key their ETag on updated_at
+        status="cancelled", updated_at=timezone.now()
+    )
+    # ...and no cache invalidation either: the freed time shows up in slots again
+    for service_id in {clash.service_id for clash in clashes}:
+        slot_cache.bump_service(service_id)
+        next_slots.schedule_refresh(service_id)
+    return cancelled
+
+
+def _upcoming(Appointment, service_id):
+    # Claims that can still block a booking
+    return Appointment.objects.filter(
+        service_id=service_id, status__in=BLOCKING_STATUSES, claim_end_utc__gt=timezone.now()
+    )
+
+
+def widening_clashes(Appointment, service_id, buffer_before: int, buffer_after: int):
+    """Upcoming blocking appointments whose claims would overlap with these buffers."""
+    pad = dt.timedelta(minutes=buffer_before + buffer_after)
+    upcoming = _upcoming(Appointment, service_id)
+    # [start - before, end + after) ranges overlap iff the bare ones come closer than before + after
+    other = upcoming.filter(
+        start_at_utc__lt=OuterRef("end_at_utc") + pad,
+        end_at_utc__gt=OuterRef("start_at_utc") - pad,
+    ).exclude(pk=OuterRef("pk"))
+    return upcoming.filter(Exists(other))
+
+
+def refresh_claims(Appointment, service) -> int:
+    """Recompute the upcoming claims of ``service`` from its current buffers, in one UPDATE."""
+    return _upcoming(Appointment, service.pk).update(
+        claim_start_utc=F("start_at_utc") - dt.timedelta(minutes=service.buffer_before),
+        claim_end_utc=F("end_at_utc") + dt.timedelta(minutes=service.buffer_after),
+    )
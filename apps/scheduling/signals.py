@@ -1,6 +1,10 @@
-from django.db.models.signals import post_save, pre_save
+from django.core.exceptions import ValidationError
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
-from .models import Appointment
+from . import next_slots, overlaps, slot_cache
+from .bitmaps import rebuild_availability_bitmap
+from .models import BLOCKING_STATUSES, Appointment, SchedulingService, ServiceAvailability
+from apps.cards.models import Card
 from apps.metering.utils import create_event
 from django.db import transaction
 from apps.notifications.api import enqueue, Enqueue, enqueue_many
@@ -52,3 +56,107 @@ def appointment_confirmed_event(sender, instance: Appointment, **kwargs):
             transaction.on_commit(_dispatch)
         except Exception:
             _dispatch()
+
+
+@receiver(post_save, sender=ServiceAvailability)
+@receiver(post_delete, sender=ServiceAvailability)
+def availability_changed(sender, instance: ServiceAvailability, **kwargs):
+    rebuild_availability_bitmap(instance.service_id)
+    slot_cache.bump_service(instance.service_id)
+    next_slots.schedule_refresh(instance.service_id)
+
+
+def _fk_before(model, instance, field: str, update_fields) -> tuple[bool, object]:
+    """``(known, id)`` of the foreign key ``field`` in the row before this save; unknown when it is not written."""
+    if instance._state.adding or not instance.pk:
+        return False, None
+    if update_fields is not None and not {field, f"{field}_id"} & set(update_fields):
+        return False, None
+    return True, model.objects.filter(pk=instance.pk).values_list(f"{field}_id", flat=True).first()
+
+
+BUFFER_FIELDS = ("buffer_before", "buffer_after")
+
+
+def _buffers_before(instance: SchedulingService, update_fields) -> tuple[int, int] | None:
+    if instance._state.adding or not instance.pk:
+        return None
+    if update_fields is not None and not set(BUFFER_FIELDS) & set(update_fields):
+        return None
+    return SchedulingService.objects.filter(pk=instance.pk).values_list(*BUFFER_FIELDS).first()
+
+
+@receiver(pre_save, sender=SchedulingService)
+def service_remember_card(sender, instance: SchedulingService, update_fields=None, **kwargs):
+    instance._card_before = _fk_before(SchedulingService, instance, "card", update_fields)
+    before = instance._buffers_before = _buffers_before(instance, update_fields)
+    if before is not None and (instance.buffer_before > before[0] or instance.buffer_after > before[1]):
+        # Wider claims for booked appointments would trip the overlap constraint: refuse before writing
+        if overlaps.widening_clashes(Appointment, instance.pk, instance.buffer_before, instance.buffer_after).exists():
+            raise ValidationError("Os novos intervalos entre atendimentos sobrepõem agendamentos já marcados.")
+
+
+@receiver(post_save, sender=SchedulingService)
+@receiver(post_delete, sender=SchedulingService)
+def service_changed(sender, instance: SchedulingService, **kwargs):
+    slot_cache.bump_service(instance.pk)
+    if kwargs.get("signal") is post_save:
+        next_slots.schedule_refresh(instance.pk)
+        # Keep the denormalized Appointment.owner in step if the service moved to another card
+        known, card_before = getattr(instance, "_card_before", (False, None))
+        if known and card_before != instance.card_id:
+            Appointment.objects.filter(service=instance).exclude(owner_id=instance.card.owner_id).update(
+                owner_id=instance.card.owner_id
+            )
+        # Claims were computed with the old buffers: a narrower buffer frees that time for new bookings
+        before = getattr(instance, "_buffers_before", None)
+        if before is not None and before != (instance.buffer_before, instance.buffer_after):
+            overlaps.refresh_claims(Appointment, instance)
+
+
+@receiver(pre_save, sender=Card)
+def card_remember_owner(sender, instance: Card, update_fields=None, **kwargs):
+    instance._owner_before = _fk_before(Card, instance, "owner", update_fields)
+
+
+@receiver(post_save, sender=Card)
+def card_owner_changed(sender, instance: Card, created=False, **kwargs):
+    # Every content edit saves the card: only a real owner change touches the appointments
+    known, owner_before = getattr(instance, "_owner_before", (False, None))
+    if created or not known or owner_before == instance.owner_id:
+        return
+    Appointment.objects.filter(service__card=instance).exclude(owner_id=instance.owner_id).update(owner_id=instance.owner_id)
+
+
+@receiver(pre_save, sender=Appointment)
+def appointment_remember_slot(sender, instance: Appointment, **kwargs):
+    # (start, end, status) before the save: a reschedule or a cancellation frees that time
+    instance._slot_before = None
+    if instance.pk and not instance._state.adding:
+        instance._slot_before = (
+            Appointment.objects.filter(pk=instance.pk).values_list("start_at_utc", "end_at_utc", "status").first()
+        )
+
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+def appointment_slots_changed(sender, instance: Appointment, **kwargs):
+    before = getattr(instance, "_slot_before", None)
+    dates = slot_cache.touched_dates(instance.start_at_utc, instance.end_at_utc)
+    if before:
+        dates |= slot_cache.touched_dates(before[0], before[1])
+    slot_cache.bump_dates(instance.service_id, dates)
+
+    interval = (instance.start_at_utc, instance.end_at_utc)
+    was_blocking = bool(before) and before[2] in BLOCKING_STATUSES
+    moved = bool(before) and (before[0], before[1]) != interval
+    if kwargs.get("signal") is post_delete:
+        blocking = False
+        freed = instance.status in BLOCKING_STATUSES
+    else:
+        blocking = instance.status in BLOCKING_STATUSES
+        freed = was_blocking and (moved or not blocking)
+    if blocking and (not was_blocking or moved):
+        next_slots.drop_conflicting_starts(instance.service, *interval)
+    if freed:
+        next_slots.schedule_refresh(instance.service_id)
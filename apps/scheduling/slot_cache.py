@@ -0,0 +1,131 @@
+"""Versioned cache of computed day slots.
+
+A day's slots are cached per ``(service_id, local_date)`` under two version
+counters: one per service, bumped when the ``SchedulingService`` or any of its
+``ServiceAvailability`` rules change, and one per service/date, bumped when an
+``Appointment`` touching that date is saved or deleted. Stale entries are never
+deleted, they just stop being addressed and expire.
+
+Entries hold the day's slots *before* the ``lead_time_min`` cut-off, which
+``slots.generate_slots_range`` applies after reading, so they stay valid as the
+clock moves.
+"""
+from __future__ import annotations
+
+import datetime as dt
+import time
+from typing import Iterable
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+SERVICE_VERSION_KEY = "sched:slots:v:{service_id}"
+DATE_VERSION_KEY = "sched:slots:v:{service_id}:{date}"
+ENTRY_KEY = "sched:slots:{service_id}:{date}:{ignore}:{service_version}.{date_version}"
+DEFAULT_SLOT_CACHE_TIMEOUT = 6 * 60 * 60
+
+Slots = list[tuple[dt.datetime, dt.datetime]]
+
+
+def slot_cache_enabled() -> bool:
+    return bool(getattr(settings, "SCHEDULING_SLOT_CACHE_ENABLED", False))
+
+
+def _timeout() -> int:
+    return int(getattr(settings, "SCHEDULING_SLOT_CACHE_TIMEOUT", DEFAULT_SLOT_CACHE_TIMEOUT))
+
+
+def _seed() -> int:
+    # A timestamp, so a version that was evicted never reuses old entry keys.
+    return int(time.time() * 1000)
+
+
+def _service_version_key(service_id) -> str:
+    return SERVICE_VERSION_KEY.format(service_id=service_id)
+
+
+def _date_version_key(service_id, date: dt.date) -> str:
+    return DATE_VERSION_KEY.format(service_id=service_id, date=date.isoformat())
+
+
+def _versions(timeouts: dict[str, int | None]) -> dict[str, int]:
+    """Current value of each version counter, seeding missing ones with their timeout."""
+    keys = list(timeouts)
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        seed = _seed()
+        for key in missing:
+            cache.add(key, seed, timeout=timeouts[key])
+        found.update(cache.get_many(missing))
+    return {key: int(found.get(key) or 0) for key in keys}
+
+
+def entry_keys(service_id, dates: list[dt.date], ignore_appointment_id=None) -> dict[dt.date, str]:
+    """Current entry key of each date; seeds the version counters it needs."""
+    service_key = _service_version_key(service_id)
+    date_keys = {date: _date_version_key(service_id, date) for date in dates}
+    # Date counters only need to outlive the entries they address
+    versions = _versions({service_key: None, **{key: _timeout() for key in date_keys.values()}})
+    return {
+        date: ENTRY_KEY.format(
+            service_id=service_id,
+            date=date.isoformat(),
+            ignore=ignore_appointment_id or "-",
+            service_version=versions[service_key],
+            date_version=versions[key],
+        )
+        for date, key in date_keys.items()
+    }
+
+
+def get_days(keys: dict[dt.date, str]) -> dict[dt.date, Slots]:
+    found = cache.get_many(list(keys.values()))
+    return {date: found[key] for date, key in keys.items() if key in found}
+
+
+def set_days(keys: dict[dt.date, str], days: dict[dt.date, Slots]) -> None:
+    if days:
+        cache.set_many({keys[date]: slots for date, slots in days.items()}, timeout=_timeout())
+
+
+def _bump(key: str, timeout: int | None) -> None:
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _seed(), timeout=timeout)
+
+
+def _bump_now_and_on_commit(keys: list[str], timeout: int | None) -> None:
+    # Once right away and once after commit, so an entry computed from the
+    # pre-commit rows in between is never addressed again.
+    def bump():
+        for key in keys:
+            _bump(key, timeout)
+
+    bump()
+    transaction.on_commit(bump)
+
+
+def bump_service(service_id) -> None:
+    _bump_now_and_on_commit([_service_version_key(service_id)], None)
+
+
+def bump_dates(service_id, dates: Iterable[dt.date]) -> None:
+    keys = [_date_version_key(service_id, date) for date in sorted(set(dates))]
+    if keys:
+        _bump_now_and_on_commit(keys, _timeout())
+
+
+def touched_dates(start: dt.datetime | None, end: dt.datetime | None) -> set[dt.date]:
+    """Dates whose slots an appointment over ``[start, end]`` can block.
+
+    Mirrors ``slots._blocks_for_day``, which matches appointments against the
+    UTC bounds of the date.
+    """
+    if start is None or end is None:
+        return set()
+    first = start.astimezone(dt.timezone.utc).date()
+    last = max(first, end.astimezone(dt.timezone.utc).date())
+    return {first + dt.timedelta(days=i) for i in range((last - first).days + 1)}
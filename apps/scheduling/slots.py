@@ -1,9 +1,15 @@
 import datetime as dt
+from bisect import bisect_right
+from collections import defaultdict
+from dataclasses import dataclass, field
 from typing import Iterable
 from zoneinfo import ZoneInfo
+from django.db import IntegrityError, transaction
+from django.db.models import Q
 from django.utils import timezone
 from django.core.exceptions import ValidationError
-from .models import SchedulingService, ServiceAvailability, Appointment, ServiceOption
+from . import bitmaps, slot_cache
+from .models import OVERLAP_CONSTRAINT, SchedulingService, ServiceAvailability, Appointment, ServiceOption
 
 
 def _localize(service_tz: str, date: dt.date, t: dt.time) -> dt.datetime:
@@ -15,27 +21,10 @@ def _to_utc(d: dt.datetime) -> dt.datetime:
     return d.astimezone(ZoneInfo("UTC"))
 
 
-def _collect_windows(service: SchedulingService, date: dt.date):
-    # Exclude holidays
-    if ServiceAvailability.objects.filter(service=service, rule_type="holiday", date=date).exists():
-        return []
-    windows = []
-    # Weekly rules
-    for r in ServiceAvailability.objects.filter(service=service, rule_type="weekly", weekday=date.weekday()):
-        if r.start_time and r.end_time:
-            start_local = _localize(service.timezone, date, r.start_time)
-            end_local = _localize(service.timezone, date, r.end_time)
-            windows.append((_to_utc(start_local), _to_utc(end_local)))
-    # Date overrides
-    for r in ServiceAvailability.objects.filter(service=service, rule_type="date_override", date=date):
-        if r.start_time and r.end_time:
-            start_local = _localize(service.timezone, date, r.start_time)
-            end_local = _localize(service.timezone, date, r.end_time)
-            windows.append((_to_utc(start_local), _to_utc(end_local)))
-    # Merge overlapping windows
-    windows.sort()
+def _merge(intervals) -> list[tuple[dt.datetime, dt.datetime]]:
+    intervals = sorted(intervals)
     merged = []
-    for s, e in windows:
+    for s, e in intervals:
         if not merged or s > merged[-1][1]:
             merged.append([s, e])
         else:
@@ -43,62 +32,235 @@ def _collect_windows(service: SchedulingService, date: dt.date):
     return [(s, e) for s, e in merged]
 
 
-def _overlaps(a_start, a_end, b_start, b_end) -> bool:
-    return not (a_end <= b_start or b_end <= a_start)
+# Local (start_time, end_time) pairs of availability rules
+TimeRange = tuple[dt.time | None, dt.time | None]
 
 
-def _blocked_intervals(service: SchedulingService, date: dt.date, ignore_appointment_id: str | None = None):
-    # Pending/confirmed appointments expanded by buffers
-    start_day = dt.datetime.combine(date, dt.time.min, tzinfo=ZoneInfo("UTC"))
-    end_day = dt.datetime.combine(date, dt.time.max, tzinfo=ZoneInfo("UTC"))
+@dataclass
+class _AvailabilityRules:
+    weekly: dict[int, list[TimeRange]] = field(default_factory=lambda: defaultdict(list))
+    overrides: dict[dt.date, list[TimeRange]] = field(default_factory=lambda: defaultdict(list))
+    holidays: set[dt.date] = field(default_factory=set)
+
+
+def _load_rules(
+    service: SchedulingService,
+    start_date: dt.date,
+    end_date: dt.date,
+    *,
+    weekly: bool = True,
+) -> _AvailabilityRules:
+    """Every availability rule relevant to ``[start_date, end_date]`` in one query.
+
+    ``weekly=False`` skips the weekly rows when they come from the compiled bitmap.
+    """
+    rules = _AvailabilityRules()
+    dated = Q(rule_type__in=["date_override", "holiday"], date__range=(start_date, end_date))
+    qs = ServiceAvailability.objects.filter(service=service).filter(Q(rule_type="weekly") | dated if weekly else dated)
+    for r in qs:
+        if r.rule_type == "weekly":
+            rules.weekly[r.weekday].append((r.start_time, r.end_time))
+        elif r.rule_type == "date_override":
+            rules.overrides[r.date].append((r.start_time, r.end_time))
+        else:
+            rules.holidays.add(r.date)
+    return rules
+
+
+def _weekly_rules(service: SchedulingService) -> dict[int, list[TimeRange]]:
+    weekly = defaultdict(list)
+    for r in ServiceAvailability.objects.filter(service=service, rule_type="weekly"):
+        weekly[r.weekday].append((r.start_time, r.end_time))
+    return weekly
+
+
+def _windows_for_day(
+    service: SchedulingService,
+    date: dt.date,
+    rules: _AvailabilityRules,
+    weekly: list[TimeRange] | None = None,
+):
+    # Exclude holidays
+    if date in rules.holidays:
+        return []
+    if weekly is None:
+        weekly = rules.weekly.get(date.weekday(), [])
+    windows = []
+    # Weekly rules, then date overrides
+    for start_time, end_time in [*weekly, *rules.overrides.get(date, [])]:
+        if start_time and end_time:
+            start_local = _localize(service.timezone, date, start_time)
+            end_local = _localize(service.timezone, date, end_time)
+            windows.append((_to_utc(start_local), _to_utc(end_local)))
+    # Merge overlapping windows
+    return _merge(windows)
+
+
+def _offset_changes(service_tz: str, date: dt.date) -> bool:
+    """True on DST transition days, when local minutes don't map to UTC by one shift."""
+    return _localize(service_tz, date, dt.time.min).utcoffset() != _localize(service_tz, date, dt.time(23, 59)).utcoffset()
+
+
+def _utc_day_bounds(date: dt.date) -> tuple[dt.datetime, dt.datetime]:
+    return (
+        dt.datetime.combine(date, dt.time.min, tzinfo=ZoneInfo("UTC")),
+        dt.datetime.combine(date, dt.time.max, tzinfo=ZoneInfo("UTC")),
+    )
+
+
+def _load_appointments(
+    service: SchedulingService,
+    start_date: dt.date,
+    end_date: dt.date,
+    ignore_appointment_id: str | None = None,
+) -> list[tuple[dt.datetime, dt.datetime]]:
+    """(start, end) of every pending/confirmed appointment touching the range, in one query."""
+    range_start, _ = _utc_day_bounds(start_date)
+    _, range_end = _utc_day_bounds(end_date)
     qs = Appointment.objects.filter(
         service=service,
         status__in=["pending", "confirmed"],
-        start_at_utc__lte=end_day,
-        end_at_utc__gte=start_day,
+        start_at_utc__lte=range_end,
+        end_at_utc__gte=range_start,
     )
     if ignore_appointment_id:
         qs = qs.exclude(id=ignore_appointment_id)
-    blocks = []
-    for ap in qs:
-        s = ap.start_at_utc - dt.timedelta(minutes=service.buffer_before)
-        e = ap.end_at_utc + dt.timedelta(minutes=service.buffer_after)
-        blocks.append((s, e))
-    # merge
-    blocks.sort()
-    merged = []
-    for s, e in blocks:
-        if not merged or s > merged[-1][1]:
-            merged.append([s, e])
-        else:
-            merged[-1][1] = max(merged[-1][1], e)
-    return [(s, e) for s, e in merged]
+    return sorted(qs.values_list("start_at_utc", "end_at_utc"))
 
 
-def generate_slots(service: SchedulingService, date: dt.date, *, ignore_appointment_id: str | None = None):
+def _blocks_for_day(service: SchedulingService, date: dt.date, appointments) -> list[tuple[dt.datetime, dt.datetime]]:
+    # Pending/confirmed appointments expanded by buffers
+    start_day, end_day = _utc_day_bounds(date)
+    before = dt.timedelta(minutes=service.buffer_before)
+    after = dt.timedelta(minutes=service.buffer_after)
+    return _merge(
+        (ap_start - before, ap_end + after)
+        for ap_start, ap_end in appointments
+        if ap_start <= end_day and ap_end >= start_day
+    )
+
+
+@dataclass
+class _Schedule:
+    """Availability rules and blocking appointments of a date range, loaded once."""
+
+    service: SchedulingService
+    rules: _AvailabilityRules
+    appointments: list[tuple[dt.datetime, dt.datetime]]
+    # Compiled weekly rules (apps.scheduling.bitmaps); None means use the rows
+    bitmap: bytes | None = None
+    _weekly: dict[int, list[TimeRange]] | None = field(default=None, repr=False)
+
+    def windows(self, date: dt.date) -> list[tuple[dt.datetime, dt.datetime]]:
+        weekly = None
+        if self.bitmap is not None:
+            if _offset_changes(self.service.timezone, date):
+                # Compiled runs merge rules before the UTC conversion, which is
+                # only exact for a constant offset: convert each rule on its own.
+                if self._weekly is None:
+                    self._weekly = _weekly_rules(self.service)
+                weekly = self._weekly.get(date.weekday(), [])
+            else:
+                weekly = bitmaps.weekly_intervals(self.bitmap, date.weekday())
+        return _windows_for_day(self.service, date, self.rules, weekly)
+
+    def blocks(self, date: dt.date) -> list[tuple[dt.datetime, dt.datetime]]:
+        return _blocks_for_day(self.service, date, self.appointments)
+
+
+def _load_schedule(
+    service: SchedulingService,
+    start_date: dt.date,
+    end_date: dt.date,
+    ignore_appointment_id: str | None = None,
+) -> _Schedule:
+    bitmap = service.availability_bitmap if bitmaps.bitmap_slots_enabled() else None
+    return _Schedule(
+        service=service,
+        rules=_load_rules(service, start_date, end_date, weekly=bitmap is None),
+        appointments=_load_appointments(service, start_date, end_date, ignore_appointment_id),
+        bitmap=bitmap,
+    )
+
+
+# min_start that keeps every slot, for entries cached before the lead-time cut-off
+NO_CUTOFF = dt.datetime.min.replace(tzinfo=ZoneInfo("UTC"))
+
+
+def _min_start(service: SchedulingService) -> dt.datetime:
     now_utc = timezone.now().astimezone(ZoneInfo("UTC"))
-    lead_delta = dt.timedelta(minutes=service.lead_time_min)
-    min_start = now_utc + lead_delta
+    return now_utc + dt.timedelta(minutes=service.lead_time_min)
+
+
+def _ceil_steps(delta: dt.timedelta, step: dt.timedelta) -> int:
+    return max(0, -(-delta // step))
 
-    windows = _collect_windows(service, date)
-    blocks = _blocked_intervals(service, date, ignore_appointment_id)
-    dur = dt.timedelta(minutes=service.duration_minutes)
 
+def _sweep_slots(
+    windows,
+    blocks,
+    *,
+    duration: dt.timedelta,
+    before: dt.timedelta,
+    after: dt.timedelta,
+    min_start: dt.datetime,
+) -> list[tuple[dt.datetime, dt.datetime]]:
+    """Valid (start, end) pairs from merged, sorted ``windows`` and ``blocks``.
+
+    Candidate starts sit on a ``duration`` grid from each window start; a start
+    is valid when its claim ``[start - before, start + duration + after]`` fits
+    the window, the start is not before ``min_start`` and the claim touches no
+    block. Claims only move forward, so the block pointer never rewinds and a
+    conflicting block makes the grid jump straight past it: the whole day is
+    one O(windows + blocks + slots) pass.
+    """
+    if duration <= dt.timedelta(0):
+        return []
     slots = []
+    j, n = 0, len(blocks)
     for win_start, win_end in windows:
-        # step by duration; ensure buffers around the proposed slot fit in the window and don't hit blocks
-        cursor = win_start
-        while cursor + dur <= win_end:
-            s = cursor
-            e = s + dur
-            claim_start = s - dt.timedelta(minutes=service.buffer_before)
-            claim_end = e + dt.timedelta(minutes=service.buffer_after)
-            if s >= min_start:
-                conflict = any(_overlaps(claim_start, claim_end, b0, b1) for b0, b1 in blocks)
-                within_window = (claim_start >= win_start) and (claim_end <= win_end)
-                if not conflict and within_window:
-                    slots.append((s, e))
-            cursor = cursor + dur
+        k = max(_ceil_steps(before, duration), _ceil_steps(min_start - win_start, duration))
+        while True:
+            start = win_start + k * duration
+            claim_start = start - before
+            claim_end = start + duration + after
+            if claim_end > win_end:
+                break
+            while j < n and blocks[j][1] <= claim_start:
+                j += 1
+            if j < n and blocks[j][0] < claim_end:
+                k = max(k + 1, _ceil_steps(blocks[j][1] + before - win_start, duration))
+                continue
+            slots.append((start, start + duration))
+            k += 1
+    return slots
+
+
+def _conflicts(blocks, claim_start: dt.datetime, claim_end: dt.datetime) -> bool:
+    # First block ending after claim_start is the only one that can overlap
+    i = bisect_right(blocks, claim_start, key=lambda block: block[1])
+    return i < len(blocks) and blocks[i][0] < claim_end
+
+
+def _day_slots(service: SchedulingService, schedule: _Schedule, date: dt.date, min_start: dt.datetime):
+    windows = schedule.windows(date)
+    if not windows:
+        return []
+    blocks = schedule.blocks(date)
+    params = {
+        "duration": dt.timedelta(minutes=service.duration_minutes),
+        "before": dt.timedelta(minutes=service.buffer_before),
+        "after": dt.timedelta(minutes=service.buffer_after),
+        "min_start": min_start,
+    }
+    if schedule.bitmap is not None:
+        slots = bitmaps.mask_slots(windows, blocks, **params)
+        if slots is not None:
+            return slots
+    return _sweep_slots(windows, blocks, **params)
+
+
+def _serialize_slots(slots) -> list[dict]:
     # Return ISO8601 strings in UTC
     return [{
         "start_at_utc": s.isoformat(),
@@ -106,6 +268,46 @@ def generate_slots(service: SchedulingService, date: dt.date, *, ignore_appointm
     } for s, e in slots]
 
 
+def generate_slots_range(
+    service: SchedulingService,
+    start_date: dt.date,
+    end_date: dt.date,
+    *,
+    ignore_appointment_id: str | None = None,
+) -> dict[dt.date, list[dict]]:
+    """Slots for every day in ``[start_date, end_date]`` (inclusive), keyed by date.
+
+    Loads the availability rules and the blocking appointments with one query
+    each and computes every day in memory; each day matches ``generate_slots``.
+    With the slot cache on, only the days missing from it are computed (over
+    the span they cover) and the lead-time cut-off is applied afterwards.
+    """
+    if end_date < start_date:
+        return {}
+    min_start = _min_start(service)
+    dates = [start_date + dt.timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+    if not slot_cache.slot_cache_enabled():
+        schedule = _load_schedule(service, start_date, end_date, ignore_appointment_id)
+        return {date: _serialize_slots(_day_slots(service, schedule, date, min_start)) for date in dates}
+
+    keys = slot_cache.entry_keys(service.id, dates, ignore_appointment_id)
+    cached = slot_cache.get_days(keys)
+    missing = [date for date in dates if date not in cached]
+    if missing:
+        schedule = _load_schedule(service, missing[0], missing[-1], ignore_appointment_id)
+        computed = {date: _day_slots(service, schedule, date, NO_CUTOFF) for date in missing}
+        slot_cache.set_days(keys, computed)
+        cached.update(computed)
+    return {
+        date: _serialize_slots((s, e) for s, e in cached[date] if s >= min_start)
+        for date in dates
+    }
+
+
+def generate_slots(service: SchedulingService, date: dt.date, *, ignore_appointment_id: str | None = None):
+    return generate_slots_range(service, date, date, ignore_appointment_id=ignore_appointment_id)[date]
+
+
 def _active_options(service: SchedulingService, option_ids: Iterable[str]) -> list[ServiceOption]:
     if not option_ids:
         return []
@@ -131,8 +333,10 @@ def prepare_booking(
     options = _active_options(service, option_ids)
     tz_service = ZoneInfo(service.timezone or "UTC")
     date_local = start_at.astimezone(tz_service).date()
-    slots = generate_slots(service, date_local, ignore_appointment_id=ignore_appointment_id)
-    if not any(dt.datetime.fromisoformat(slot["start_at_utc"]) == start_at for slot in slots):
+    min_start = _min_start(service)
+    # One load serves the slot check, the window fit and the conflict check
+    schedule = _load_schedule(service, date_local, date_local, ignore_appointment_id)
+    if start_at not in {s for s, _ in _day_slots(service, schedule, date_local, min_start)}:
         raise ValidationError("Horário indisponível.")
     extra_minutes = sum(opt.extra_duration_minutes for opt in options)
     total_minutes = service.duration_minutes + extra_minutes
@@ -142,20 +346,14 @@ def prepare_booking(
     claim_end = end_at + dt.timedelta(minutes=service.buffer_after)
     if claim_end.astimezone(tz_service).date() != date_local:
         raise ValidationError("Duração excede o limite diário disponível.")
-    windows = _collect_windows(service, date_local)
     fits_window = any(
-        claim_start >= win_start and claim_end <= win_end for win_start, win_end in windows
+        claim_start >= win_start and claim_end <= win_end for win_start, win_end in schedule.windows(date_local)
     )
     if not fits_window:
         raise ValidationError("Horário não comporta a duração selecionada.")
-    blocks = []
-    for chk_date in {date_local, claim_end.astimezone(tz_service).date()}:
-        blocks.extend(_blocked_intervals(service, chk_date, ignore_appointment_id))
-    has_conflict = any(_overlaps(claim_start, claim_end, b0, b1) for b0, b1 in blocks)
-    if has_conflict:
+    if _conflicts(schedule.blocks(date_local), claim_start, claim_end):
         raise ValidationError("Horário indisponível devido a outro agendamento.")
-    now_utc = timezone.now().astimezone(ZoneInfo("UTC"))
-    if start_at < now_utc + dt.timedelta(minutes=service.lead_time_min):
+    if start_at < min_start:
         raise ValidationError("O horário selecionado não respeita o tempo mínimo de antecedência.")
     price_delta = sum(opt.price_delta_cents for opt in options)
     total_price = (service.price_cents or 0) + price_delta
@@ -180,3 +378,24 @@ def prepare_booking(
         "base_price_cents": int(service.price_cents or 0),
         "price_delta_cents": price_delta,
     }
+
+
+def is_double_booking(exc: IntegrityError) -> bool:
+    """True when ``exc`` comes from the appointment overlap exclusion constraint."""
+    return OVERLAP_CONSTRAINT in str(exc)
+
+
+def book_appointment(**fields) -> Appointment:
+    """Insert an appointment validated by ``prepare_booking``.
+
+    Concurrent bookings of the same slot both pass the Python check; the
+    database exclusion constraint lets exactly one insert through and the
+    others are reported as an unavailable time.
+    """
+    try:
+        with transaction.atomic():
+            return Appointment.objects.create(**fields)
+    except IntegrityError as exc:
+        if is_double_booking(exc):
+            raise ValidationError("Horário indisponível.") from exc
+        raise
@@ -0,0 +1,23 @@
+import logging
+
+from celery import shared_task
+
+from . import next_slots
+from .models import SchedulingService
+
+log = logging.getLogger(__name__)
+
+
+@shared_task
+def refresh_next_starts(service_id: str | None = None):
+    """Recalcula os próximos horários livres de um serviço (ou de todos os ativos)."""
+    if service_id:
+        services = SchedulingService.objects.filter(pk=service_id)
+    else:
+        services = SchedulingService.objects.filter(is_active=True)
+    refreshed = 0
+    for service in services.iterator():
+        next_slots.refresh_next_starts(service)
+        refreshed += 1
+    log.info("next_starts refreshed for %s service(s)", refreshed)
+    return {"refreshed": refreshed}
@@ -6,6 +6,7 @@ app_name = "scheduling"
 urlpatterns = [
     path("services/<uuid:id>/slots", views.list_slots, name="slots"),
     path("services/<uuid:id>/appointments", views.create_appointment, name="appointments_create"),
+    path("calendar/<str:token>.ics", views.owner_calendar_feed, name="owner_calendar_feed"),
     # HTMX for scheduling services attached to a card
     path("cards/<uuid:card_id>/services", views.services_partial, name="services_partial"),
     path("cards/<uuid:card_id>/services/new", views.service_form, name="service_form_new"),
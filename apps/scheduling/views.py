@@ -1,13 +1,16 @@
 from django.contrib.auth.decorators import login_required
 import json
-from django.http import JsonResponse, HttpResponseBadRequest, HttpResponseForbidden
+from django.http import JsonResponse, HttpResponseBadRequest, HttpResponseForbidden, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import parse_etags
+from django.views.decorators.http import require_GET
 from django.shortcuts import get_object_or_404, render
 from django.utils.dateparse import parse_date
-from .models import SchedulingService, Appointment, ServiceAvailability, ServiceOption
+from . import ics
+from .models import CalendarFeed, SchedulingService, Appointment, ServiceAvailability, ServiceOption
 from django.utils import timezone
 import datetime as dt
 from zoneinfo import ZoneInfo
-from .slots import generate_slots, prepare_booking
+from .slots import book_appointment, generate_slots, prepare_booking
 from .forms import SchedulingServiceForm, ServiceAvailabilityForm, ServiceOptionForm
 from apps.cards.models import Card
 from django.core.exceptions import ValidationError
@@ -29,6 +32,22 @@ def list_slots(request, id):
     return JsonResponse({"service": str(service.id), "date": date_str, "slots": slots})
 
 
+@require_GET
+def owner_calendar_feed(request, token: str):
+    """ICS feed for calendar clients; the token in the URL is the only credential."""
+    feed = get_object_or_404(CalendarFeed.objects.only("owner_id"), token=token)
+    qs = ics.feed_queryset(feed.owner_id)
+    etag = ics.feed_etag(qs)
+    if etag in parse_etags(request.headers.get("If-None-Match", "")):
+        response = HttpResponseNotModified()
+    else:
+        response = StreamingHttpResponse(ics.iter_feed(qs), content_type="text/calendar; charset=utf-8")
+        response["Content-Disposition"] = 'inline; filename="agenda.ics"'
+    response["ETag"] = etag
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
+
 @login_required
 def create_appointment(request, id):
     if request.method != "POST":
@@ -52,21 +71,24 @@ def create_appointment(request, id):
     # Ensure client-sent end matches expected window
     if e != booking["end_at"]:
         return HttpResponseBadRequest("slot duration mismatch")
-    appt = Appointment.objects.create(
-        service=service,
-        user_name=request.POST.get("user_name", ""),
-        user_email=request.POST.get("user_email", ""),
-        user_phone=request.POST.get("user_phone", ""),
-        start_at_utc=s,
-        end_at_utc=booking["end_at"],
-        timezone=request.POST.get("timezone", service.timezone),
-        location_choice=request.POST.get("location_choice", service.type),
-        form_answers_json={},
-        options_snapshot_json=booking["options_snapshot"],
-        base_price_cents=booking["base_price_cents"],
-        price_cents=booking["price_cents"],
-        status="pending",
-    )
+    try:
+        appt = book_appointment(
+            service=service,
+            user_name=request.POST.get("user_name", ""),
+            user_email=request.POST.get("user_email", ""),
+            user_phone=request.POST.get("user_phone", ""),
+            start_at_utc=s,
+            end_at_utc=booking["end_at"],
+            timezone=request.POST.get("timezone", service.timezone),
+            location_choice=request.POST.get("location_choice", service.type),
+            form_answers_json={},
+            options_snapshot_json=booking["options_snapshot"],
+            base_price_cents=booking["base_price_cents"],
+            price_cents=booking["price_cents"],
+            status="pending",
+        )
+    except ValidationError as exc:
+        return HttpResponseBadRequest(exc.messages[0])
     # Notify card owner via SMS (best effort)
     try:
         card = service.card
@@ -139,7 +161,14 @@ def service_save(request, card_id, id=None):
                 return res
             svc = form.save(commit=False)
             svc.card = c
-            svc.save()
+            try:
+                svc.save()
+            except ValidationError as e:
+                # Buffers widened over booked appointments (see signals.service_remember_card)
+                form.add_error(None, e)
+                res = render(request, "scheduling/_service_form.html", {"card": card, "form": form, "service": svc if id else None})
+                res.status_code = 422
+                return res
         # after save, refresh the list
         services = SchedulingService.objects.filter(card=card).order_by("-created_at")
         resp = render(request, "scheduling/_services.html", {"card": card, "services": services})
@@ -9,9 +9,11 @@ from django.http import JsonResponse, HttpResponseBadRequest
 from django.shortcuts import get_object_or_404, render
 from django.views.decorators.http import require_http_methods
 from django.db.models import Q
+from apps.cards import resolver
 from apps.cards.models import Card, GalleryItem
 from .models import SchedulingService, Appointment, ServiceOption
-from .slots import generate_slots, prepare_booking
+from .next_slots import upcoming_starts
+from .slots import book_appointment, generate_slots, generate_slots_range, prepare_booking
 from django.core.cache import cache
 from django.utils import timezone
 from apps.common.phone import to_e164, gen_code, hash_code
@@ -23,19 +25,48 @@ log = logging.getLogger(__name__)
 
 
 def _card(nickname: str) -> Card:
-    return get_object_or_404(Card, nickname__iexact=nickname, status="published", deactivation_marked=False)
+    return resolver.get_public_card(nickname)
+
+
+MAX_SLOT_RANGE_DAYS = 62
+
+
+def _parse_iso_date(value: str) -> dt.date:
+    y, m, d = map(int, value.split("-"))
+    return dt.date(y, m, d)
+
+
+def _public_slots_range(service: SchedulingService, start: str, end: str):
+    try:
+        start_date = _parse_iso_date(start)
+        end_date = _parse_iso_date(end)
+    except Exception:
+        return HttpResponseBadRequest("invalid date")
+    if end_date < start_date or (end_date - start_date).days >= MAX_SLOT_RANGE_DAYS:
+        return HttpResponseBadRequest("invalid range")
+    days = generate_slots_range(service, start_date, end_date)
+    return JsonResponse({
+        "service": str(service.id),
+        "start": start_date.isoformat(),
+        "end": end_date.isoformat(),
+        "days": {day.isoformat(): slots for day, slots in days.items()},
+    })
 
 
 def public_slots(request, nickname: str):
     card = _card(nickname)
     svc_id = request.GET.get("service")
     date = request.GET.get("date")
+    start = request.GET.get("start")
+    end = request.GET.get("end")
+    if svc_id and start and end and not date:
+        service = get_object_or_404(SchedulingService, id=svc_id, card=card, is_active=True)
+        return _public_slots_range(service, start, end)
     if not (svc_id and date):
         return HttpResponseBadRequest("service and date required")
     service = get_object_or_404(SchedulingService, id=svc_id, card=card, is_active=True)
     try:
-        y, m, d = map(int, date.split("-"))
-        the_date = dt.date(y, m, d)
+        the_date = _parse_iso_date(date)
     except Exception:
         return HttpResponseBadRequest("invalid date")
     slots = generate_slots(service, the_date)
@@ -58,6 +89,33 @@ def public_slots(request, nickname: str):
     return JsonResponse({"service": str(service.id), "date": date, "slots": slots})
 
 
+def public_next_slots(request, nickname: str):
+    """Precomputed next free starts of every active service of the card (no slot generation)."""
+    card = _card(nickname)
+    services = SchedulingService.objects.filter(card=card, is_active=True).only(
+        "id", "timezone", "lead_time_min", "next_starts"
+    )
+    items = []
+    for svc in services:
+        starts = upcoming_starts(svc)
+        label = None
+        if starts:
+            try:
+                tz = ZoneInfo(svc.timezone or "UTC")
+            except Exception:
+                tz = ZoneInfo("UTC")
+            label = starts[0].astimezone(tz).strftime("%d/%m às %H:%M")
+        items.append({"id": str(svc.id), "starts": [s.isoformat() for s in starts], "label": label})
+    if request.headers.get("HX-Request"):
+        return render(request, "public/_next_slots.html", {"items": items})
+    return JsonResponse({
+        "services": {
+            item["id"]: {"next": item["starts"][0] if item["starts"] else None, "starts": item["starts"]}
+            for item in items
+        }
+    })
+
+
 @require_http_methods(["POST"]) 
 def public_create_appointment(request, nickname: str):
     card = _card(nickname)
@@ -89,21 +147,24 @@ def public_create_appointment(request, nickname: str):
         phone = to_e164(phone_raw)
     except Exception:
         return HttpResponseBadRequest("invalid phone")
-    appt = Appointment.objects.create(
-        service=service,
-        user_name=name,
-        user_email=email or None,
-        user_phone=phone,
-        start_at_utc=sdt,
-        end_at_utc=edt,
-        timezone=service.timezone,
-        location_choice=service.type,
-        form_answers_json={},
-        options_snapshot_json=booking["options_snapshot"],
-        base_price_cents=booking["base_price_cents"],
-        price_cents=booking["price_cents"],
-        status="pending",
-    )
+    try:
+        appt = book_appointment(
+            service=service,
+            user_name=name,
+            user_email=email or None,
+            user_phone=phone,
+            start_at_utc=sdt,
+            end_at_utc=edt,
+            timezone=service.timezone,
+            location_choice=service.type,
+            form_answers_json={},
+            options_snapshot_json=booking["options_snapshot"],
+            base_price_cents=booking["base_price_cents"],
+            price_cents=booking["price_cents"],
+            status="pending",
+        )
+    except ValidationError as exc:
+        return HttpResponseBadRequest(exc.messages[0])
     # clear verification flag
     request.session["phone_verified"] = False
     # Notify card owner via SMS (best effort)
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import SearchProfile
+from .models import CepAddress, SearchProfile
 
 
 @admin.register(SearchProfile)
@@ -8,3 +8,10 @@ class SearchProfileAdmin(admin.ModelAdmin):
     list_display = ("card", "category", "active", "radius_km", "created_at")
     search_fields = ("card__title", "card__nickname")
     list_filter = ("category", "active")
+
+
+@admin.register(CepAddress)
+class CepAddressAdmin(admin.ModelAdmin):
+    list_display = ("cep", "logradouro", "bairro", "cidade", "uf", "source")
+    search_fields = ("cep", "logradouro", "cidade")
+    list_filter = ("uf", "source")
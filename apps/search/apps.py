@@ -5,3 +5,6 @@ class SearchConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.search"
     verbose_name = "Search"
+
+    def ready(self) -> None:
+        from . import signals  # noqa: F401
@@ -0,0 +1,44 @@
+"""Local CEP table access shared by the geocoder and the address lookups."""
+from __future__ import annotations
+
+import re
+
+from django.contrib.gis.geos import Point
+
+from .models import CepAddress
+
+ADDRESS_FIELDS = ("logradouro", "bairro", "cidade", "uf")
+
+
+def normalize_cep(raw_cep: str) -> str | None:
+    digits = re.sub(r"\D", "", raw_cep or "")
+    return digits if re.fullmatch(r"\d{8}", digits) else None
+
+
+def lookup_cep(cep: str) -> CepAddress | None:
+    return CepAddress.objects.filter(cep=cep).first()
+
+
+def remember_cep(
+    cep: str,
+    *,
+    lat: float | None = None,
+    lng: float | None = None,
+    **parts: str,
+) -> CepAddress:
+    """Write back a remote lookup without erasing data we already have."""
+    record, _ = CepAddress.objects.get_or_create(cep=cep)
+    changed = []
+    for field in ADDRESS_FIELDS:
+        value = (parts.get(field) or "").strip()
+        if field == "uf":
+            value = value.upper()[:2]
+        if value and value != getattr(record, field):
+            setattr(record, field, value)
+            changed.append(field)
+    if lat is not None and lng is not None:
+        record.location = Point(float(lng), float(lat), srid=4326)
+        changed.append("location")
+    if changed:
+        record.save(update_fields=[*changed, "updated_at"])
+    return record
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+import uuid
+from dataclasses import dataclass, replace
+from datetime import datetime
+
+# Who measured the cursor's distance: PostGIS ST_Distance, the tile cache's
+# Vincenty in Python or the memory index's in NumPy. The formulas agree to
+# within float rounding, which is enough to skip or repeat a row sitting on
+# the page boundary, so a cursor is only compared with its own source.
+SOURCE_DB = "db"
+SOURCE_TILES = "tiles"
+SOURCE_MEMORY = "memory"
+SOURCES = (SOURCE_DB, SOURCE_TILES, SOURCE_MEMORY)
+
+
+@dataclass(frozen=True, slots=True)
+class SearchCursor:
+    """Position of the last row served, in ``(distance, created_at, id)`` order."""
+
+    distance_m: float
+    created_at: datetime
+    pk: uuid.UUID
+    source: str = SOURCE_DB
+
+
+def _distance_m(profile) -> float:
+    distance = getattr(profile, "distance", None)
+    if distance is None:
+        raise ValueError("Profile has no distance annotation.")
+    try:
+        return float(distance.m)
+    except AttributeError:
+        return float(distance)
+
+
+def cursor_for(profile) -> SearchCursor:
+    return SearchCursor(
+        distance_m=_distance_m(profile),
+        created_at=profile.created_at,
+        pk=profile.pk,
+        source=getattr(profile, "distance_source", SOURCE_DB),
+    )
+
+
+def without_foreign_cursor(query, source: str):
+    """``query`` as ``source`` can serve it: a cursor issued by another source is dropped.
+
+    The page then restarts from ``query.offset``, which the HTML results keep
+    next to the cursor.
+    """
+    if query.cursor is None or query.cursor.source == source:
+        return query
+    return replace(query, cursor=None)
+
+
+def encode_cursor(cursor: SearchCursor) -> str:
+    # repr() round-trips the float exactly, so the DB comparison is stable.
+    payload = json.dumps(
+        [repr(cursor.distance_m), cursor.created_at.isoformat(), str(cursor.pk), cursor.source], separators=(",", ":")
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> SearchCursor:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        fields = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        if len(fields) == 3:
+            # Issued before the source was recorded, by the database
+            fields.append(SOURCE_DB)
+        distance, created_at, pk, source = fields
+        cursor = SearchCursor(
+            distance_m=float(distance),
+            created_at=datetime.fromisoformat(created_at),
+            pk=uuid.UUID(pk),
+            source=source,
+        )
+    except (AttributeError, binascii.Error, UnicodeDecodeError, TypeError, ValueError) as exc:
+        raise ValueError("Invalid search cursor.") from exc
+    if cursor.distance_m < 0 or cursor.created_at.tzinfo is None or cursor.source not in SOURCES:
+        raise ValueError("Invalid search cursor.")
+    return cursor
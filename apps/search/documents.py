@@ -0,0 +1,60 @@
+"""Denormalized search document stored on ``SearchProfile``.
+
+Public search only needs a handful of card attributes. Copying them onto the
+profile lets the search process read one narrow table with no card join.
+``SearchProfile.save()`` and the card ``post_save`` signal keep the copy
+current, and ``check_search_documents`` reports and repairs any drift.
+"""
+from __future__ import annotations
+
+from typing import Any
+
+from django.utils import timezone
+
+from .models import SearchProfile
+
+DOCUMENT_FIELDS = ("title", "nickname", "mode", "is_listed", "avatar_thumb_path")
+# Smallest rendition first
+AVATAR_FIELDS = ("avatar_w128", "avatar_w64", "avatar")
+
+
+def card_avatar_thumb_path(card) -> str:
+    for field in AVATAR_FIELDS:
+        image = getattr(card, field, None)
+        name = getattr(image, "name", "") if image else ""
+        if name:
+            return name
+    return ""
+
+
+def card_is_listed(card) -> bool:
+    return card.status == "published" and not card.deactivation_marked
+
+
+def build_document(profile: SearchProfile, card) -> dict[str, Any]:
+    return {
+        "title": card.title or "",
+        "nickname": card.nickname or "",
+        "mode": card.mode or "",
+        "is_listed": bool(profile.active and profile.origin is not None and card_is_listed(card)),
+        "avatar_thumb_path": card_avatar_thumb_path(card),
+    }
+
+
+def document_drift(profile: SearchProfile, card) -> dict[str, Any]:
+    """Return the fields whose stored value differs from the card."""
+    expected = build_document(profile, card)
+    return {field: value for field, value in expected.items() if getattr(profile, field) != value}
+
+
+def sync_card_document(card) -> bool:
+    """Refresh the search document of ``card``'s profile; True if it changed."""
+    profile = SearchProfile.objects.filter(card_id=card.pk).first()
+    if profile is None:
+        return False
+    drift = document_drift(profile, card)
+    if not drift:
+        return False
+    # update() keeps SearchProfile.save() side effects (coverage) out of this path
+    SearchProfile.objects.filter(pk=profile.pk).update(**drift, updated_at=timezone.now())
+    return True
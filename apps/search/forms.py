@@ -7,6 +7,7 @@ from django import forms
 from django.contrib.gis.geos import Point
 from django.core.exceptions import ValidationError
 
+from .cursors import SearchCursor, decode_cursor
 from .models import SearchCategory, SearchProfile
 
 
@@ -130,6 +131,7 @@ class SearchQuery:
     mode: str | None
     limit: int
     offset: int = 0
+    cursor: SearchCursor | None = None
 
     @property
     def user_point(self) -> Point:
@@ -145,6 +147,16 @@ class SearchQueryForm(forms.Form):
     mode = forms.ChoiceField(choices=[("", "Todos"), ("appointment", "Agendamentos"), ("delivery", "Delivery")], required=False)
     limit = forms.IntegerField(required=False, min_value=1, max_value=200)
     offset = forms.IntegerField(required=False, min_value=0)
+    cursor = forms.CharField(required=False, max_length=256)
+
+    def clean_cursor(self) -> SearchCursor | None:
+        token = (self.cleaned_data.get("cursor") or "").strip()
+        if not token:
+            return None
+        try:
+            return decode_cursor(token)
+        except ValueError:
+            raise ValidationError("Cursor inválido.")
 
     def clean(self) -> dict[str, Any]:
         data = super().clean()
@@ -179,4 +191,5 @@ class SearchQueryForm(forms.Form):
             mode=(cleaned.get("mode") or None),
             limit=int(cleaned.get("limit")),
             offset=int(cleaned.get("offset", 0)),
+            cursor=cleaned.get("cursor"),
         )
@@ -1,17 +1,33 @@
 from __future__ import annotations
 
-import pprint
+import logging
 import re
+import threading
+import time
 import unicodedata
+from contextlib import contextmanager
 from dataclasses import dataclass
-from typing import Any, Final
+from typing import Any, Callable, Final, Iterator
 
 import requests
 from django.conf import settings
 from django.core.cache import cache
+from requests.adapters import HTTPAdapter
 
+from .cep import lookup_cep, remember_cep
+
+try:
+    from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
+except ImportError:  # pragma: no cover - redis comes with django-redis
+    REDIS_ERRORS: tuple[type[Exception], ...] = ()
+else:
+    REDIS_ERRORS = (RedisConnectionError, RedisTimeoutError)
+
+log = logging.getLogger(__name__)
 
 GEOCODE_CACHE_TTL: Final[int] = 60 * 60 * 24
+# "Not found" answers are cached briefly so repeated typos don't hit the provider.
+GEOCODE_NEGATIVE_TTL: Final[int] = 60 * 10
 
 
 VIACEP_URL_TEMPLATE: Final[str] = "https://viacep.com.br/ws/{cep}/json/"
@@ -20,6 +36,34 @@ DEFAULT_USER_AGENT: Final[str] = settings.NOMINATIM_USER_AGENT
 DEFAULT_TIMEOUT: Final[int] = 10  # seconds
 CEP_PATTERN: Final[re.Pattern[str]] = re.compile(r"^\d{8}$")
 
+# Nominatim usage policy: at most 1 request per second for the whole app.
+DEFAULT_NOMINATIM_RATE: Final[float] = 1.0
+DEFAULT_RATE_MAX_WAIT: Final[float] = 5.0
+SINGLE_FLIGHT_LOCK_TTL: Final[int] = DEFAULT_TIMEOUT * 2 + 5
+SINGLE_FLIGHT_WAIT: Final[float] = DEFAULT_TIMEOUT + 5
+TOKEN_BUCKET_KEY: Final[str] = "geocode:bucket:nominatim"
+
+# KEYS[1] bucket hash; ARGV rate (tokens/s), capacity. Returns seconds to wait.
+TOKEN_BUCKET_LUA: Final[str] = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+else
+  wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(wait)
+"""
+
 
 @dataclass(slots=True)
 class GeocodingError(Exception):
@@ -30,6 +74,155 @@ class GeocodingError(Exception):
         return self.message
 
 
+# ---- HTTP client layer ----
+
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
+_local_bucket = {"tokens": None, "ts": 0.0}
+_local_bucket_lock = threading.Lock()
+_token_script = None
+
+
+def _get_session() -> requests.Session:
+    """Process-wide keep-alive session so misses reuse pooled TLS connections."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=0)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def _http_get(url: str, **kwargs: Any) -> requests.Response:
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    return _get_session().get(url, **kwargs)
+
+
+def _nominatim_url() -> str:
+    return getattr(settings, "NOMINATIM_URL", NOMINATIM_URL)
+
+
+def _viacep_url(cep: str) -> str:
+    return getattr(settings, "VIACEP_URL_TEMPLATE", VIACEP_URL_TEMPLATE).format(cep=cep)
+
+
+def _redis_bucket_wait(rate: float, capacity: float) -> float | None:
+    """Take a token from the shared Redis bucket; ``None`` if Redis is unavailable."""
+    global _token_script
+    try:
+        from django_redis import get_redis_connection
+
+        if _token_script is None:
+            _token_script = get_redis_connection("default").register_script(TOKEN_BUCKET_LUA)
+        wait = _token_script(keys=[cache.make_key(TOKEN_BUCKET_KEY)], args=[rate, capacity])
+    except (ImportError, NotImplementedError):
+        return None
+    except REDIS_ERRORS as exc:
+        log.warning("Redis unavailable for the Nominatim token bucket, using the local one: %s", exc)
+        return None
+    return float(wait)
+
+
+def _local_bucket_wait(rate: float, capacity: float) -> float:
+    with _local_bucket_lock:
+        now = time.monotonic()
+        tokens = _local_bucket["tokens"]
+        tokens = capacity if tokens is None else min(capacity, tokens + (now - _local_bucket["ts"]) * rate)
+        _local_bucket["ts"] = now
+        if tokens >= 1:
+            _local_bucket["tokens"] = tokens - 1
+            return 0.0
+        _local_bucket["tokens"] = tokens
+        return (1 - tokens) / rate
+
+
+def _acquire_nominatim_token() -> None:
+    """Block until the global Nominatim token bucket grants a request."""
+    rate = float(getattr(settings, "NOMINATIM_RATE_PER_SECOND", DEFAULT_NOMINATIM_RATE))
+    if rate <= 0:
+        return
+    capacity = max(1.0, float(getattr(settings, "NOMINATIM_RATE_BURST", 1)))
+    deadline = time.monotonic() + float(getattr(settings, "NOMINATIM_RATE_MAX_WAIT", DEFAULT_RATE_MAX_WAIT))
+    while True:
+        wait = _redis_bucket_wait(rate, capacity)
+        if wait is None:
+            wait = _local_bucket_wait(rate, capacity)
+        if wait <= 0:
+            return
+        if time.monotonic() + wait > deadline:
+            raise GeocodingError("Limite de consultas ao Nominatim atingido.", 503)
+        time.sleep(wait)
+
+
+@contextmanager
+def _single_flight(key: str) -> Iterator[None]:
+    """Let only one worker resolve ``key`` at a time; the others wait for its result."""
+    make_lock = getattr(cache, "lock", None)
+    if make_lock is None:
+        # Backends without locks (locmem in dev) simply skip the coordination.
+        yield
+        return
+    lock = make_lock(f"{key}:lock", timeout=SINGLE_FLIGHT_LOCK_TTL, blocking_timeout=SINGLE_FLIGHT_WAIT)
+    try:
+        acquired = lock.acquire(blocking=True)
+    except REDIS_ERRORS as exc:
+        # Resolving uncoordinated beats failing the request
+        log.warning("Redis unavailable for the geocoding lock on %s: %s", key, exc)
+        acquired = False
+    try:
+        yield
+    finally:
+        if acquired:
+            try:
+                lock.release()
+            except Exception:  # lock expired while we were working
+                pass
+
+
+def _negative_key(key: str) -> str:
+    return f"{key}:missing"
+
+
+def _raise_if_negative(key: str) -> None:
+    message = cache.get(_negative_key(key))
+    if message:
+        raise GeocodingError(message, 404)
+
+
+def _resolve_once(
+    key: str,
+    loader: Callable[[], dict[str, float]],
+    *,
+    lookup: Callable[[], dict[str, float] | None],
+    store: Callable[[dict[str, float]], None],
+) -> dict[str, float]:
+    """Cached, single-flight, negatively cached resolution of ``key``."""
+    found = lookup()
+    if found:
+        return found
+    _raise_if_negative(key)
+    with _single_flight(key):
+        # Another worker may have finished the same lookup while we waited.
+        found = lookup()
+        if found:
+            return found
+        _raise_if_negative(key)
+        try:
+            result = loader()
+        except GeocodingError as exc:
+            if exc.status_code == 404:
+                cache.set(_negative_key(key), exc.message, GEOCODE_NEGATIVE_TTL)
+            raise
+        store(result)
+        return result
+
+
+# ---- Providers ----
+
 def _normalize_cep(raw_cep: str) -> str:
     digits = re.sub(r"\D", "", raw_cep or "")
     if not CEP_PATTERN.match(digits):
@@ -52,9 +245,8 @@ def _build_query(via_cep_payload: dict[str, str]) -> str:
 
 
 def _request_via_cep(cep: str) -> dict[str, str]:
-    url = VIACEP_URL_TEMPLATE.format(cep=cep)
     try:
-        response = requests.get(url, timeout=DEFAULT_TIMEOUT)
+        response = _http_get(_viacep_url(cep))
     except requests.RequestException as exc:
         raise GeocodingError("Não foi possível consultar o ViaCEP.", 502) from exc
     if response.status_code == 404:
@@ -67,44 +259,69 @@ def _request_via_cep(cep: str) -> dict[str, str]:
     return payload
 
 
-def _request_nominatim(query: str) -> dict[str, str]:
+def _request_nominatim(query: str, *, not_found: str, accept_language: str = "pt-BR,en") -> dict[str, float]:
     headers = {
         "User-Agent": getattr(settings, "NOMINATIM_USER_AGENT", DEFAULT_USER_AGENT),
-        "Accept-Language": "pt-BR,en",
+        "Accept-Language": accept_language,
     }
-    pprint.pprint(query)
     params = {
         "format": "jsonv2",
         "q": query,
         "countrycodes": "br",
         "limit": 1,
     }
+    _acquire_nominatim_token()
     try:
-        response = requests.get(NOMINATIM_URL, params=params, headers=headers, timeout=DEFAULT_TIMEOUT)
+        response = _http_get(_nominatim_url(), params=params, headers=headers)
     except requests.RequestException as exc:
-        pprint.pprint(exc)
         raise GeocodingError("Não foi possível consultar o Nominatim.", 502) from exc
     if response.status_code == 429:
         raise GeocodingError("Limite de consultas ao Nominatim atingido.", 503)
     if not response.ok:
         raise GeocodingError("Erro ao consultar o Nominatim.", 502)
-    payload: list[dict[str, str]] = response.json()
+    payload: list[dict[str, Any]] = response.json()
     if not payload:
-        raise GeocodingError("Não encontramos coordenadas para o CEP informado.", 404)
-    return payload[0]
+        raise GeocodingError(not_found, 404)
+    try:
+        return {"lat": float(payload[0]["lat"]), "lng": float(payload[0]["lon"])}
+    except (KeyError, TypeError, ValueError) as exc:
+        raise GeocodingError("Resposta inválida do Nominatim.", 502) from exc
 
 
 def geocode_cep(raw_cep: str) -> dict[str, float]:
     cep = _normalize_cep(raw_cep)
-    via_cep_payload = _request_via_cep(cep)
-    query = _build_query(via_cep_payload)
-    nominatim_payload = _request_nominatim(query)
-    try:
-        lat = float(nominatim_payload["lat"])
-        lon = float(nominatim_payload["lon"])
-    except (KeyError, TypeError, ValueError) as exc:
-        raise GeocodingError("Resposta inválida do Nominatim.", 502) from exc
-    return {"lat": lat, "lng": lon}
+
+    def lookup() -> dict[str, float] | None:
+        record = lookup_cep(cep)
+        if record is not None and record.location is not None:
+            return {"lat": record.location.y, "lng": record.location.x}
+        return None
+
+    def loader() -> dict[str, float]:
+        record = lookup_cep(cep)
+        if record is not None and record.cidade and record.uf:
+            parts = record.address_parts()
+            via_cep_payload = {**parts, "localidade": parts["cidade"]}
+        else:
+            via_cep_payload = _request_via_cep(cep)
+            remember_cep(
+                cep,
+                logradouro=via_cep_payload.get("logradouro", ""),
+                bairro=via_cep_payload.get("bairro", ""),
+                cidade=via_cep_payload.get("localidade", ""),
+                uf=via_cep_payload.get("uf", ""),
+            )
+        return _request_nominatim(
+            _build_query(via_cep_payload),
+            not_found="Não encontramos coordenadas para o CEP informado.",
+        )
+
+    return _resolve_once(
+        f"geocode:cep:{cep}",
+        loader,
+        lookup=lookup,
+        store=lambda coords: remember_cep(cep, lat=coords["lat"], lng=coords["lng"]),
+    )
 
 
 def _normalize_address(raw_address: str) -> str:
@@ -133,52 +350,13 @@ def _is_state_sp(state_name: str, state_code: str) -> bool:
 def geocode_address_sp(address: str) -> dict[str, float]:
     normalized = _normalize_address(address)
     cache_key = _cache_key_for_address(normalized)
-    cached: dict[str, float] | None = cache.get(cache_key)
-    if cached:
-        return cached
-
-    headers = {
-        "User-Agent": getattr(settings, "NOMINATIM_USER_AGENT", DEFAULT_USER_AGENT),
-        "Accept-Language": "pt-BR",
-    }
-    #pprint.pprint(normalized)
-    params = {
-        "format": "jsonv2",
-        "q": f"{normalized} SP Brasil",
-        "countrycodes": "br",
-        "limit": 1,
-    }
-    try:
-        response = requests.get(NOMINATIM_URL, params=params, headers=headers, timeout=DEFAULT_TIMEOUT)
-    except requests.RequestException as exc:
-        # pprint.pprint(exc)
-        raise GeocodingError("Não foi possível consultar o Nominatim.", 502) from exc
-
-    if response.status_code == 429:
-        raise GeocodingError("Limite de consultas ao Nominatim atingido.", 503)
-    if not response.ok:
-        # pprint.pprint(response)
-        raise GeocodingError("Erro ao consultar o Nominatim.", 502)
-
-    payload: list[dict[str, Any]] = response.json()
-    if not payload:
-        raise GeocodingError("Não foi possível localizar este endereço em SP.", 404)
-
-    # pprint.pprint(payload)
-    result = payload[0]
-    try:
-        lat = float(result["lat"])
-        lon = float(result["lon"])
-    except (KeyError, TypeError, ValueError) as exc:
-        pprint.pprint(exc)
-        raise GeocodingError("Resposta inválida do Nominatim.", 502) from exc
-
-    # address_info: dict[str, Any] = result.get("address") or {}
-    # state_name = (address_info.get("state") or "").strip()
-    # state_code = (address_info.get("state_code") or "").strip().upper()
-    # if not _is_state_sp(state_name, state_code):
-    #     raise GeocodingError("O endereço localizado fica fora de São Paulo (SP).", 422)
-
-    coordinates = {"lat": lat, "lng": lon}
-    cache.set(cache_key, coordinates, GEOCODE_CACHE_TTL)
-    return coordinates
+    return _resolve_once(
+        cache_key,
+        lambda: _request_nominatim(
+            f"{normalized} SP Brasil",
+            not_found="Não foi possível localizar este endereço em SP.",
+            accept_language="pt-BR",
+        ),
+        lookup=lambda: cache.get(cache_key),
+        store=lambda coords: cache.set(cache_key, coords, GEOCODE_CACHE_TTL),
+    )
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from apps.search.models import SearchProfile, coverage_expression
+
+
+class Command(BaseCommand):
+    help = "Preenche/recalcula a área de cobertura (coverage) dos SearchProfile em lotes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Perfis atualizados por lote")
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Recalcula todos os perfis (padrão: apenas os sem coverage)",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options["batch_size"])
+        base = SearchProfile.objects.filter(origin__isnull=False)
+        if not options["all"]:
+            base = base.filter(coverage__isnull=True)
+
+        updated = 0
+        last_pk = None
+        while True:
+            # Keyset over the pk keeps each batch an index range scan and makes
+            # the walk independent of rows leaving the "missing" filter.
+            batch = base.order_by("pk")
+            if last_pk is not None:
+                batch = batch.filter(pk__gt=last_pk)
+            ids = list(batch.values_list("pk", flat=True)[:batch_size])
+            if not ids:
+                break
+            updated += SearchProfile.objects.filter(pk__in=ids).update(coverage=coverage_expression())
+            last_pk = ids[-1]
+            self.stdout.write(f"{updated} perfis atualizados…")
+
+        self.stdout.write(self.style.SUCCESS(f"Coverage preenchido em {updated} perfis."))
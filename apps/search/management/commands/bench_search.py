@@ -0,0 +1,150 @@
+import json
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.http import QueryDict
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from apps.search import views_public
+from apps.search.forms import SearchQuery
+from apps.search.management.commands.seed_fake_cards import CITY_PRESETS
+from apps.search.models import SearchCategory, SearchProfile
+from apps.search.memory_index import get_memory_index, np
+from apps.search.services import SEARCH_ENGINES, search_profiles
+
+ENGINE_MEMORY = "memory"
+# Full request paths on top of the configured engine (tile cache / memory index)
+TARGET_SERIALIZE = "serialize"
+TARGET_API = "api"
+TARGETS = (TARGET_SERIALIZE, TARGET_API)
+RADIUS_OPTIONS = [1, 3, 5, 10, 15, 20, 30, 40, 50]
+JITTER_DEGREES = 0.15
+# Share of queries issued from a few popular spots (same neighbourhood, repeated)
+HOTSPOT_SHARE = 0.6
+HOTSPOT_COUNT = 25
+HOTSPOT_JITTER_DEGREES = 0.002
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[rank]
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede latência (p50/p95/p99), vazão e consultas SQL por requisição de search_profiles por engine, "
+        "de _serialize_results ('serialize') e de cards_api ('api') sobre os SearchProfile existentes "
+        "(engine 'memory' = índice NumPy em memória)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--queries", type=int, default=200, help="Quantidade de consultas por engine")
+        parser.add_argument(
+            "--engines",
+            default=",".join(SEARCH_ENGINES),
+            help="Engines/alvos separados por vírgula (scan, prefilter, coverage, memory, serialize, api)",
+        )
+        parser.add_argument("--limit", type=int, default=15, help="Tamanho da página de resultados")
+        parser.add_argument("--seed", type=int, default=42, help="Semente do gerador de consultas")
+
+    def handle(self, *args, **options):
+        engines = [e.strip() for e in options["engines"].split(",") if e.strip()]
+        unknown = [e for e in engines if e not in SEARCH_ENGINES and e not in (ENGINE_MEMORY, *TARGETS)]
+        if unknown:
+            raise CommandError(f"Engine desconhecida: {', '.join(unknown)}")
+        if ENGINE_MEMORY in engines and np is None:
+            raise CommandError("A engine 'memory' requer numpy instalado.")
+        count = max(1, options["queries"])
+        queries = self._build_queries(count, options["limit"], options["seed"])
+
+        report = {
+            "profiles": SearchProfile.objects.filter(is_listed=True).count(),
+            "queries": count,
+            "engines": {},
+        }
+        for engine in engines:
+            run = self._runner(engine)
+            # Warm-up so connection setup, plan caching and index loading don't skew p99
+            run(queries[0])
+            samples: list[float] = []
+            query_counts: list[int] = []
+            for query in queries:
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    run(query)
+                    samples.append((time.perf_counter() - started) * 1000.0)
+                query_counts.append(len(captured.captured_queries))
+            report["engines"][engine] = {
+                "p50_ms": round(_percentile(samples, 50), 3),
+                "p95_ms": round(_percentile(samples, 95), 3),
+                "p99_ms": round(_percentile(samples, 99), 3),
+                "mean_ms": round(statistics.fmean(samples), 3),
+                "qps": round(len(samples) / (sum(samples) / 1000.0), 1) if sum(samples) else 0.0,
+                "sql_per_request": round(statistics.fmean(query_counts), 2),
+                "sql_per_request_max": max(query_counts),
+            }
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def _runner(self, engine: str):
+        if engine == ENGINE_MEMORY:
+            index = get_memory_index()
+            return lambda query: index.search(query)
+        if engine == TARGET_SERIALIZE:
+            return lambda query: views_public._serialize_results(
+                QueryDict(views_public._encode_querystring(query))
+            )
+        if engine == TARGET_API:
+            factory = RequestFactory()
+            counter = iter(range(1, 1 << 30))
+
+            def call_api(query: SearchQuery):
+                # A fresh client address per request keeps the rate limiter in
+                # the measured path without ever throttling the benchmark.
+                n = next(counter)
+                request = factory.get(
+                    f"/search/cards?{views_public._encode_querystring(query)}",
+                    REMOTE_ADDR=f"10.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}",
+                )
+                response = views_public.cards_api(request)
+                if response.status_code != 200:
+                    raise CommandError(f"cards_api respondeu {response.status_code}")
+                return response
+
+            return call_api
+        return lambda query: list(search_profiles(query, engine=engine))
+
+    def _build_queries(self, count: int, limit: int, seed: int) -> list[SearchQuery]:
+        rng = random.Random(seed)
+        categories = [None, None] + [choice.value for choice in SearchCategory]
+        modes = [None, None, "appointment", "delivery"]
+        hotspots = [self._random_point(rng, JITTER_DEGREES) for _ in range(HOTSPOT_COUNT)]
+        queries = []
+        for _ in range(count):
+            if rng.random() < HOTSPOT_SHARE:
+                lat, lng = rng.choice(hotspots)
+                lat += rng.uniform(-HOTSPOT_JITTER_DEGREES, HOTSPOT_JITTER_DEGREES)
+                lng += rng.uniform(-HOTSPOT_JITTER_DEGREES, HOTSPOT_JITTER_DEGREES)
+            else:
+                lat, lng = self._random_point(rng, JITTER_DEGREES)
+            queries.append(
+                SearchQuery(
+                    latitude=lat,
+                    longitude=lng,
+                    radius_km=float(rng.choice(RADIUS_OPTIONS)),
+                    category=rng.choice(categories),
+                    mode=rng.choice(modes),
+                    limit=max(1, limit),
+                )
+            )
+        return queries
+
+    def _random_point(self, rng: random.Random, spread: float) -> tuple[float, float]:
+        city = rng.choice(CITY_PRESETS)
+        return city["lat"] + rng.uniform(-spread, spread), city["lng"] + rng.uniform(-spread, spread)
@@ -0,0 +1,68 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.search.documents import DOCUMENT_FIELDS, document_drift
+from apps.search.models import SearchProfile
+from apps.search.tiles import bump_version
+
+SAMPLE_SIZE = 20
+
+
+class Command(BaseCommand):
+    help = "Compara o documento de busca dos SearchProfile com os cartões e corrige divergências (--repair)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repair", action="store_true", help="Regrava os documentos divergentes")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Perfis verificados por lote")
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options["batch_size"])
+        repair = options["repair"]
+        checked = 0
+        drifted = 0
+        by_field = {field: 0 for field in DOCUMENT_FIELDS}
+        samples = []
+
+        qs = SearchProfile.objects.select_related("card").order_by("pk")
+        last_pk = None
+        while True:
+            batch = list((qs if last_pk is None else qs.filter(pk__gt=last_pk))[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            checked += len(batch)
+            stale = []
+            for profile in batch:
+                drift = document_drift(profile, profile.card)
+                if not drift:
+                    continue
+                drifted += 1
+                for field in drift:
+                    by_field[field] += 1
+                if len(samples) < SAMPLE_SIZE:
+                    samples.append({"profile_id": str(profile.pk), "fields": sorted(drift)})
+                for field, value in drift.items():
+                    setattr(profile, field, value)
+                profile.updated_at = timezone.now()
+                stale.append(profile)
+            if repair and stale:
+                # bulk_update skips save()/signals: only the document columns change
+                SearchProfile.objects.bulk_update(stale, [*DOCUMENT_FIELDS, "updated_at"])
+
+        report = {
+            "checked": checked,
+            "drifted": drifted,
+            "repaired": drifted if repair else 0,
+            "by_field": {field: count for field, count in by_field.items() if count},
+            "samples": samples,
+        }
+        self.stdout.write(json.dumps(report, indent=2, ensure_ascii=False))
+        if drifted and repair:
+            bump_version()
+            self.stdout.write(self.style.SUCCESS(f"{drifted} documentos corrigidos."))
+        elif drifted:
+            self.stdout.write(self.style.WARNING(f"{drifted} documentos divergentes. Rode com --repair para corrigir."))
+        else:
+            self.stdout.write(self.style.SUCCESS("Documentos de busca consistentes."))
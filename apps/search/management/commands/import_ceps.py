@@ -0,0 +1,161 @@
+import csv
+import json
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from apps.search.cep import normalize_cep
+from apps.search.models import CepAddress
+
+# Accepted column/key aliases in the dataset
+FIELD_ALIASES = {
+    "cep": ("cep", "postal_code", "zipcode"),
+    "logradouro": ("logradouro", "street", "endereco"),
+    "bairro": ("bairro", "district", "neighborhood"),
+    "cidade": ("cidade", "localidade", "city", "municipio"),
+    "uf": ("uf", "estado", "state"),
+    "lat": ("lat", "latitude"),
+    "lng": ("lng", "lon", "longitude"),
+}
+STAGING_TABLE = "search_cep_import"
+JSON_CHUNK = 1 << 16
+
+
+def _pick(row: dict, field: str):
+    for key in FIELD_ALIASES[field]:
+        value = row.get(key)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def _coordinate(value, low: float, high: float) -> float | None:
+    try:
+        number = float(str(value).replace(",", "."))
+    except (TypeError, ValueError):
+        return None
+    return number if low <= number <= high else None
+
+
+def _iter_csv(handle):
+    sample = handle.read(4096)
+    handle.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;|\t")
+    except csv.Error:
+        dialect = csv.excel
+    yield from csv.DictReader(handle, dialect=dialect)
+
+
+def _iter_json(handle):
+    """Stream objects from a JSON array or JSON Lines without loading the file."""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    eof = False
+    while True:
+        buffer = buffer.lstrip(" \t\r\n,[")
+        if buffer.startswith("]"):
+            return
+        if buffer:
+            try:
+                obj, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise CommandError("JSON inválido no arquivo de CEPs.")
+            else:
+                yield obj
+                buffer = buffer[end:]
+                continue
+        if eof:
+            return
+        chunk = handle.read(JSON_CHUNK)
+        if not chunk:
+            eof = True
+        buffer += chunk
+
+
+def _rows(records):
+    for record in records:
+        cep = normalize_cep(str(_pick(record, "cep") or ""))
+        if not cep:
+            continue
+        yield (
+            cep,
+            str(_pick(record, "logradouro") or "")[:255],
+            str(_pick(record, "bairro") or "")[:120],
+            str(_pick(record, "cidade") or "")[:120],
+            str(_pick(record, "uf") or "").upper()[:2],
+            _coordinate(_pick(record, "lat"), -90.0, 90.0),
+            _coordinate(_pick(record, "lng"), -180.0, 180.0),
+        )
+
+
+class Command(BaseCommand):
+    help = "Importa uma base de CEPs (CSV ou JSON/JSON Lines) para a tabela local usando COPY em lotes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Arquivo .csv, .json, .jsonl ou .ndjson")
+        parser.add_argument("--format", choices=["csv", "json"], help="Força o formato (padrão: pela extensão)")
+        parser.add_argument("--batch-size", type=int, default=20000, help="Linhas por lote de COPY")
+        parser.add_argument("--encoding", default="utf-8", help="Codificação do arquivo")
+        parser.add_argument(
+            "--keep-existing",
+            action="store_true",
+            help="Não sobrescreve CEPs já presentes (padrão: atualiza)",
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        if not path.exists():
+            raise CommandError(f"Arquivo não encontrado: {path}")
+        fmt = options["format"] or ("csv" if path.suffix.lower() == ".csv" else "json")
+        batch_size = max(1, options["batch_size"])
+
+        imported = 0
+        with path.open("r", encoding=options["encoding"], newline="") as handle:
+            records = _iter_csv(handle) if fmt == "csv" else _iter_json(handle)
+            rows = _rows(records)
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    break
+                imported += self._load_batch(batch, overwrite=not options["keep_existing"])
+                self.stdout.write(f"{imported} CEPs gravados…")
+
+        self.stdout.write(self.style.SUCCESS(f"Importação concluída: {imported} CEPs gravados."))
+
+    def _load_batch(self, batch, *, overwrite: bool) -> int:
+        table = connection.ops.quote_name(CepAddress._meta.db_table)
+        if overwrite:
+            conflict = (
+                "DO UPDATE SET logradouro = EXCLUDED.logradouro, bairro = EXCLUDED.bairro, "
+                "cidade = EXCLUDED.cidade, uf = EXCLUDED.uf, "
+                "location = COALESCE(EXCLUDED.location, {table}.location), "
+                "source = EXCLUDED.source, updated_at = EXCLUDED.updated_at"
+            ).format(table=table)
+        else:
+            conflict = "DO NOTHING"
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} ("
+                "cep varchar(8), logradouro text, bairro text, cidade text, uf varchar(2), "
+                "lat double precision, lng double precision) ON COMMIT DELETE ROWS"
+            )
+            # psycopg 3 COPY streams rows without building one huge INSERT.
+            with cursor.cursor.copy(
+                f"COPY {STAGING_TABLE} (cep, logradouro, bairro, cidade, uf, lat, lng) FROM STDIN"
+            ) as copy:
+                for row in batch:
+                    copy.write_row(row)
+            cursor.execute(
+                f"INSERT INTO {table} "
+                "(id, created_at, updated_at, cep, logradouro, bairro, cidade, uf, location, source) "
+                "SELECT DISTINCT ON (cep) gen_random_uuid(), now(), now(), cep, logradouro, bairro, cidade, uf, "
+                "CASE WHEN lat IS NULL OR lng IS NULL THEN NULL "
+                "ELSE ST_SetSRID(ST_MakePoint(lng, lat), 4326) END, 'dataset' "
+                f"FROM {STAGING_TABLE} ORDER BY cep "
+                f"ON CONFLICT (cep) {conflict}"
+            )
+            return cursor.rowcount
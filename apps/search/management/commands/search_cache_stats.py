@@ -0,0 +1,18 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from apps.search.tiles import reset_tile_cache_stats, tile_cache_stats
+
+
+class Command(BaseCommand):
+    help = "Mostra os contadores de hit/miss do cache de tiles da busca."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reset", action="store_true", help="Zera os contadores após exibir")
+
+    def handle(self, *args, **options):
+        self.stdout.write(json.dumps(tile_cache_stats(), indent=2))
+        if options["reset"]:
+            reset_tile_cache_stats()
+            self.stdout.write(self.style.SUCCESS("Contadores zerados."))
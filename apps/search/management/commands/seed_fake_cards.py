@@ -5,17 +5,22 @@ from dataclasses import dataclass
 from io import BytesIO
 
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
 from django.contrib.gis.geos import Point
 from django.core.files.base import ContentFile
-from django.core.management.base import BaseCommand
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
+from django.utils import timezone
 from django.utils.text import slugify
 from PIL import Image, ImageDraw, ImageFont
 
 from apps.cards.models import Card, CardAddress, LinkButton, SocialLink
 from apps.delivery.models import MenuGroup, MenuItem
 from apps.scheduling.models import SchedulingService
-from apps.search.models import SearchCategory, SearchProfile
+from apps.search import tiles
+from apps.search.documents import build_document
+from apps.search.models import SearchCategory, SearchProfile, coverage_expression
 
 User = get_user_model()
 
@@ -306,9 +311,21 @@ AVATAR_COLORS = [
     "#95A5A6",
 ]
 
+AVATAR_SIZES = {"avatar": 512, "avatar_w128": 128, "avatar_w64": 64}
+# --scale spreads profiles uniformly around the presets instead of stacking them
+SCALE_SPREAD_DEGREES = 0.25
+
+
+def _seed_nickname(run: str, index: int) -> str:
+    # Public cards need one for their viewer_url; lowercase and short enough for [a-z0-9_.]{3,32}
+    return f"seed{run}{index}"
+
 
 class Command(BaseCommand):
-    help = "Gera usuários, cartões e dados associados para testar a busca local."
+    help = (
+        "Gera usuários, cartões e dados associados para testar a busca local "
+        "(--scale N cria cartões em massa para testes de carga)."
+    )
 
     def add_arguments(self, parser):
         parser.add_argument("--count", type=int, default=5, help="Quantidade de cartões fake a gerar")
@@ -323,8 +340,28 @@ class Command(BaseCommand):
             default="Senha123!",
             help="Senha padrão aplicada aos usuários gerados",
         )
+        parser.add_argument(
+            "--scale",
+            type=int,
+            default=0,
+            help="Modo carga: cria N cartões publicados (com endereço e perfil de busca) via bulk_create",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000, help="Linhas por lote no modo --scale")
+        parser.add_argument(
+            "--avatar-pool",
+            type=int,
+            default=16,
+            help="Avatares gerados e compartilhados entre os cartões no modo --scale",
+        )
+        parser.add_argument("--seed", type=int, default=None, help="Semente do gerador aleatório")
 
     def handle(self, *args, **options):
+        if options["seed"] is not None:
+            random.seed(options["seed"])
+        if options["scale"]:
+            self._handle_scale(options)
+            return
+
         count = options["count"]
         mode = options["mode"]
         password = options["password"]
@@ -335,12 +372,13 @@ class Command(BaseCommand):
             return
 
         created_cards: list[Card] = []
-        for _ in range(count):
+        run = uuid.uuid4().hex[:8]
+        for index in range(count):
             theme = random.choice(themes)
             with transaction.atomic():
                 full_name = self._random_full_name()
                 user = self._create_user(full_name, password)
-                card = self._create_card(user, full_name, theme)
+                card = self._create_card(user, full_name, theme, _seed_nickname(run, index))
                 self._create_address(card)
                 self._create_social_links(card, theme)
                 self._create_link_button(card)
@@ -388,7 +426,7 @@ class Command(BaseCommand):
         )
         return user
 
-    def _create_card(self, user: User, full_name: str, theme: BusinessTheme) -> Card:
+    def _create_card(self, user: User, full_name: str, theme: BusinessTheme, nickname: str) -> Card:
         first, last = full_name.split(" ", 1)
         template = random.choice(theme.title_templates)
         title = template.format(name=full_name, first_name=first, last_name=last)
@@ -401,7 +439,7 @@ class Command(BaseCommand):
             slug=slug,
             mode=theme.mode,
             status="draft",
-            nickname=None,
+            nickname=nickname,
             notification_phone=self._random_phone(),
         )
         initials = self._initials_from_name(full_name)
@@ -415,24 +453,25 @@ class Command(BaseCommand):
 
     def _assign_avatar(self, card: Card, initials: str) -> None:
         color = random.choice(AVATAR_COLORS)
-        sizes = {"avatar": 512, "avatar_w128": 128, "avatar_w64": 64}
-        for field_name, size in sizes.items():
-            image = Image.new("RGB", (size, size), color)
-            draw = ImageDraw.Draw(image)
-            font = self._load_font(int(size * 0.45))
-            if hasattr(draw, "textbbox"):
-                text_bbox = draw.textbbox((0, 0), initials, font=font)
-                text_width = text_bbox[2] - text_bbox[0]
-                text_height = text_bbox[3] - text_bbox[1]
-            else:  # Pillow < 8 compatibility
-                text_width, text_height = draw.textsize(initials, font=font)
-            position = ((size - text_width) / 2, (size - text_height) / 2)
-            draw.text(position, initials, fill="white", font=font)
-            buffer = BytesIO()
-            image.save(buffer, format="JPEG", quality=85)
-            buffer.seek(0)
+        for field_name, size in AVATAR_SIZES.items():
             filename = f"{card.slug}_{size}.jpg"
-            getattr(card, field_name).save(filename, ContentFile(buffer.read()), save=True)
+            getattr(card, field_name).save(filename, ContentFile(self._render_avatar(initials, color, size)), save=True)
+
+    def _render_avatar(self, initials: str, color: str, size: int) -> bytes:
+        image = Image.new("RGB", (size, size), color)
+        draw = ImageDraw.Draw(image)
+        font = self._load_font(int(size * 0.45))
+        if hasattr(draw, "textbbox"):
+            text_bbox = draw.textbbox((0, 0), initials, font=font)
+            text_width = text_bbox[2] - text_bbox[0]
+            text_height = text_bbox[3] - text_bbox[1]
+        else:  # Pillow < 8 compatibility
+            text_width, text_height = draw.textsize(initials, font=font)
+        position = ((size - text_width) / 2, (size - text_height) / 2)
+        draw.text(position, initials, fill="white", font=font)
+        buffer = BytesIO()
+        image.save(buffer, format="JPEG", quality=85)
+        return buffer.getvalue()
 
     def _load_font(self, size: int) -> ImageFont.FreeTypeFont | ImageFont.ImageFont:
         try:
@@ -552,3 +591,115 @@ class Command(BaseCommand):
                 "active": True,
             },
         )
+
+    # ---- --scale (bulk) mode ----
+
+    def _handle_scale(self, options) -> None:
+        total = options["scale"]
+        if total < 0:
+            raise CommandError("--scale deve ser positivo.")
+        themes = self._filter_themes(options["mode"])
+        if not themes:
+            raise CommandError("Nenhum tema disponível para o modo solicitado.")
+        batch_size = max(1, options["batch_size"])
+        avatars = self._build_avatar_pool(max(1, options["avatar_pool"]))
+        # Hash once: make_password per user would dominate the run time.
+        password_hash = make_password(options["password"])
+
+        created = 0
+        started = timezone.now()
+        run = uuid.uuid4().hex[:8]
+        while created < total:
+            size = min(batch_size, total - created)
+            nicknames = [_seed_nickname(run, created + n) for n in range(size)]
+            with transaction.atomic():
+                self._bulk_batch(nicknames, themes, avatars, password_hash)
+            created += size
+            self.stdout.write(f"{created}/{total} cartões criados…")
+
+        # bulk_create bypasses post_save, so invalidate cached search tiles here.
+        tiles.bump_version()
+        elapsed = (timezone.now() - started).total_seconds()
+        self.stdout.write(self.style.SUCCESS(f"{created} cartões publicados em {elapsed:.1f}s."))
+
+    def _build_avatar_pool(self, count: int) -> list[dict[str, str]]:
+        pool = []
+        run = uuid.uuid4().hex[:6]
+        for index in range(count):
+            initials = self._initials_from_name(self._random_full_name())
+            color = AVATAR_COLORS[index % len(AVATAR_COLORS)]
+            names = {}
+            for field_name, size in AVATAR_SIZES.items():
+                path = f"uploads/cards/avatars/pool_{run}_{index}_{size}.jpg"
+                names[field_name] = default_storage.save(
+                    path, ContentFile(self._render_avatar(initials, color, size))
+                )
+            pool.append(names)
+        return pool
+
+    def _bulk_batch(self, nicknames: list[str], themes: list[BusinessTheme], avatars: list[dict], password_hash: str) -> None:
+        now = timezone.now()
+        users, cards, addresses, profiles = [], [], [], []
+        for nickname in nicknames:
+            theme = random.choice(themes)
+            full_name = self._random_full_name()
+            first, last = full_name.split(" ", 1)
+            token = uuid.uuid4().hex
+            user = User(
+                username=slugify(f"{first}-{last}-{token[:10]}"),
+                email=f"{slugify(full_name)}.{token[:10]}@example.com",
+                password=password_hash,
+                first_name=first,
+                last_name=last,
+            )
+            title = random.choice(theme.title_templates).format(name=full_name, first_name=first, last_name=last)
+            # Published directly: the per-card publish() path also emits metering events,
+            # which synthetic load data must not produce.
+            card = Card(
+                owner=user,
+                title=title,
+                description=theme.description,
+                slug=f"{slugify(title)[:80]}-{token[:6]}",
+                mode=theme.mode,
+                status="published",
+                published_at=now,
+                nickname=nickname,
+                notification_phone=self._random_phone(),
+                **random.choice(avatars),
+            )
+            city = random.choice(CITY_PRESETS)
+            lat = city["lat"] + random.uniform(-SCALE_SPREAD_DEGREES, SCALE_SPREAD_DEGREES)
+            lng = city["lng"] + random.uniform(-SCALE_SPREAD_DEGREES, SCALE_SPREAD_DEGREES)
+            addresses.append(
+                CardAddress(
+                    card=card,
+                    label="Matriz",
+                    cep=city["cep"],
+                    logradouro=city["logradouro"],
+                    numero=str(random.randint(10, 999)),
+                    bairro=city["bairro"],
+                    cidade=city["cidade"],
+                    uf=city["uf"],
+                    lat=round(lat, 6),
+                    lng=round(lng, 6),
+                )
+            )
+            profile = SearchProfile(
+                card=card,
+                category=theme.category,
+                origin=Point(lng, lat, srid=4326),
+                radius_km=round(theme.radius_km * random.uniform(0.5, 1.5), 1),
+                active=True,
+            )
+            # save() is skipped, so fill the denormalized document ourselves.
+            for field, value in build_document(profile, card).items():
+                setattr(profile, field, value)
+            users.append(user)
+            cards.append(card)
+            profiles.append(profile)
+
+        User.objects.bulk_create(users)
+        Card.objects.bulk_create(cards)
+        CardAddress.objects.bulk_create(addresses)
+        SearchProfile.objects.bulk_create(profiles)
+        SearchProfile.objects.filter(pk__in=[p.pk for p in profiles]).update(coverage=coverage_expression())
@@ -0,0 +1,317 @@
+"""In-process vectorized search engine for the read-only search service.
+
+The ``app-search`` upstream (``config.settings_search``) only reads
+``SearchProfile`` rows, and that table changes rarely. With
+``SEARCH_MEMORY_INDEX`` enabled, each worker keeps the searchable profiles in
+compact NumPy arrays and answers ``search_profiles``-equivalent queries
+without touching PostGIS. Only the page that is served gets loaded by primary
+key.
+
+Candidates are narrowed with a vectorized haversine (with a safety margin)
+and then measured with a vectorized Vincenty formula on the WGS84 ellipsoid.
+This keeps the filters and the ``(distance, created_at, id)`` ordering equal
+to the spheroid path. The arrays are refreshed incrementally from an
+``updated_at`` watermark and rebuilt from scratch every
+``SEARCH_MEMORY_FULL_RELOAD`` seconds so that deletions are picked up.
+
+NumPy is optional and only needed where the engine is enabled.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.contrib.gis.measure import D
+from django.db.models import Max
+
+from .cursors import SOURCE_MEMORY
+from .forms import SearchQuery
+from .models import SearchCategory, SearchProfile
+from .services import searchable_profiles
+from .tiles import MEAN_EARTH_RADIUS_M, WGS84_A, WGS84_B, WGS84_F, search_profiles_cached
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the deployment image
+    np = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REFRESH_SECONDS = 30
+DEFAULT_FULL_RELOAD_SECONDS = 15 * 60
+# Rows committed late can carry an updated_at slightly older than the
+# watermark; re-read this window on every incremental refresh.
+WATERMARK_OVERLAP = timedelta(seconds=60)
+# Haversine vs. WGS84 geodesic differ by well under 0.6%.
+HAVERSINE_MARGIN = 1.01
+VINCENTY_ITERATIONS = 20
+
+CATEGORY_CODES = {choice.value: idx for idx, choice in enumerate(SearchCategory)}
+MODE_CODES = {"appointment": 0, "delivery": 1}
+UNKNOWN_CODE = -1
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def memory_index_enabled() -> bool:
+    if not getattr(settings, "SEARCH_MEMORY_INDEX", False):
+        return False
+    if np is None:
+        logger.warning("SEARCH_MEMORY_INDEX is enabled but numpy is not installed; using the database path.")
+        return False
+    return True
+
+
+def _micros(value: datetime) -> int:
+    delta = value - EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def _uuid_halves(pk: uuid.UUID) -> tuple[int, int]:
+    return pk.int >> 64, pk.int & 0xFFFFFFFFFFFFFFFF
+
+
+def haversine_m(lat: float, lng: float, lats, lngs):
+    phi1 = np.radians(lat)
+    phi2 = np.radians(lats)
+    dphi = phi2 - phi1
+    dlmb = np.radians(lngs - lng)
+    h = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlmb / 2) ** 2
+    return 2 * MEAN_EARTH_RADIUS_M * np.arcsin(np.minimum(1.0, np.sqrt(h)))
+
+
+def spheroid_distance_m(lat: float, lng: float, lats, lngs):
+    """Vectorized Vincenty inverse (WGS84), mirroring ``tiles.spheroid_distance_m``."""
+    f = WGS84_F
+    L = np.radians(lngs - lng)
+    U1 = np.arctan((1 - f) * np.tan(np.radians(lat)))
+    U2 = np.arctan((1 - f) * np.tan(np.radians(lats)))
+    sinU1, cosU1 = np.sin(U1), np.cos(U1)
+    sinU2, cosU2 = np.sin(U2), np.cos(U2)
+
+    lam = L.copy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for _ in range(VINCENTY_ITERATIONS):
+            sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+            sin_sigma = np.hypot(cosU2 * sin_lam, cosU1 * sinU2 - sinU1 * cosU2 * cos_lam)
+            cos_sigma = sinU1 * sinU2 + cosU1 * cosU2 * cos_lam
+            sigma = np.arctan2(sin_sigma, cos_sigma)
+            sin_alpha = np.where(sin_sigma == 0, 0.0, cosU1 * cosU2 * sin_lam / sin_sigma)
+            cos2_alpha = 1 - sin_alpha**2
+            cos_2sigma_m = np.where(cos2_alpha == 0, 0.0, cos_sigma - 2 * sinU1 * sinU2 / cos2_alpha)
+            C = f / 16 * cos2_alpha * (4 + f * (4 - 3 * cos2_alpha))
+            prev = lam
+            lam = L + (1 - C) * f * sin_alpha * (
+                sigma + C * sin_sigma * (cos_2sigma_m + C * cos_sigma * (-1 + 2 * cos_2sigma_m**2))
+            )
+            if np.all(np.abs(lam - prev) < 1e-12):
+                break
+
+    u2 = cos2_alpha * (WGS84_A**2 - WGS84_B**2) / WGS84_B**2
+    A = 1 + u2 / 16384 * (4096 + u2 * (-768 + u2 * (320 - 175 * u2)))
+    B = u2 / 1024 * (256 + u2 * (-128 + u2 * (74 - 47 * u2)))
+    delta_sigma = B * sin_sigma * (
+        cos_2sigma_m
+        + B / 4 * (
+            cos_sigma * (-1 + 2 * cos_2sigma_m**2)
+            - B / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma**2) * (-3 + 4 * cos_2sigma_m**2)
+        )
+    )
+    return np.where(sin_sigma == 0, 0.0, WGS84_B * A * (sigma - delta_sigma))
+
+
+@dataclass(frozen=True, slots=True)
+class _Snapshot:
+    ids: list
+    lat: "np.ndarray"
+    lng: "np.ndarray"
+    radius_m: "np.ndarray"
+    category: "np.ndarray"
+    mode: "np.ndarray"
+    created: "np.ndarray"
+    id_hi: "np.ndarray"
+    id_lo: "np.ndarray"
+
+
+class MemorySearchIndex:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._rows: dict[uuid.UUID, tuple] = {}
+        self._snapshot: _Snapshot | None = None
+        self._watermark: datetime | None = None
+        self._checked_at = 0.0
+        self._loaded_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    # -- loading -----------------------------------------------------------
+
+    @staticmethod
+    def _fetch(qs):
+        rows = qs.values_list(
+            "id", "origin", "radius_km", "category", "mode", "created_at", "updated_at"
+        )
+        for pk, origin, radius_km, category, mode, created_at, updated_at in rows.iterator(chunk_size=5000):
+            yield pk, (
+                origin.y,
+                origin.x,
+                float(radius_km) * 1000.0,
+                CATEGORY_CODES.get(category, UNKNOWN_CODE),
+                MODE_CODES.get(mode, UNKNOWN_CODE),
+                _micros(created_at),
+                *_uuid_halves(pk),
+            ), updated_at
+
+    def _build(self) -> None:
+        ids = list(self._rows)
+        columns = list(zip(*self._rows.values())) if ids else [()] * 8
+        self._snapshot = _Snapshot(
+            ids=ids,
+            lat=np.asarray(columns[0], dtype=np.float64),
+            lng=np.asarray(columns[1], dtype=np.float64),
+            radius_m=np.asarray(columns[2], dtype=np.float64),
+            category=np.asarray(columns[3], dtype=np.int8),
+            mode=np.asarray(columns[4], dtype=np.int8),
+            created=np.asarray(columns[5], dtype=np.int64),
+            id_hi=np.asarray(columns[6], dtype=np.uint64),
+            id_lo=np.asarray(columns[7], dtype=np.uint64),
+        )
+
+    def load(self) -> None:
+        with self._lock:
+            rows: dict[uuid.UUID, tuple] = {}
+            watermark = None
+            for pk, row, updated_at in self._fetch(searchable_profiles()):
+                rows[pk] = row
+                if watermark is None or updated_at > watermark:
+                    watermark = updated_at
+            self._rows = rows
+            self._watermark = watermark or SearchProfile.objects.aggregate(value=Max("updated_at"))["value"]
+            self._build()
+            self._loaded_at = self._checked_at = time.monotonic()
+
+    def refresh(self) -> int:
+        """Apply profiles changed since the watermark; return how many changed."""
+        if self._watermark is None:
+            self.load()
+            return len(self._rows)
+        with self._lock:
+            since = self._watermark - WATERMARK_OVERLAP
+            changed = SearchProfile.objects.filter(updated_at__gte=since)
+            live = {pk: row for pk, row, _ in self._fetch(searchable_profiles().filter(updated_at__gte=since))}
+            touched = 0
+            for pk, updated_at in changed.values_list("id", "updated_at"):
+                if updated_at > self._watermark:
+                    self._watermark = updated_at
+                row = live.get(pk)
+                if row is None:
+                    touched += self._rows.pop(pk, None) is not None
+                elif self._rows.get(pk) != row:
+                    self._rows[pk] = row
+                    touched += 1
+            if touched:
+                self._build()
+            self._checked_at = time.monotonic()
+            return touched
+
+    def ensure_fresh(self) -> None:
+        now = time.monotonic()
+        full_every = float(getattr(settings, "SEARCH_MEMORY_FULL_RELOAD", DEFAULT_FULL_RELOAD_SECONDS))
+        refresh_every = float(getattr(settings, "SEARCH_MEMORY_REFRESH", DEFAULT_REFRESH_SECONDS))
+        if self._snapshot is None or now - self._loaded_at >= full_every:
+            self.load()
+        elif now - self._checked_at >= refresh_every:
+            self.refresh()
+
+    # -- querying ----------------------------------------------------------
+
+    def search_ids(self, query: SearchQuery, *, extra: int = 0, skip=frozenset()) -> list[tuple[uuid.UUID, float]]:
+        """``(id, distance_m)`` of the page, leaving out the profiles in ``skip`` before the offset applies."""
+        snap = self._snapshot
+        if snap is None or not snap.ids:
+            return []
+        limit_m = snap.radius_m
+        if query.radius_km is not None:
+            limit_m = np.minimum(limit_m, query.radius_km * 1000.0)
+        mask = haversine_m(query.latitude, query.longitude, snap.lat, snap.lng) <= limit_m * HAVERSINE_MARGIN
+        for pk in skip:
+            hi, lo = (np.uint64(v) for v in _uuid_halves(pk))
+            mask &= (snap.id_hi != hi) | (snap.id_lo != lo)
+        if query.category:
+            mask &= snap.category == CATEGORY_CODES.get(query.category, UNKNOWN_CODE)
+        if query.mode:
+            mask &= snap.mode == MODE_CODES.get(query.mode, UNKNOWN_CODE)
+        idx = np.flatnonzero(mask)
+        if not idx.size:
+            return []
+
+        dist = spheroid_distance_m(query.latitude, query.longitude, snap.lat[idx], snap.lng[idx])
+        exact = dist <= limit_m[idx]
+        idx, dist = idx[exact], dist[exact]
+
+        offset = max(0, int(query.offset or 0))
+        cursor = query.cursor
+        if cursor is not None:
+            c_created = _micros(cursor.created_at)
+            c_hi, c_lo = (np.uint64(v) for v in _uuid_halves(cursor.pk))
+            created = snap.created[idx]
+            hi, lo = snap.id_hi[idx], snap.id_lo[idx]
+            after = (dist > cursor.distance_m) | (
+                (dist == cursor.distance_m)
+                & ((created > c_created) | ((created == c_created) & ((hi > c_hi) | ((hi == c_hi) & (lo > c_lo)))))
+            )
+            idx, dist = idx[after], dist[after]
+            offset = 0
+
+        wanted = offset + max(1, int(query.limit or 1)) + max(0, int(extra))
+        if idx.size > wanted:
+            # Keep everything tied with the k-th distance so created_at/id
+            # decide ties exactly like ORDER BY does.
+            kth = np.partition(dist, wanted - 1)[wanted - 1]
+            keep = dist <= kth
+            idx, dist = idx[keep], dist[keep]
+        order = np.lexsort((snap.id_lo[idx], snap.id_hi[idx], snap.created[idx], dist))
+        order = order[offset:wanted]
+        return [(snap.ids[i], float(d)) for i, d in zip(idx[order], dist[order])]
+
+    def search(self, query: SearchQuery, *, extra: int = 0) -> list[SearchProfile]:
+        """Same contract as ``list(search_profiles(...))``."""
+        if query.cursor is not None and query.cursor.source != SOURCE_MEMORY:
+            # Issued by another engine (e.g. before the index was enabled): let it continue
+            return search_profiles_cached(query, extra=extra)
+        self.ensure_fresh()
+        unlisted: set = set()
+        while True:
+            hits = self.search_ids(query, extra=extra, skip=unlisted)
+            loaded = SearchProfile.objects.filter(is_listed=True).in_bulk([pk for pk, _ in hits])
+            gone = {pk for pk, _ in hits if pk not in loaded}
+            if not gone:
+                break
+            # Unlisted since the last refresh: refill the page (and the has_more row) from the next hits
+            unlisted |= gone
+
+        profiles = []
+        for pk, distance_m in hits:
+            profile = loaded[pk]
+            profile.distance = D(m=distance_m)
+            profile.distance_source = SOURCE_MEMORY
+            profiles.append(profile)
+        return profiles
+
+
+_index: MemorySearchIndex | None = None
+_index_lock = threading.Lock()
+
+
+def get_memory_index() -> MemorySearchIndex:
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = MemorySearchIndex()
+    return _index
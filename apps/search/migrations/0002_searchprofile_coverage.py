@@ -0,0 +1,27 @@
+# Generated manually: materialized coverage disc for index-backed "serves this point" lookups
+from __future__ import annotations
+
+import django.contrib.gis.db.models.fields
+from django.contrib.postgres.indexes import GistIndex
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("search", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="searchprofile",
+            name="coverage",
+            field=django.contrib.gis.db.models.fields.PolygonField(
+                blank=True, editable=False, geography=True, null=True, srid=4326
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="searchprofile",
+            index=GistIndex(fields=["coverage"], name="search_coverage_gix"),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated manually: local CEP lookup table
+from __future__ import annotations
+
+import uuid
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("search", "0002_searchprofile_coverage"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CepAddress",
+            fields=[
+                ("id", models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("cep", models.CharField(max_length=8, unique=True)),
+                ("logradouro", models.CharField(blank=True, default="", max_length=255)),
+                ("bairro", models.CharField(blank=True, default="", max_length=120)),
+                ("cidade", models.CharField(blank=True, default="", max_length=120)),
+                ("uf", models.CharField(blank=True, default="", max_length=2)),
+                (
+                    "location",
+                    django.contrib.gis.db.models.fields.PointField(blank=True, null=True, srid=4326),
+                ),
+                (
+                    "source",
+                    models.CharField(
+                        choices=[("dataset", "Base importada"), ("remote", "Consulta remota")],
+                        default="remote",
+                        max_length=16,
+                    ),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+    ]
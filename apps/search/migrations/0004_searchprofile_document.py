@@ -0,0 +1,83 @@
+# Generated manually: denormalized search document on SearchProfile
+from __future__ import annotations
+
+from django.contrib.postgres.indexes import GistIndex
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+AVATAR_FIELDS = ("avatar_w128", "avatar_w64", "avatar")
+
+
+def backfill_documents(apps, schema_editor):
+    SearchProfile = apps.get_model("search", "SearchProfile")
+    qs = SearchProfile.objects.select_related("card").order_by("pk")
+    last_pk = None
+    while True:
+        batch_qs = qs if last_pk is None else qs.filter(pk__gt=last_pk)
+        batch = list(batch_qs[:BATCH_SIZE])
+        if not batch:
+            break
+        for profile in batch:
+            card = profile.card
+            profile.title = card.title or ""
+            profile.nickname = card.nickname or ""
+            profile.mode = card.mode or ""
+            profile.is_listed = bool(
+                profile.active
+                and profile.origin is not None
+                and card.status == "published"
+                and not card.deactivation_marked
+            )
+            profile.avatar_thumb_path = next(
+                (getattr(card, f).name for f in AVATAR_FIELDS if getattr(card, f) and getattr(card, f).name),
+                "",
+            )
+        SearchProfile.objects.bulk_update(
+            batch, ["title", "nickname", "mode", "is_listed", "avatar_thumb_path"]
+        )
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cards", "0013_card_about_markdown"),
+        ("search", "0003_cepaddress"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="searchprofile",
+            name="title",
+            field=models.CharField(blank=True, default="", editable=False, max_length=120),
+        ),
+        migrations.AddField(
+            model_name="searchprofile",
+            name="nickname",
+            field=models.CharField(blank=True, default="", editable=False, max_length=32),
+        ),
+        migrations.AddField(
+            model_name="searchprofile",
+            name="mode",
+            field=models.CharField(blank=True, default="", editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name="searchprofile",
+            name="is_listed",
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name="searchprofile",
+            name="avatar_thumb_path",
+            field=models.CharField(blank=True, default="", editable=False, max_length=255),
+        ),
+        migrations.RunPython(backfill_documents, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="searchprofile",
+            index=GistIndex(condition=models.Q(("is_listed", True)), fields=["origin"], name="search_listed_origin_gix"),
+        ),
+        migrations.AddIndex(
+            model_name="searchprofile",
+            index=GistIndex(condition=models.Q(("is_listed", True)), fields=["coverage"], name="search_listed_coverage_gix"),
+        ),
+    ]
@@ -2,6 +2,8 @@ from django.contrib.gis.db import models as gis_models
 from django.contrib.postgres.indexes import GistIndex
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.db.models import F, Func, Q
+from django.db.models.functions import Cast
 
 from apps.common.models import BaseModel
 
@@ -14,6 +16,23 @@ class SearchCategory(models.TextChoices):
     CONSULTORIA = "consultoria", "Consultoria (contábil/advogado)"
 
 
+# ST_Buffer approximates the disc with a polygon whose vertices sit on the
+# circle; inflate it slightly so the polygon always contains the true disc.
+# Searches still re-check the exact spheroid distance.
+COVERAGE_MARGIN = 1.01
+COVERAGE_FIELDS = frozenset({"origin", "radius_km"})
+
+
+def coverage_expression() -> Func:
+    """SQL expression for the geography disc of ``radius_km`` around ``origin``."""
+    return Func(
+        Cast("origin", gis_models.PointField(geography=True, srid=4326)),
+        F("radius_km") * (1000 * COVERAGE_MARGIN),
+        function="ST_Buffer",
+        output_field=gis_models.PolygonField(geography=True, srid=4326),
+    )
+
+
 class SearchProfile(BaseModel):
     card = models.OneToOneField(
         "cards.Card",
@@ -24,16 +43,70 @@ class SearchProfile(BaseModel):
     origin = gis_models.PointField(srid=4326, null=True, blank=True)
     radius_km = models.FloatField(validators=[MinValueValidator(0.01)])
     active = models.BooleanField(default=True)
+    # Materialized service area (derived from origin + radius_km on save)
+    coverage = gis_models.PolygonField(geography=True, srid=4326, null=True, blank=True, editable=False)
+    # Denormalized search document (apps.search.documents), kept in sync with the card
+    title = models.CharField(max_length=120, blank=True, default="", editable=False)
+    nickname = models.CharField(max_length=32, blank=True, default="", editable=False)
+    mode = models.CharField(max_length=20, blank=True, default="", editable=False)
+    is_listed = models.BooleanField(default=False, editable=False)
+    avatar_thumb_path = models.CharField(max_length=255, blank=True, default="", editable=False)
 
     class Meta:
         indexes = [
             GistIndex(fields=["origin"], name="search_origin_gix"),
+            GistIndex(fields=["coverage"], name="search_coverage_gix"),
+            GistIndex(fields=["origin"], name="search_listed_origin_gix", condition=Q(is_listed=True)),
+            GistIndex(fields=["coverage"], name="search_listed_coverage_gix", condition=Q(is_listed=True)),
             models.Index(fields=["active"], name="search_active_idx"),
         ]
 
     def __str__(self) -> str:
         return f"Perfil de busca · {self.card.title}"
 
+    def save(self, *args, **kwargs):
+        from .documents import DOCUMENT_FIELDS, build_document
+
+        for field, value in build_document(self, self.card).items():
+            setattr(self, field, value)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, *DOCUMENT_FIELDS}
+        super().save(*args, **kwargs)
+        if update_fields is None or COVERAGE_FIELDS.intersection(update_fields):
+            self.refresh_coverage()
+
+    def refresh_coverage(self) -> None:
+        type(self).objects.filter(pk=self.pk).update(coverage=coverage_expression())
+
     @property
     def has_coordinates(self) -> bool:
         return self.origin is not None
+
+
+class CepAddress(BaseModel):
+    """Local CEP → address/centroid table, consulted before ViaCEP/Nominatim."""
+
+    SOURCE_CHOICES = [
+        ("dataset", "Base importada"),
+        ("remote", "Consulta remota"),
+    ]
+
+    cep = models.CharField(max_length=8, unique=True)
+    logradouro = models.CharField(max_length=255, blank=True, default="")
+    bairro = models.CharField(max_length=120, blank=True, default="")
+    cidade = models.CharField(max_length=120, blank=True, default="")
+    uf = models.CharField(max_length=2, blank=True, default="")
+    location = gis_models.PointField(srid=4326, null=True, blank=True)
+    source = models.CharField(max_length=16, choices=SOURCE_CHOICES, default="remote")
+
+    def __str__(self) -> str:
+        return f"{self.cep} · {self.cidade}/{self.uf}"
+
+    def address_parts(self) -> dict[str, str]:
+        return {
+            "logradouro": self.logradouro,
+            "bairro": self.bairro,
+            "cidade": self.cidade,
+            "uf": self.uf,
+        }
@@ -15,17 +15,10 @@ MODE_LABELS = {
 
 
 def serialize_profile(profile: SearchProfile) -> dict[str, Any]:
-    card = profile.card
+    """Serialize from the denormalized search document; never touches the card."""
     distance_km = profile_distance_km(profile)
     viewer_base = getattr(settings, "VIEWER_BASE_URL", "")
-    avatar_path = None
-    image_fields = ["avatar_w128", "avatar_w64", "avatar"]
-    for field in image_fields:
-        image = getattr(card, field, None)
-        name = getattr(image, "name", "") if image else ""
-        if name:
-            avatar_path = name
-            break
+    avatar_path = profile.avatar_thumb_path or None
 
     avatar_url = None
     if avatar_path:
@@ -34,11 +27,11 @@ def serialize_profile(profile: SearchProfile) -> dict[str, Any]:
         except NoReverseMatch:
             avatar_url = None
     return {
-        "card_id": str(card.id),
-        "title": card.title,
-        "nickname": card.nickname,
-        "mode": card.mode,
-        "mode_label": MODE_LABELS.get(card.mode, card.mode),
+        "card_id": str(profile.card_id),
+        "title": profile.title,
+        "nickname": profile.nickname,
+        "mode": profile.mode,
+        "mode_label": MODE_LABELS.get(profile.mode, profile.mode),
         "category": profile.category,
         "category_label": profile.get_category_display(),
         "radius_km": float(profile.radius_km),
@@ -46,5 +39,5 @@ def serialize_profile(profile: SearchProfile) -> dict[str, Any]:
         "distance_label": format_distance(distance_km),
         "avatar_thumb_path": avatar_path,
         "avatar_thumb_url": avatar_url,
-        "viewer_url": f"{viewer_base}/@{card.nickname}" if card.nickname else None,
+        "viewer_url": f"{viewer_base}/@{profile.nickname}" if profile.nickname else None,
     }
@@ -1,28 +1,114 @@
 from __future__ import annotations
 
+import math
+
+from django.conf import settings
 from django.contrib.gis.db.models.functions import Distance
-from django.contrib.gis.geos import Point
-from django.db.models import F, QuerySet
+from django.contrib.gis.geos import Point, Polygon
+from django.db.models import F, Q, QuerySet
 
-from .forms import SearchQuery
+from .cursors import SOURCE_DB, without_foreign_cursor
+from .forms import PROFILE_RADIUS_MAX, SearchQuery
 from .models import SearchProfile
 
+ENGINE_SCAN = "scan"
+ENGINE_PREFILTER = "prefilter"
+ENGINE_COVERAGE = "coverage"
+SEARCH_ENGINES = (ENGINE_SCAN, ENGINE_PREFILTER, ENGINE_COVERAGE)
+DEFAULT_ENGINE = ENGINE_PREFILTER
+
+# Conservative degree lengths (WGS84): the shortest meridian degree and the
+# equatorial parallel degree, so the bbox never under-covers the radius.
+KM_PER_DEGREE_LAT = 110.574
+KM_PER_DEGREE_LNG = 111.320
+BBOX_MARGIN = 1.01
+
 
 def build_point(lat: float, lng: float, srid: int = 4326) -> Point:
     """Return a GEOS point in lon/lat order."""
     return Point(float(lng), float(lat), srid=srid)
 
 
-def search_profiles(query: SearchQuery, *, extra: int = 0) -> QuerySet[SearchProfile]:
+def search_bbox(lat: float, lng: float, radius_km: float) -> Polygon:
+    """Return a lon/lat envelope that contains every point within ``radius_km``."""
+    reach_km = max(0.0, float(radius_km)) * BBOX_MARGIN
+    lat_delta = reach_km / KM_PER_DEGREE_LAT
+    min_lat = max(-90.0, lat - lat_delta)
+    max_lat = min(90.0, lat + lat_delta)
+    # Parallels shrink towards the poles: size the longitude span at the
+    # latitude closest to a pole so the whole disc fits.
+    cos_lat = math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+    if cos_lat <= 1e-9:
+        min_lng, max_lng = -180.0, 180.0
+    else:
+        lng_delta = reach_km / (KM_PER_DEGREE_LNG * cos_lat)
+        min_lng, max_lng = lng - lng_delta, lng + lng_delta
+        if min_lng < -180.0 or max_lng > 180.0:
+            # Crossing the antimeridian: fall back to the full longitude band.
+            min_lng, max_lng = -180.0, 180.0
+    bbox = Polygon.from_bbox((min_lng, min_lat, max_lng, max_lat))
+    bbox.srid = 4326
+    return bbox
+
+
+def _resolve_engine(engine: str | None) -> str:
+    value = engine or getattr(settings, "SEARCH_ENGINE", DEFAULT_ENGINE)
+    if value not in SEARCH_ENGINES:
+        raise ValueError(f"Unknown search engine: {value!r}")
+    return value
+
+
+def searchable_profiles() -> QuerySet[SearchProfile]:
+    """Profiles that may show up in public search at all."""
+    # is_listed = active + has origin + published, non-deactivated card
+    # (see apps.search.documents); served by the partial GiST indexes.
+    return SearchProfile.objects.filter(is_listed=True)
+
+
+def search_profiles(
+    query: SearchQuery,
+    *,
+    extra: int = 0,
+    engine: str | None = None,
+) -> QuerySet[SearchProfile]:
+    """Return active profiles whose radius covers the user, nearest first.
+
+    The ``prefilter`` engine (default) first narrows candidates with a bbox
+    ``&&`` on ``origin`` so the ``search_origin_gix`` GiST index drives the
+    scan; the spheroid distance is then evaluated only for the survivors.
+    The ``coverage`` engine answers "which profiles serve this point" with a
+    single ``ST_Covers`` probe on the materialized ``coverage`` disc
+    (``search_coverage_gix``); it requires ``backfill_search_coverage`` to
+    have populated existing rows. The ``scan`` engine keeps the original
+    full-table distance evaluation.
+
+    Every engine re-checks the exact spheroid distance, so results match.
+
+    When ``query.cursor`` is set the page starts right after that
+    ``(distance, created_at, id)`` position and ``offset`` is ignored, so deep
+    pages cost the same as the first one. Cursors measured by the tile cache
+    or the memory index are dropped (see ``cursors.SOURCE_DB``).
+    """
+    engine = _resolve_engine(engine)
+    query = without_foreign_cursor(query, SOURCE_DB)
     user_point = build_point(query.latitude, query.longitude)
     offset = max(0, int(getattr(query, "offset", 0) or 0))
     limit = max(1, int(getattr(query, "limit", 1) or 1))
     total = limit + max(0, int(extra))
 
+    qs = searchable_profiles()
+    if engine == ENGINE_PREFILTER:
+        # A profile can only match within min(query radius, its own radius);
+        # without a query radius the ceiling is the largest profile radius.
+        reach_km = query.radius_km if query.radius_km is not None else PROFILE_RADIUS_MAX
+        qs = qs.filter(origin__bboverlaps=search_bbox(query.latitude, query.longitude, reach_km))
+    elif engine == ENGINE_COVERAGE:
+        qs = qs.filter(coverage__covers=user_point)
+        if query.radius_km is not None:
+            qs = qs.filter(origin__bboverlaps=search_bbox(query.latitude, query.longitude, query.radius_km))
+
     qs = (
-        SearchProfile.objects
-        .filter(active=True, origin__isnull=False)
-        .filter(card__status="published", card__deactivation_marked=False)
+        qs
         .annotate(distance=Distance("origin", user_point, spheroid=True))
         .filter(distance__lte=F("radius_km") * 1000)
     )
@@ -32,13 +118,18 @@ def search_profiles(query: SearchQuery, *, extra: int = 0) -> QuerySet[SearchPro
     if query.category:
         qs = qs.filter(category=query.category)
     if query.mode:
-        qs = qs.filter(card__mode=query.mode)
+        qs = qs.filter(mode=query.mode)
 
-    return (
-        qs
-        .select_related("card")
-        .order_by("distance", "created_at")[offset: offset + total]
-    )
+    cursor = getattr(query, "cursor", None)
+    if cursor is not None:
+        qs = qs.filter(
+            Q(distance__gt=cursor.distance_m)
+            | Q(distance=cursor.distance_m, created_at__gt=cursor.created_at)
+            | Q(distance=cursor.distance_m, created_at=cursor.created_at, id__gt=cursor.pk)
+        )
+        offset = 0
+
+    return qs.order_by("distance", "created_at", "id")[offset: offset + total]
 
 
 def profile_distance_km(profile: SearchProfile) -> float:
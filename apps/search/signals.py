@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from apps.cards.models import Card
+
+from . import tiles
+from .documents import sync_card_document
+from .models import SearchProfile
+
+
+def _bump_tiles(*_args, **_kwargs) -> None:
+    # Bump now so this transaction never reads a stale tile, and again after
+    # commit so a concurrent request cannot re-cache pre-commit rows.
+    tiles.bump_version()
+    transaction.on_commit(tiles.bump_version)
+
+
+def _sync_card_document(sender, instance: Card, **kwargs) -> None:
+    if sync_card_document(instance):
+        _bump_tiles()
+
+
+post_save.connect(_bump_tiles, sender=SearchProfile, dispatch_uid="search.profile.tiles.save")
+post_delete.connect(_bump_tiles, sender=SearchProfile, dispatch_uid="search.profile.tiles.delete")
+post_save.connect(_sync_card_document, sender=Card, dispatch_uid="search.card.document.save")
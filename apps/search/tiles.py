@@ -0,0 +1,295 @@
+"""Quantized geo-tile cache of search candidates.
+
+Public searches cluster in a few dense neighbourhoods with a handful of radius
+options, so the candidate set for a small lat/lng tile is cached in Redis and
+reused by every user point that falls inside it. Each entry holds the profiles
+that could match *any* point in the tile (the tile half-diagonal is added as
+slack), ordered by distance to the tile centre. Exact distances for the real
+user point are then computed in Python and only the served page is loaded
+from the database.
+
+Refinement stops early: an entry ``c`` metres from the tile centre is at
+least ``c - slack`` from any point in the tile, so once that bound passes the
+last distance the page needs, no later entry can make it. Profiles unlisted
+since the entry was built are skipped and the page is refilled from the
+following candidates.
+
+The cache only stands in for the default ``prefilter`` engine (its candidate
+query is a bbox prefilter too); with ``SEARCH_ENGINE`` set to ``scan`` or
+``coverage`` searches go straight to the database.
+
+Entries are keyed by a global version that is bumped whenever a
+``SearchProfile`` or a search-relevant ``Card`` field changes.
+"""
+from __future__ import annotations
+
+import heapq
+import math
+import time
+from typing import Any
+
+from django.conf import settings
+from django.contrib.gis.db.models.functions import Distance
+from django.contrib.gis.measure import D
+from django.core.cache import cache
+from django.db.models import F
+
+from .cursors import SOURCE_DB, SOURCE_TILES, without_foreign_cursor
+from .forms import PROFILE_RADIUS_MAX, SearchQuery
+from .models import SearchProfile
+from .services import ENGINE_PREFILTER, _resolve_engine, build_point, search_bbox, search_profiles, searchable_profiles
+
+VERSION_KEY = "search:tiles:version"
+HITS_KEY = "search:tiles:hits"
+MISSES_KEY = "search:tiles:misses"
+DEFAULT_TILE_SIZE_DEG = 0.01  # ~1.1 km in latitude
+DEFAULT_TILE_TIMEOUT = 10 * 60
+# Bump when the cached entry layout changes
+TILE_FORMAT = 2
+
+# WGS84 ellipsoid, as used by PostGIS ST_DistanceSpheroid
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+WGS84_B = WGS84_A * (1 - WGS84_F)
+MEAN_EARTH_RADIUS_M = 6371008.8
+
+
+def tile_cache_enabled() -> bool:
+    return bool(getattr(settings, "SEARCH_TILE_CACHE_ENABLED", False))
+
+
+def _tile_size() -> float:
+    return float(getattr(settings, "SEARCH_TILE_SIZE_DEG", DEFAULT_TILE_SIZE_DEG))
+
+
+def _haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    h = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * MEAN_EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(h)))
+
+
+def spheroid_distance_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Geodesic distance on the WGS84 ellipsoid (Vincenty inverse formula)."""
+    if lat1 == lat2 and lng1 == lng2:
+        return 0.0
+    f = WGS84_F
+    L = math.radians(lng2 - lng1)
+    U1 = math.atan((1 - f) * math.tan(math.radians(lat1)))
+    U2 = math.atan((1 - f) * math.tan(math.radians(lat2)))
+    sinU1, cosU1 = math.sin(U1), math.cos(U1)
+    sinU2, cosU2 = math.sin(U2), math.cos(U2)
+
+    lam = L
+    for _ in range(200):
+        sin_lam, cos_lam = math.sin(lam), math.cos(lam)
+        sin_sigma = math.hypot(cosU2 * sin_lam, cosU1 * sinU2 - sinU1 * cosU2 * cos_lam)
+        if sin_sigma == 0:
+            return 0.0
+        cos_sigma = sinU1 * sinU2 + cosU1 * cosU2 * cos_lam
+        sigma = math.atan2(sin_sigma, cos_sigma)
+        sin_alpha = cosU1 * cosU2 * sin_lam / sin_sigma
+        cos2_alpha = 1 - sin_alpha**2
+        cos_2sigma_m = cos_sigma - 2 * sinU1 * sinU2 / cos2_alpha if cos2_alpha else 0.0
+        C = f / 16 * cos2_alpha * (4 + f * (4 - 3 * cos2_alpha))
+        prev = lam
+        lam = L + (1 - C) * f * sin_alpha * (
+            sigma + C * sin_sigma * (cos_2sigma_m + C * cos_sigma * (-1 + 2 * cos_2sigma_m**2))
+        )
+        if abs(lam - prev) < 1e-12:
+            break
+    else:
+        # Nearly antipodal points do not converge; far outside any search radius.
+        return _haversine_m(lat1, lng1, lat2, lng2)
+
+    u2 = cos2_alpha * (WGS84_A**2 - WGS84_B**2) / WGS84_B**2
+    A = 1 + u2 / 16384 * (4096 + u2 * (-768 + u2 * (320 - 175 * u2)))
+    B = u2 / 1024 * (256 + u2 * (-128 + u2 * (74 - 47 * u2)))
+    delta_sigma = B * sin_sigma * (
+        cos_2sigma_m
+        + B / 4 * (
+            cos_sigma * (-1 + 2 * cos_2sigma_m**2)
+            - B / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma**2) * (-3 + 4 * cos_2sigma_m**2)
+        )
+    )
+    return WGS84_B * A * (sigma - delta_sigma)
+
+
+def tile_for(lat: float, lng: float, size: float | None = None) -> tuple[int, int]:
+    size = size or _tile_size()
+    return math.floor(lat / size), math.floor(lng / size)
+
+
+def _tile_geometry(tile: tuple[int, int], size: float) -> tuple[float, float, float]:
+    """Return the tile centre and the slack (metres) covering any point inside it."""
+    row, col = tile
+    min_lat, min_lng = row * size, col * size
+    center_lat, center_lng = min_lat + size / 2, min_lng + size / 2
+    corners = [
+        (min_lat, min_lng),
+        (min_lat, min_lng + size),
+        (min_lat + size, min_lng),
+        (min_lat + size, min_lng + size),
+    ]
+    slack = max(spheroid_distance_m(center_lat, center_lng, lat, lng) for lat, lng in corners)
+    return center_lat, center_lng, slack * 1.01 + 1.0
+
+
+def current_version() -> int:
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Seed with a timestamp so an evicted counter never reuses old keys.
+        cache.add(VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = cache.get(VERSION_KEY) or 0
+    return int(version)
+
+
+def bump_version() -> None:
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, int(time.time() * 1000), timeout=None)
+
+
+def _count(key: str) -> None:
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def tile_cache_stats() -> dict[str, Any]:
+    hits = int(cache.get(HITS_KEY) or 0)
+    misses = int(cache.get(MISSES_KEY) or 0)
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / total, 4) if total else 0.0,
+        "version": current_version(),
+        "tile_size_deg": _tile_size(),
+    }
+
+
+def reset_tile_cache_stats() -> None:
+    cache.delete_many([HITS_KEY, MISSES_KEY])
+
+
+def _tile_key(version: int, tile: tuple[int, int], size: float, query: SearchQuery) -> str:
+    radius = "any" if query.radius_km is None else f"{float(query.radius_km):g}"
+    return ":".join(
+        [
+            "search:tile",
+            f"f{TILE_FORMAT}",
+            f"v{version}",
+            f"{size:g}",
+            str(tile[0]),
+            str(tile[1]),
+            radius,
+            query.category or "*",
+            query.mode or "*",
+        ]
+    )
+
+
+def _load_candidates(center_lat: float, center_lng: float, slack_m: float, query: SearchQuery) -> list[tuple]:
+    center = build_point(center_lat, center_lng)
+    reach_km = query.radius_km if query.radius_km is not None else PROFILE_RADIUS_MAX
+    qs = (
+        searchable_profiles()
+        .filter(origin__bboverlaps=search_bbox(center_lat, center_lng, reach_km + slack_m / 1000.0))
+        .annotate(distance=Distance("origin", center, spheroid=True))
+        .filter(distance__lte=F("radius_km") * 1000 + slack_m)
+    )
+    if query.radius_km is not None:
+        qs = qs.filter(distance__lte=query.radius_km * 1000 + slack_m)
+    if query.category:
+        qs = qs.filter(category=query.category)
+    if query.mode:
+        qs = qs.filter(mode=query.mode)
+    rows = qs.order_by("distance", "created_at", "id").values_list(
+        "id", "origin", "radius_km", "created_at", "distance"
+    )
+    return [
+        (pk, origin.y, origin.x, float(radius_km), created_at, distance.m)
+        for pk, origin, radius_km, created_at, distance in rows
+    ]
+
+
+def _refine(entries: list[tuple], slack_m: float, query: SearchQuery, needed: int, skip: set) -> list[tuple]:
+    """The first ``needed`` ``(distance, created_at, pk)`` rows for the user point, past the cursor.
+
+    ``entries`` are ordered by distance to the tile centre, so the scan stops
+    once that lower bound exceeds the ``needed``-th distance found so far.
+    """
+    cursor = query.cursor
+    position = (cursor.distance_m, cursor.created_at, cursor.pk) if cursor is not None else None
+    refined = []
+    nearest = []  # max-heap (negated) of the ``needed`` smallest distances
+    for pk, lat, lng, radius_km, created_at, center_m in entries:
+        if len(nearest) >= needed and center_m - slack_m > -nearest[0]:
+            break
+        if pk in skip:
+            continue
+        distance_m = spheroid_distance_m(query.latitude, query.longitude, lat, lng)
+        if distance_m > radius_km * 1000:
+            continue
+        if query.radius_km is not None and distance_m > query.radius_km * 1000:
+            continue
+        row = (distance_m, created_at, pk)
+        if position is not None and row <= position:
+            continue
+        refined.append(row)
+        if len(nearest) < needed:
+            heapq.heappush(nearest, -distance_m)
+        elif distance_m < -nearest[0]:
+            heapq.heapreplace(nearest, -distance_m)
+    refined.sort()
+    return refined[:needed]
+
+
+def search_profiles_cached(query: SearchQuery, *, extra: int = 0) -> list[SearchProfile]:
+    """Same contract as ``list(search_profiles(...))``, served from the tile cache."""
+    if not tile_cache_enabled() or _resolve_engine(None) != ENGINE_PREFILTER:
+        return list(search_profiles(query, extra=extra))
+    if query.cursor is not None and query.cursor.source == SOURCE_DB:
+        # Only PostGIS reproduces that distance exactly
+        return list(search_profiles(query, extra=extra))
+    query = without_foreign_cursor(query, SOURCE_TILES)
+
+    size = _tile_size()
+    tile = tile_for(query.latitude, query.longitude, size)
+    key = _tile_key(current_version(), tile, size, query)
+    cached = cache.get(key)
+    if cached is None:
+        _count(MISSES_KEY)
+        center_lat, center_lng, slack_m = _tile_geometry(tile, size)
+        cached = (slack_m, _load_candidates(center_lat, center_lng, slack_m, query))
+        cache.set(key, cached, timeout=int(getattr(settings, "SEARCH_TILE_CACHE_TIMEOUT", DEFAULT_TILE_TIMEOUT)))
+    else:
+        _count(HITS_KEY)
+    slack_m, entries = cached
+
+    # With a cursor the page starts right after it, as in search_profiles
+    offset = 0 if query.cursor is not None else max(0, int(query.offset or 0))
+    total = max(1, int(query.limit or 1)) + max(0, int(extra))
+    unlisted: set = set()
+    while True:
+        page = _refine(entries, slack_m, query, offset + total, unlisted)[offset:]
+        loaded = SearchProfile.objects.filter(is_listed=True).in_bulk([pk for _, _, pk in page])
+        gone = {pk for _, _, pk in page if pk not in loaded}
+        if not gone:
+            break
+        # Unlisted after the entry was built: refill the page from the next candidates
+        unlisted |= gone
+        cache.delete(key)
+
+    profiles = []
+    for distance_m, _, pk in page:
+        profile = loaded[pk]
+        profile.distance = D(m=distance_m)
+        profile.distance_source = SOURCE_TILES
+        profiles.append(profile)
+    return profiles
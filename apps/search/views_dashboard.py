@@ -98,7 +98,7 @@ def profile_deactivate(request, card_id: str) -> HttpResponse:
     if profile is None:
         return _render_panel(request, card)
     profile.active = False
-    profile.save(update_fields=["active"])
+    profile.save(update_fields=["active", "updated_at"])
     resp = _render_panel(request, card)
     resp["HX-Trigger"] = json.dumps({"flash": {"type": "success", "title": "Perfil desativado", "message": "O perfil não aparecerá nas buscas."}})
     return resp
@@ -1,21 +1,22 @@
 from __future__ import annotations
 
-import json
-import time
 from typing import Any
 from urllib.parse import urlencode
 
 from django.conf import settings
-from django.core.cache import cache
 from django.http import HttpRequest, HttpResponse, JsonResponse, QueryDict
 from django.shortcuts import render
 from django.views.decorators.http import require_GET, require_POST
 from django.urls import reverse
 
+from apps.common.rate_limit import check_rate_limits
+
+from .cursors import cursor_for, encode_cursor
 from .forms import SearchQuery, SearchQueryForm
-from .models import SearchCategory
+from .memory_index import get_memory_index, memory_index_enabled
+from .models import SearchCategory, SearchProfile
 from .serializers import serialize_profile
-from .services import search_profiles
+from .tiles import search_profiles_cached
 from .geocoding import GeocodingError, geocode_cep, geocode_address_sp
 
 DEFAULT_RATE_LIMIT = int(getattr(settings, "SEARCH_RATE_LIMIT", 60))
@@ -47,23 +48,8 @@ def _check_rate_limit(
 ) -> tuple[bool, int]:
     window = int(window or DEFAULT_RATE_WINDOW)
     limit = int(limit or DEFAULT_RATE_LIMIT)
-    key = f"{prefix}:{_client_key(request)}"
-    now = int(time.time())
-    entry = cache.get(key)
-    if entry is None:
-        cache.set(key, json.dumps({"count": 1, "reset": now + window}), timeout=window)
-        return True, window
-    try:
-        payload: dict[str, Any] = json.loads(entry)
-    except Exception:
-        payload = {"count": 0, "reset": now + window}
-    count = int(payload.get("count", 0)) + 1
-    reset = int(payload.get("reset", now + window))
-    if count > limit:
-        ttl = max(0, reset - now)
-        return False, ttl
-    cache.set(key, json.dumps({"count": count, "reset": reset}), timeout=max(1, reset - now))
-    return True, max(0, reset - now)
+    result = check_rate_limits(prefix, _client_key(request), [(limit, window)])
+    return result.allowed, result.retry_after
 
 
 def _clamp_radius(value: float | None) -> float:
@@ -76,7 +62,18 @@ def _is_inside_sp(lat: float, lng: float) -> bool:
     return (SP_LAT_MIN <= lat <= SP_LAT_MAX) and (SP_LNG_MIN <= lng <= SP_LNG_MAX)
 
 
-def _encode_querystring(query: SearchQuery, *, offset: int | None = None) -> str:
+def _find_profiles(query: SearchQuery, *, extra: int = 0) -> list[SearchProfile]:
+    if memory_index_enabled():
+        return get_memory_index().search(query, extra=extra)
+    return search_profiles_cached(query, extra=extra)
+
+
+def _encode_querystring(
+    query: SearchQuery,
+    *,
+    offset: int | None = None,
+    cursor: str | None = None,
+) -> str:
     actual_offset = query.offset if offset is None else max(0, offset)
     params: dict[str, Any] = {
         "lat": f"{float(query.latitude):.6f}",
@@ -93,6 +90,9 @@ def _encode_querystring(query: SearchQuery, *, offset: int | None = None) -> str
     mode = getattr(query, "mode", None)
     if mode:
         params["mode"] = mode
+    if cursor:
+        # offset stays in the URL for older clients; the cursor takes precedence.
+        params["cursor"] = cursor
     return urlencode(params)
 
 
@@ -118,13 +118,14 @@ def _serialize_results(
     query.limit = max(1, min(query.limit, RESULTS_PAGE_SIZE))
     query.offset = max(0, query.offset)
     query.radius_km = _clamp_radius(query.radius_km)
-    raw_profiles = list(search_profiles(query, extra=1))
+    raw_profiles = _find_profiles(query, extra=1)
     has_more = len(raw_profiles) > query.limit
     if has_more:
         profiles = raw_profiles[: query.limit]
     else:
         profiles = raw_profiles
     next_offset = query.offset + len(profiles)
+    next_cursor = encode_cursor(cursor_for(profiles[-1])) if has_more else ""
     context = {
         "form": SearchQueryForm(initial=initial or query_data),
         "results": [serialize_profile(profile) for profile in profiles],
@@ -136,8 +137,11 @@ def _serialize_results(
         "next_offset": next_offset,
         "limit": query.limit,
         "offset": query.offset,
+        "next_cursor": next_cursor,
         "load_more_url": (
-            f"{reverse('search:results')}?{_encode_querystring(query, offset=next_offset)}" if has_more else ""
+            f"{reverse('search:results')}?{_encode_querystring(query, offset=next_offset, cursor=next_cursor)}"
+            if has_more
+            else ""
         ),
     }
     if not _is_inside_sp(query.latitude, query.longitude):
@@ -342,9 +346,12 @@ def cards_api(request: HttpRequest) -> JsonResponse:
     if not form.is_valid():
         return JsonResponse({"errors": form.errors}, status=422)
     query = form.to_query()
-    profiles = search_profiles(query)
+    profiles = _find_profiles(query, extra=1)
+    has_more = len(profiles) > query.limit
+    profiles = profiles[: query.limit]
     data = [serialize_profile(p) for p in profiles]
-    return JsonResponse({"results": data, "count": len(data)}, status=200)
+    next_cursor = encode_cursor(cursor_for(profiles[-1])) if has_more else None
+    return JsonResponse({"results": data, "count": len(data), "next_cursor": next_cursor}, status=200)
 
 
 @require_GET
@@ -353,7 +360,7 @@ def cards_nearby_partial(request: HttpRequest) -> HttpResponse:
     if not form.is_valid():
         return render(request, "search/_public_results.html", {"form": form, "results": []}, status=422)
     query = form.to_query()
-    profiles = search_profiles(query)
+    profiles = _find_profiles(query)
     return render(
         request,
         "search/_public_results.html",
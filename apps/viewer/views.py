@@ -5,7 +5,6 @@ import hmac
 from dataclasses import dataclass
 from typing import Any, Literal
 
-from django.core.cache import cache
 from django.db import transaction
 from django.http import (
     Http404,
@@ -20,6 +19,7 @@ from django.views.decorators.http import require_http_methods
 from zoneinfo import ZoneInfo
 
 from apps.common.phone import last4_digits, mask_phone
+from apps.common.rate_limit import LimitResult, check_rate_limits, reset_rate_limit
 from apps.delivery.models import Order
 from apps.scheduling.models import Appointment, RescheduleRequest
 from apps.notifications.api import enqueue
@@ -168,35 +168,21 @@ def _client_ip(request) -> str:
     return request.META.get("REMOTE_ADDR") or "0.0.0.0"
 
 
-def _rate_limit_key(code: str, ip: str) -> str:
-    return f"viewer:rate:{code}:{ip}"
+def _rate_limit_ident(code: str, ip: str) -> str:
+    return f"{code}:{ip}"
 
 
-def _rate_limited(code: str, ip: str) -> bool:
-    key = _rate_limit_key(code, ip)
-    data = cache.get(key)
-    if not data:
-        return False
-    tries = int(data.get("tries", 0) if isinstance(data, dict) else data)
-    return tries >= RATE_LIMIT_MAX_TRIES
+def _rate_limit_rates() -> list[tuple[int, int]]:
+    return [(RATE_LIMIT_MAX_TRIES, int(RATE_LIMIT_WINDOW.total_seconds()))]
 
 
-def _increment_rate_limit(code: str, ip: str) -> int:
-    key = _rate_limit_key(code, ip)
-    data = cache.get(key)
-    if not data:
-        payload = {"tries": 1, "ts": timezone.now().isoformat()}
-        cache.set(key, payload, int(RATE_LIMIT_WINDOW.total_seconds()))
-        return 1
-    tries = int(data.get("tries", 0) if isinstance(data, dict) else data)
-    tries += 1
-    payload = {"tries": tries, "ts": timezone.now().isoformat()}
-    cache.set(key, payload, int(RATE_LIMIT_WINDOW.total_seconds()))
-    return tries
+def _consume_attempt(code: str, ip: str) -> LimitResult:
+    """Count one verification attempt; denied once the window is exhausted."""
+    return check_rate_limits("viewer", _rate_limit_ident(code, ip), _rate_limit_rates())
 
 
 def _reset_rate_limit(code: str, ip: str) -> None:
-    cache.delete(_rate_limit_key(code, ip))
+    reset_rate_limit("viewer", _rate_limit_ident(code, ip), _rate_limit_rates())
 
 
 def _store_verified(request, code: str) -> None:
@@ -450,7 +436,8 @@ def verify_last4(request, code: str):
         return HttpResponseBadRequest("Código inválido.")
     expected = last4_digits(target.phone)
     ip = _client_ip(request)
-    if _rate_limited(target.code, ip):
+    attempt = _consume_attempt(target.code, ip)
+    if not attempt.allowed:
         resp = HttpResponseForbidden("Excesso de tentativas. Tente novamente mais tarde.")
         resp["HX-Trigger"] = '{"flash":{"type":"err","title":"Muitas tentativas","message":"Aguarde 15 minutos."}}'
         return resp
@@ -461,8 +448,7 @@ def verify_last4(request, code: str):
         resp["HX-Trigger"] = '{"flash":{"type":"ok","title":"Verificado","message":"Sessão válida por 24h."}}'
         resp["HX-Redirect"] = reverse("viewer:order_detail", args=[target.code])
         return resp
-    tries = _increment_rate_limit(target.code, ip)
-    remaining = max(0, RATE_LIMIT_MAX_TRIES - tries)
+    remaining = attempt.remaining
     resp = HttpResponseForbidden("Últimos dígitos não conferem.")
     resp["HX-Trigger"] = (
         f'{{"flash":{{"type":"err","title":"Código incorreto","message":"Você ainda tem {remaining} tentativas."}}}}'
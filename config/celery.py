@@ -20,4 +20,9 @@ app.conf.beat_schedule = {
         # Run daily at 03:00 server time
         "schedule": crontab(minute=0, hour=3),
     },
+    "refresh-next-starts": {
+        "task": "apps.scheduling.tasks.refresh_next_starts",
+        # "Próximo horário" of every active service, every 15 minutes
+        "schedule": crontab(minute="*/15"),
+    },
 }
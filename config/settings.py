@@ -249,5 +249,28 @@ DELIVERY_LIMITS = {
     "options_per_modifier_group": int(os.getenv("DELIVERY_OPTIONS_PER_MODIFIER_GROUP", "50")),
 }
 
+# Search result cache (quantized geo tiles)
+SEARCH_TILE_CACHE_ENABLED = os.getenv("SEARCH_TILE_CACHE_ENABLED", "1") == "1"
+SEARCH_TILE_SIZE_DEG = float(os.getenv("SEARCH_TILE_SIZE_DEG", "0.01"))
+SEARCH_TILE_CACHE_TIMEOUT = int(os.getenv("SEARCH_TILE_CACHE_TIMEOUT", "600"))
+
+# Slot generation from compiled weekly bitmaps (apps.scheduling.bitmaps, needs numpy)
+SCHEDULING_BITMAP_SLOTS = os.getenv("SCHEDULING_BITMAP_SLOTS", "1") == "1"
+
+# Versioned per service/date slot cache (apps.scheduling.slot_cache)
+SCHEDULING_SLOT_CACHE_ENABLED = os.getenv("SCHEDULING_SLOT_CACHE_ENABLED", "1") == "1"
+SCHEDULING_SLOT_CACHE_TIMEOUT = int(os.getenv("SCHEDULING_SLOT_CACHE_TIMEOUT", "21600"))
+
+# Full-page cache of the public card page, keyed by Card.content_rev (apps.cards.page_cache)
+CARD_PAGE_CACHE_ENABLED = os.getenv("CARD_PAGE_CACHE_ENABLED", "1") == "1"
+CARD_PAGE_CACHE_TIMEOUT = int(os.getenv("CARD_PAGE_CACHE_TIMEOUT", "86400"))
+# Build identifier (e.g. the commit); cached pages of other releases are not served
+RELEASE_ID = os.getenv("RELEASE_ID", "")
+# Seconds a process trusts its own nickname → card entries (apps.cards.resolver); 0 disables
+CARD_RESOLVER_LOCAL_TTL = float(os.getenv("CARD_RESOLVER_LOCAL_TTL", "5"))
+# Static snapshots of the public pages served by nginx (apps.cards.snapshots); off by default
+CARD_SNAPSHOTS_ENABLED = os.getenv("CARD_SNAPSHOTS_ENABLED", "0") == "1"
+CARD_SNAPSHOT_ROOT = os.getenv("CARD_SNAPSHOT_ROOT", str(BASE_DIR / "snapshots"))
+
 # Geocoding settings
 NOMINATIM_USER_AGENT=  os.getenv("NOMINATIM_USER_AGENT", "cartao.do/1.0 (contato@cartao.do)")
@@ -14,5 +14,10 @@ for extra in ("django.contrib.admin", "tailwind", "theme"):
     if extra in INSTALLED_APPS:
         INSTALLED_APPS.remove(extra)
 
+# Optional in-process NumPy engine (apps.search.memory_index); needs numpy installed.
+SEARCH_MEMORY_INDEX = os.getenv("SEARCH_MEMORY_INDEX", "0") == "1"
+SEARCH_MEMORY_REFRESH = int(os.getenv("SEARCH_MEMORY_REFRESH", "30"))
+SEARCH_MEMORY_FULL_RELOAD = int(os.getenv("SEARCH_MEMORY_FULL_RELOAD", "900"))
+
 if "apps.search.apps.SearchConfig" not in INSTALLED_APPS:
     INSTALLED_APPS.append("apps.search.apps.SearchConfig")
@@ -158,6 +158,17 @@ LOGGING = {
     },
 }
 
+# Same Redis (and key prefix) as the dashboard: its signals invalidate the
+# resolver, page and slot caches the viewer reads
+CACHES = {
+    "default": {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": os.getenv("REDIS_URL", "redis://localhost:6379/0"),
+        "OPTIONS": {"CLIENT_CLASS": "django_redis.client.DefaultClient"},
+        "KEY_PREFIX": "paygo",
+    }
+}
+
 # Celery for Viewer: default to Redis; can be overridden by explicit vars
 CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL") or os.getenv("REDIS_URL", "redis://localhost:6379/0")
 CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND") or CELERY_BROKER_URL
@@ -167,6 +178,17 @@ CELERY_TASK_ALWAYS_EAGER = False
 # Ensure notifications stay in DEV mode on viewer unless overridden
 os.environ.setdefault("NOTIF_DEV_MODE", "1")
 
+# Full-page cache of the public card page, keyed by Card.content_rev (apps.cards.page_cache)
+CARD_PAGE_CACHE_ENABLED = os.getenv("CARD_PAGE_CACHE_ENABLED", "1") == "1"
+CARD_PAGE_CACHE_TIMEOUT = int(os.getenv("CARD_PAGE_CACHE_TIMEOUT", "86400"))
+# Build identifier (e.g. the commit); cached pages of other releases are not served
+RELEASE_ID = os.getenv("RELEASE_ID", "")
+# Seconds a process trusts its own nickname → card entries (apps.cards.resolver); 0 disables
+CARD_RESOLVER_LOCAL_TTL = float(os.getenv("CARD_RESOLVER_LOCAL_TTL", "5"))
+# Static snapshots of the public pages served by nginx (apps.cards.snapshots); off by default
+CARD_SNAPSHOTS_ENABLED = os.getenv("CARD_SNAPSHOTS_ENABLED", "0") == "1"
+CARD_SNAPSHOT_ROOT = os.getenv("CARD_SNAPSHOT_ROOT", str(BASE_DIR / "snapshots"))
+
 # Geocoding settings
 NOMINATIM_USER_AGENT=  os.getenv("NOMINATIM_USER_AGENT", "cartao.do/1.0 (contato@cartao.do)")
 
@@ -33,9 +33,11 @@ urlpatterns = [
     re_path(r"^@(?P<nickname>[a-z0-9_.]{3,32})/slots$", booking_public.public_slots, name="public_slots"),
     re_path(r"^@(?P<nickname>[a-z0-9_.]{3,32})/appointments$", booking_public.public_create_appointment, name="public_create_appointment"),
     re_path(r"^@(?P<nickname>[a-z0-9_.]{3,32})/book$", booking_public.public_book_modal, name="public_book_modal"),
+    re_path(r"^@(?P<nickname>[a-z0-9_.]{3,32})/tabs$", card_public.tabs_bundle, name="tabs_bundle"),
     re_path(r"^@(?P<nickname>[a-z0-9_.]{3,32})/tabs/links$", card_public.tabs_links, name="tabs_links"),
     re_path(r"^@(?P<nickname>[a-z0-9_.]{3,32})/tabs/gallery$", card_public.tabs_gallery, name="tabs_gallery"),
     re_path(r"^@(?P<nickname>[a-z0-9_.]{3,32})/tabs/services$", card_public.tabs_services, name="tabs_services"),
+    re_path(r"^@(?P<nickname>[a-z0-9_.]{3,32})/services/next$", booking_public.public_next_slots, name="public_next_slots"),
     re_path(r"^@(?P<nickname>[a-z0-9_.]{3,32})/services/(?P<id>[0-9a-f\-]{36})/sidebar$", booking_public.public_service_sidebar, name="public_service_sidebar"),
     re_path(r"^@(?P<nickname>[a-z0-9_.]{3,32})/services/(?P<id>[0-9a-f\-]{36})/send-code$", booking_public.public_send_code, name="public_send_code"),
     re_path(r"^@(?P<nickname>[a-z0-9_.]{3,32})/services/(?P<id>[0-9a-f\-]{36})/verify-code$", booking_public.public_verify_code, name="public_verify_code"),
@@ -2,7 +2,10 @@ import datetime as dt
 from django.urls import reverse
 from django.utils import timezone
 from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 import pytest
+from zoneinfo import ZoneInfo
 
 from apps.cards.models import Card
 from apps.scheduling.models import SchedulingService, Appointment
@@ -131,3 +134,125 @@ def test_filters_name_contact_period(client):
     today_iso = d0.isoformat()
     r_period = client.get(reverse("dashboard:agenda_list_partial"), {"start": today_iso, "end": today_iso})
     assert r_period.status_code == 200
+
+
+@pytest.mark.django_db
+def test_appointment_owner_follows_card_owner(client, user):
+    other = get_user_model().objects.create_user(username="bob", email="bob@example.com", password="pwd123")
+
+    card = Card.objects.create(owner=user, title="Card O", slug="card-o", nickname="cardo", status="published")
+    svc = SchedulingService.objects.create(card=card, name="Serv", description="d", timezone="UTC", duration_minutes=30, type="remote")
+    start = timezone.now().replace(microsecond=0)
+    ap = Appointment.objects.create(
+        service=svc,
+        user_name="Dora",
+        user_email="dora@example.com",
+        start_at_utc=start,
+        end_at_utc=start + dt.timedelta(minutes=30),
+        timezone="UTC",
+        status="pending",
+    )
+    assert ap.owner_id == user.id
+
+    client.force_login(user)
+    assert f"appt-{ap.id}" in client.get(reverse("dashboard:agenda_list_partial")).content.decode()
+
+    # Card handed over: the agenda moves with it
+    card.owner = other
+    card.save()
+    ap.refresh_from_db()
+    assert ap.owner_id == other.id
+    assert f"appt-{ap.id}" not in client.get(reverse("dashboard:agenda_list_partial")).content.decode()
+
+
+@pytest.mark.django_db
+def test_owner_sync_skipped_when_owner_unchanged(user):
+    card = Card.objects.create(owner=user, title="Card S", slug="card-s", nickname="cards", status="published")
+    svc = SchedulingService.objects.create(card=card, name="Serv", description="d", timezone="UTC", duration_minutes=30, type="remote")
+
+    def appointment_updates(save):
+        with CaptureQueriesContext(connection) as ctx:
+            save()
+        return [q["sql"] for q in ctx.captured_queries if q["sql"].startswith("UPDATE") and "scheduling_appointment" in q["sql"]]
+
+    card.title = "Outro título"
+    assert appointment_updates(card.save) == []
+    assert appointment_updates(lambda: card.save(update_fields=["title"])) == []
+    svc.name = "Outro nome"
+    assert appointment_updates(svc.save) == []
+
+    other = Card.objects.create(owner=user, title="Card T", slug="card-t", nickname="cardt", status="published")
+    svc.card = other
+    assert len(appointment_updates(lambda: svc.save(update_fields=["card"]))) == 1
+
+
+@pytest.mark.django_db
+def test_timeline_loads_five_days_and_pages_by_cursor(client, user, django_assert_max_num_queries):
+    client.force_login(user)
+    card = Card.objects.create(owner=user, title="Card T", slug="card-t", nickname="cardt", status="published")
+    svc = SchedulingService.objects.create(card=card, name="Serv", description="d", timezone="UTC", duration_minutes=30, type="remote")
+    tz = timezone.get_current_timezone()
+    first = timezone.localdate() + dt.timedelta(days=1)
+    ids = []
+    # Seven days with appointments, skipping a day in the middle
+    for offset in (0, 1, 2, 4, 5, 6, 7):
+        for hour in (9, 15):
+            start = dt.datetime.combine(first + dt.timedelta(days=offset), dt.time(hour, 0, tzinfo=tz))
+            ap = Appointment.objects.create(
+                service=svc,
+                user_name=f"Cli {offset}-{hour}",
+                user_email="cli@example.com",
+                start_at_utc=start.astimezone(dt.timezone.utc),
+                end_at_utc=(start + dt.timedelta(minutes=30)).astimezone(dt.timezone.utc),
+                timezone=str(tz),
+                status="pending",
+            )
+            ids.append(ap.id)
+
+    # Profile timezone, distinct days, window appointments, reschedule requests, pending count
+    with django_assert_max_num_queries(8):
+        r = client.get(reverse("dashboard:agenda_list_partial"), HTTP_HX_REQUEST="true")
+    body = r.content.decode()
+    assert body.count('class="day-group"') == 5
+    assert all(f"appt-{ap_id}" in body for ap_id in ids[:10])
+    assert f"appt-{ids[10]}" not in body
+    last_end = Appointment.objects.get(id=ids[9]).end_at_utc
+    assert r.context["next_cursor"] == last_end.isoformat()
+
+    r2 = client.get(reverse("dashboard:agenda_list_partial"), {"cursor": r.context["next_cursor"]}, HTTP_HX_REQUEST="true")
+    body2 = r2.content.decode()
+    assert body2.count('class="day-group"') == 2
+    assert all(f"appt-{ap_id}" in body2 for ap_id in ids[10:])
+
+
+@pytest.mark.django_db
+def test_month_view_summarizes_days_in_sql(client, user):
+    from apps.dashboard.views import MONTH_EVENTS_PER_DAY
+
+    client.force_login(user)
+    card = Card.objects.create(owner=user, title="Card M", slug="card-m", nickname="cardm", status="published")
+    svc = SchedulingService.objects.create(card=card, name="Consulta", description="d", timezone="America/Sao_Paulo", duration_minutes=30, type="remote")
+    tz = ZoneInfo("America/Sao_Paulo")
+    day = timezone.localdate().replace(day=10)
+    # 23:30 local is already the next day in UTC: grouped by the appointment's date
+    for hour, minute, status in [(8, 0, "pending"), (9, 0, "confirmed"), (10, 0, "confirmed"), (11, 0, "cancelled"), (23, 30, "confirmed")]:
+        start = dt.datetime.combine(day, dt.time(hour, minute, tzinfo=tz))
+        Appointment.objects.create(
+            service=svc,
+            user_name="Cli",
+            user_email="cli@example.com",
+            start_at_utc=start.astimezone(dt.timezone.utc),
+            end_at_utc=(start + dt.timedelta(minutes=30)).astimezone(dt.timezone.utc),
+            timezone="America/Sao_Paulo",
+            status=status,
+        )
+
+    r = client.get(reverse("dashboard:agenda"), {"view": "month", "date": day.isoformat()})
+    assert r.status_code == 200
+    cell = next(d for week in r.context["month_weeks"] for d in week if d["date"] == day)
+    assert cell["counts"] == {"pending": 1, "confirmed": 3, "cancelled": 1}
+    assert [ev["time"] for ev in cell["events"]] == ["08:00", "09:00", "10:00"][:MONTH_EVENTS_PER_DAY]
+    assert cell["more"] == 5 - MONTH_EVENTS_PER_DAY
+    assert f"+{cell['more']} mais" in r.content.decode()
+    following = next(d for week in r.context["month_weeks"] for d in week if d["date"] == day + dt.timedelta(days=1))
+    assert following["events"] == []
@@ -0,0 +1,75 @@
+import datetime as dt
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.cards.models import Card
+from apps.scheduling import ics
+from apps.scheduling.models import Appointment, CalendarFeed, SchedulingService
+
+
+@pytest.fixture
+def feed(user):
+    card = Card.objects.create(owner=user, title="Card A", nickname="carda", status="published")
+    svc = SchedulingService.objects.create(card=card, name="Corte; barba", timezone="UTC", duration_minutes=30, type="remote")
+    base = (timezone.now() + dt.timedelta(days=1)).replace(hour=9, minute=0, second=0, microsecond=0)
+    for i, status in enumerate(["pending", "confirmed", "confirmed", "cancelled"]):
+        start = base + dt.timedelta(hours=i)
+        Appointment.objects.create(
+            service=svc,
+            user_name=f"Cliente {i}",
+            user_email=f"c{i}@example.com",
+            start_at_utc=start,
+            end_at_utc=start + dt.timedelta(minutes=30),
+            timezone="UTC",
+            status=status,
+        )
+    return CalendarFeed.objects.create(owner=user)
+
+
+@pytest.mark.django_db
+def test_calendar_feed_streams_and_answers_304(client, feed, django_assert_num_queries):
+    url = reverse("scheduling:owner_calendar_feed", args=[feed.token])
+    resp = client.get(url)
+    assert resp.status_code == 200
+    assert resp["Content-Type"].startswith("text/calendar")
+    body = b"".join(resp.streaming_content).decode()
+    assert body.startswith("BEGIN:VCALENDAR\r\n") and body.endswith("END:VCALENDAR\r\n")
+    # Cancelled appointments are left out
+    assert body.count("BEGIN:VEVENT") == 3
+    assert "SUMMARY:Corte\\; barba — Cliente 0" in body
+    assert "STATUS:TENTATIVE" in body
+
+    etag = resp["ETag"]
+    # Token lookup + one aggregate, nothing rendered
+    with django_assert_num_queries(2):
+        cached = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert cached.status_code == 304
+    assert cached["ETag"] == etag
+
+    ap = Appointment.objects.filter(status="pending").get()
+    ap.status = "confirmed"
+    ap.save(update_fields=["status", "updated_at"])
+    changed = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert changed.status_code == 200
+    assert changed["ETag"] != etag
+
+
+@pytest.mark.django_db
+def test_calendar_feed_keyset_chunks_cover_every_event(feed):
+    qs = ics.feed_queryset(feed.owner_id)
+    whole = "".join(ics.iter_feed(qs))
+    assert "".join(ics.iter_feed(qs, chunk_size=1)) == whole
+
+
+@pytest.mark.django_db
+def test_calendar_feed_unknown_token(client):
+    assert client.get(reverse("scheduling:owner_calendar_feed", args=["nope"])).status_code == 404
+
+
+def test_fold_long_lines_by_octets():
+    folded = ics._fold("SUMMARY:" + "é" * 80)
+    lines = folded.split("\r\n")[:-1]
+    assert all(len(line.encode()) <= 75 for line in lines)
+    assert "".join(line[1:] if i else line for i, line in enumerate(lines)) == "SUMMARY:" + "é" * 80
@@ -1,8 +1,12 @@
+from io import StringIO
+
 import pytest
+from django.core.management import call_command
 from django.test import Client, override_settings
 from django.urls import reverse
 
-from apps.cards.markdown import sanitize_about_markdown
+from apps.cards import resolver
+from apps.cards.markdown import about_markdown_hash, sanitize_about_markdown
 from apps.cards.models import Card
 
 
@@ -117,3 +121,59 @@ def test_tabs_partial_excludes_about_option_when_empty(client, user):
     resp = client.get(reverse("cards:tabs_partial", args=[card.id]), HTTP_HX_REQUEST="true")
     body = resp.content.decode()
     assert 'value="links,gallery,services,about"' not in body
+
+
+@pytest.mark.django_db
+def test_save_about_stores_sanitized_html(client, user):
+    card = Card.objects.create(owner=user, title="Guardado", slug="guardado", mode="appointment")
+    client.force_login(user)
+    url = reverse("cards:save_about", args=[card.id])
+    client.post(url, {"about_markdown": "Texto **forte**<script>x</script>"}, HTTP_HX_REQUEST="true")
+    card.refresh_from_db()
+    assert "<strong>forte</strong>" in card.about_html
+    assert "<script" not in card.about_html
+    assert card.about_markdown_hash == about_markdown_hash(card.about_markdown)
+
+    card.about_markdown = ""
+    card.save()
+    card.refresh_from_db()
+    assert card.about_html == "" and card.about_markdown_hash == ""
+
+
+@pytest.mark.django_db
+def test_public_view_reads_stored_about_html(client, user, monkeypatch):
+    card = Card.objects.create(
+        owner=user,
+        title="Sem Render",
+        slug="sem-render",
+        mode="appointment",
+        status="published",
+        nickname="semrender",
+        about_markdown="Conteúdo *guardado*.",
+    )
+    assert "<em>guardado</em>" in card.about_html
+
+    def fail(*args, **kwargs):
+        raise AssertionError("viewer must not render Markdown")
+
+    monkeypatch.setattr("apps.cards.models.sanitize_about_markdown", fail)
+    resp = client.get(f"/@{card.nickname}")
+    assert "<em>guardado</em>" in resp.content.decode()
+
+
+@pytest.mark.django_db
+def test_backfill_about_html_command(user):
+    card = Card.objects.create(owner=user, title="Legado", slug="legado", mode="appointment", nickname="legado")
+    # Cards written before the column existed: Markdown without stored HTML
+    Card.objects.filter(pk=card.pk).update(about_markdown="## Antigo")
+    card.refresh_from_db()
+    assert card.about_html == ""
+    assert "<h2>Antigo</h2>" in card.public_about_html()
+    cached_rev = resolver.resolve("legado").content_rev
+
+    call_command("backfill_about_html", stdout=StringIO())
+    card.refresh_from_db()
+    # bulk_update skips the signals; the command drops the resolver entry itself
+    assert resolver.resolve("legado").content_rev == card.content_rev == cached_rev + 1
+    assert "<h2>Antigo</h2>" in card.about_html
+    assert card.about_markdown_hash == about_markdown_hash("## Antigo")
@@ -0,0 +1,113 @@
+import pytest
+
+from apps.cards import page_cache
+from apps.cards.models import Card, LinkButton
+from apps.scheduling.models import SchedulingService
+
+
+@pytest.fixture
+def card(user, settings):
+    settings.CARD_PAGE_CACHE_ENABLED = True
+    return Card.objects.create(
+        owner=user,
+        title="Página",
+        slug="pagina",
+        mode="appointment",
+        status="published",
+        nickname="pagina",
+    )
+
+
+@pytest.mark.django_db
+def test_public_page_served_from_cache_with_etag(client, card, django_assert_num_queries):
+    url = f"/@{card.nickname}"
+    first = client.get(url)
+    assert first.status_code == 200
+    body = first.content.decode()
+    assert page_cache.CSRF_PLACEHOLDER not in body
+    assert 'name="csrf-token" content="' in body
+
+    # Nickname resolved from the resolver cache: no query at all
+    with django_assert_num_queries(0):
+        cached = client.get(url)
+    assert cached.status_code == 200
+    assert cached.content.decode().replace(_token(cached), "") == body.replace(_token(first), "")
+
+    with django_assert_num_queries(0):
+        not_modified = client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+    assert not_modified.status_code == 304
+    assert not_modified["ETag"] == first["ETag"]
+
+
+@pytest.mark.django_db
+def test_public_page_changes_with_content_rev(client, card):
+    url = f"/@{card.nickname}"
+    first = client.get(url)
+    rev = card.content_rev
+
+    LinkButton.objects.create(card=card, label="Meu site", url="https://exemplo.com")
+    card.refresh_from_db()
+    assert card.content_rev == rev + 1
+    changed = client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+    assert changed.status_code == 200
+    assert "Meu site" in changed.content.decode()
+
+    # A stale instance saved later still moves the revision forward
+    stale = Card.objects.get(pk=card.pk)
+    card.title = "Novo título"
+    card.save(update_fields=["title"])
+    stale.save(update_fields=["description"])
+    stale.refresh_from_db()
+    assert stale.content_rev == rev + 3
+    assert "Novo título" in client.get(url).content.decode()
+
+
+@pytest.mark.django_db
+def test_private_field_saves_keep_content_rev(card, django_assert_num_queries):
+    rev = card.content_rev
+    card.notification_phone = "+5511999990000"
+    card.save(update_fields=["notification_phone"])
+    card.refresh_from_db()
+    assert card.content_rev == rev
+    with django_assert_num_queries(0):
+        card.save(update_fields=[])
+
+    card.save()
+    assert card.content_rev == rev + 1
+
+
+@pytest.mark.django_db
+def test_tabs_bundle_renders_enabled_tabs_as_oob_fragments(client, card, django_assert_num_queries):
+    card.tabs_order = "services,links,gallery"
+    card.save(update_fields=["tabs_order"])
+    LinkButton.objects.create(card=card, label="Meu site", url="https://exemplo.com")
+    SchedulingService.objects.create(card=card, name="Corte", timezone="America/Sao_Paulo", duration_minutes=30)
+    url = f"/@{card.nickname}/tabs"
+
+    first = client.get(url)
+    assert first.status_code == 200
+    body = first.content.decode()
+    # Gallery is empty: no fragment for it; the others follow tabs_order
+    assert body.count('hx-swap-oob="innerHTML"') == 2
+    assert body.index('id="panel-services"') < body.index('id="panel-links"') < body.index("Meu site")
+    assert "panel-gallery" not in body
+
+    with django_assert_num_queries(0):
+        cached = client.get(url)
+    assert cached.content.decode() == body
+    with django_assert_num_queries(0):
+        assert client.get(url, HTTP_IF_NONE_MATCH=first["ETag"]).status_code == 304
+    # The single-tab endpoint shares the bundle's fragment
+    with django_assert_num_queries(0):
+        assert "Meu site" in client.get(f"/@{card.nickname}/tabs/links").content.decode()
+
+    LinkButton.objects.create(card=card, label="Outro link", url="https://exemplo.com/2")
+    changed = client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+    assert changed.status_code == 200
+    assert "Outro link" in changed.content.decode()
+
+
+def _token(response) -> str:
+    body = response.content.decode()
+    start = body.index('name="csrf-token" content="') + len('name="csrf-token" content="')
+    return body[start:body.index('"', start)]
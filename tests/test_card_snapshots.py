@@ -0,0 +1,60 @@
+import gzip
+
+import pytest
+from django.core.management import call_command
+from django.db.models import F
+
+from apps.cards import snapshots, tasks
+from apps.cards.models import Card, LinkButton
+
+
+@pytest.fixture
+def card(user, settings, tmp_path, monkeypatch):
+    settings.CARD_SNAPSHOTS_ENABLED = True
+    settings.CARD_SNAPSHOT_ROOT = str(tmp_path)
+    monkeypatch.setattr(tasks.publish_card_snapshot, "delay", lambda card_id: snapshots.publish(card_id))
+    return Card.objects.create(
+        owner=user,
+        title="Vitrine",
+        slug="vitrine",
+        mode="appointment",
+        status="published",
+        nickname="vitrine",
+    )
+
+
+@pytest.mark.django_db
+def test_snapshot_rendered_compressed_and_swapped_on_edit(card, tmp_path, django_capture_on_commit_callbacks):
+    assert snapshots.publish(card.pk)
+    index = tmp_path / "@vitrine" / "index.html"
+    html = index.read_bytes()
+    assert b"Vitrine" in html
+    # No visitor token baked in: the page falls back to the CSRF cookie
+    assert b'name="csrf-token" content=""' in html
+    assert gzip.decompress((tmp_path / "@vitrine" / "index.html.gz").read_bytes()) == html
+    first = index.resolve().parent
+
+    with django_capture_on_commit_callbacks(execute=True):
+        LinkButton.objects.create(card=card, label="Meu site", url="https://exemplo.com")
+    assert b"Meu site" in index.read_bytes()
+    assert not first.exists()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        card.status = "archived"
+        card.save(update_fields=["status"])
+    assert not (tmp_path / "@vitrine").is_symlink()
+
+
+@pytest.mark.django_db
+def test_stale_snapshot_not_swapped_in_and_purged(card, tmp_path):
+    stale = Card.objects.get(pk=card.pk)
+    Card.objects.filter(pk=card.pk).update(content_rev=F("content_rev") + 1)
+    # Rendered before the bump: the newer revision's render wins
+    assert not snapshots.write(stale, b"<html>velho</html>")
+    assert not (tmp_path / "@vitrine").is_symlink()
+
+    assert snapshots.publish(card.pk)
+    # Bumped behind the signals' back (e.g. bulk_update): purge drops it
+    Card.objects.filter(pk=card.pk).update(content_rev=F("content_rev") + 1)
+    call_command("purge_card_snapshots")
+    assert not (tmp_path / "@vitrine").is_symlink()
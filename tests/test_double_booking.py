@@ -0,0 +1,187 @@
+import datetime as dt
+import threading
+from io import StringIO
+from zoneinfo import ZoneInfo
+
+import pytest
+from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.cards.models import Card
+from apps.scheduling import views as scheduling_views
+from apps.scheduling.models import OVERLAP_CONSTRAINT, Appointment, SchedulingService, ServiceAvailability
+from apps.scheduling.slots import book_appointment, prepare_booking
+
+pytestmark = pytest.mark.skipif(connection.vendor != "postgresql", reason="exclusion constraints need Postgres")
+
+
+@pytest.fixture
+def service(user):
+    card = Card.objects.create(
+        owner=user,
+        title="Studio",
+        description="",
+        nickname="studio",
+        status="published",
+        mode="appointment",
+    )
+    svc = SchedulingService.objects.create(
+        card=card,
+        name="Sessão",
+        description="",
+        timezone="America/Sao_Paulo",
+        duration_minutes=60,
+        buffer_before=15,
+        buffer_after=15,
+        type="remote",
+        is_active=True,
+    )
+    for weekday in range(7):
+        ServiceAvailability.objects.create(
+            service=svc,
+            rule_type="weekly",
+            weekday=weekday,
+            start_time=dt.time(8, 0),
+            end_time=dt.time(20, 0),
+        )
+    return svc
+
+
+def _start(service, hour):
+    tz = ZoneInfo(service.timezone)
+    day = timezone.now().astimezone(tz).date() + dt.timedelta(days=2)
+    return dt.datetime.combine(day, dt.time(hour), tzinfo=tz).astimezone(dt.timezone.utc)
+
+
+def _fields(service, booking, name="Cliente"):
+    return {
+        "service": service,
+        "user_name": name,
+        "user_email": "cli@example.com",
+        "start_at_utc": booking["start_at"],
+        "end_at_utc": booking["end_at"],
+        "timezone": service.timezone,
+        "status": "pending",
+    }
+
+
+@pytest.mark.django_db
+def test_overlapping_claims_are_rejected(service):
+    booking = prepare_booking(service, _start(service, 10))
+    ap = book_appointment(**_fields(service, booking))
+    assert (ap.claim_start_utc, ap.claim_end_utc) == (ap.start_at_utc - dt.timedelta(minutes=15), ap.end_at_utc + dt.timedelta(minutes=15))
+
+    # Same slot and a claim reaching into the buffer both collide
+    with pytest.raises(ValidationError, match="Horário indisponível"):
+        book_appointment(**_fields(service, booking))
+    late = {"start_at": booking["end_at"] + dt.timedelta(minutes=15), "end_at": booking["end_at"] + dt.timedelta(minutes=75)}
+    with pytest.raises(ValidationError, match="Horário indisponível"):
+        book_appointment(**_fields(service, late))
+    # Claims that only touch are fine
+    touching = {"start_at": booking["end_at"] + dt.timedelta(minutes=30), "end_at": booking["end_at"] + dt.timedelta(minutes=90)}
+    book_appointment(**_fields(service, touching))
+
+    ap.status = "cancelled"
+    ap.save(update_fields=["status", "updated_at"])
+    book_appointment(**_fields(service, booking))
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_bookings_of_one_slot(service):
+    start = _start(service, 14)
+    workers = 16
+    barrier = threading.Barrier(workers)
+    results = []
+    lock = threading.Lock()
+
+    def book(n):
+        try:
+            # Everyone passes the Python check before anyone inserts
+            booking = prepare_booking(service, start)
+            barrier.wait()
+            try:
+                book_appointment(**_fields(service, booking, name=f"Cliente {n}"))
+                outcome = "booked"
+            except ValidationError:
+                outcome = "rejected"
+            with lock:
+                results.append(outcome)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=book, args=(n,)) for n in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(results) == ["booked"] + ["rejected"] * (workers - 1)
+    assert Appointment.objects.filter(service=service, status__in=["pending", "confirmed"]).count() == 1
+
+
+@pytest.mark.django_db
+def test_create_appointment_reports_lost_race(client, user, service, monkeypatch):
+    start = _start(service, 9)
+    booking = prepare_booking(service, start)
+    book_appointment(**_fields(service, booking))
+    # The losing request validated the slot before the winner committed
+    monkeypatch.setattr(scheduling_views, "prepare_booking", lambda *args, **kwargs: booking)
+    client.force_login(user)
+
+    resp = client.post(
+        reverse("scheduling:appointments_create", args=[service.id]),
+        {"start_at_utc": start.isoformat(), "end_at_utc": booking["end_at"].isoformat(), "user_name": "Outro"},
+    )
+
+    assert resp.status_code == 400
+    assert resp.content.decode() == "Horário indisponível."
+    assert Appointment.objects.filter(service=service).count() == 1
+
+
+@pytest.mark.django_db
+def test_check_booking_overlaps_cancels_later_booking(service):
+    # Rows from before the constraint: drop it for this test's transaction
+    constraint = next(c for c in Appointment._meta.constraints if c.name == OVERLAP_CONSTRAINT)
+    with connection.schema_editor() as editor:
+        editor.remove_constraint(Appointment, constraint)
+    booking = prepare_booking(service, _start(service, 10))
+    first = book_appointment(**_fields(service, booking))
+    later = book_appointment(**_fields(service, booking, name="Depois"))
+    apart = book_appointment(**_fields(service, prepare_booking(service, _start(service, 13))))
+
+    with pytest.raises(CommandError, match="1 agendamentos em conflito"):
+        call_command("check_booking_overlaps", stdout=StringIO())
+    call_command("check_booking_overlaps", "--cancel", stdout=StringIO())
+
+    statuses = dict(Appointment.objects.values_list("pk", "status"))
+    assert statuses == {first.pk: "pending", later.pk: "cancelled", apart.pk: "pending"}
+    # Calendar feeds see the change
+    assert Appointment.objects.get(pk=later.pk).updated_at > later.updated_at
+    call_command("check_booking_overlaps", stdout=StringIO())
+
+
+@pytest.mark.django_db
+def test_buffer_changes_follow_booked_claims(service):
+    booking = prepare_booking(service, _start(service, 10))
+    first = book_appointment(**_fields(service, booking))
+    with pytest.raises(ValidationError):
+        prepare_booking(service, _start(service, 11))
+
+    # Shrinking frees the buffer time at once
+    service.buffer_before = service.buffer_after = 0
+    service.save()
+    first.refresh_from_db()
+    assert (first.claim_start_utc, first.claim_end_utc) == (first.start_at_utc, first.end_at_utc)
+    book_appointment(**_fields(service, prepare_booking(service, _start(service, 11)), name="Depois"))
+
+    # Widening over the two back-to-back bookings is refused, claims untouched
+    service.buffer_after = 15
+    with pytest.raises(ValidationError, match="sobrepõem agendamentos"):
+        service.save()
+    service.refresh_from_db()
+    first.refresh_from_db()
+    assert service.buffer_after == 0
+    assert first.claim_end_utc == first.end_at_utc
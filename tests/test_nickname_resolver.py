@@ -0,0 +1,77 @@
+import importlib
+
+import pytest
+from django.core.cache import CacheHandler, cache
+from django.db import connection
+from django.http import Http404
+from django.test.utils import CaptureQueriesContext
+
+from apps.cards import resolver
+from apps.cards.models import Card
+
+
+@pytest.fixture
+def card(user):
+    return Card.objects.create(owner=user, title="Resolvido", slug="resolvido", status="published", nickname="Resolvido")
+
+
+@pytest.mark.django_db
+def test_resolve_uses_lower_index_and_caches(card, django_assert_num_queries):
+    with CaptureQueriesContext(connection) as ctx:
+        ref = resolver.resolve("RESOLVIDO")
+    assert ref.card_id == str(card.pk) and ref.is_public and ref.content_rev == card.content_rev
+    sql = ctx.captured_queries[0]["sql"]
+    assert "LOWER(" in sql and "UPPER(" not in sql
+
+    with django_assert_num_queries(0):
+        assert resolver.resolve("resolvido") == ref
+    assert resolver.resolve("ninguem") is None
+
+
+@pytest.mark.django_db
+def test_resolver_invalidated_on_card_changes(card):
+    assert resolver.get_public_card("resolvido").pk == card.pk
+    assert resolver.resolve("novonick") is None
+
+    card.nickname = "novonick"
+    card.save(update_fields=["nickname"])
+    assert resolver.resolve("resolvido") is None
+    assert resolver.get_public_card("novonick").pk == card.pk
+
+    card.status = "archived"
+    card.save(update_fields=["status"])
+    assert resolver.resolve("novonick").status == "archived"
+    with pytest.raises(Http404):
+        resolver.get_public_card("novonick")
+
+
+@pytest.mark.django_db
+def test_resolver_drops_stale_refs(card):
+    ref = resolver.resolve("resolvido")
+    # Changed behind the signals' back (e.g. a raw update): the row check catches it
+    Card.objects.filter(pk=card.pk).update(deactivation_marked=True)
+    assert resolver.resolve("resolvido") == ref
+    with pytest.raises(Http404):
+        resolver.get_public_card("resolvido")
+    assert resolver.resolve("resolvido").deactivation_marked
+
+
+@pytest.mark.django_db
+def test_viewer_sees_dashboard_invalidation(card, settings, monkeypatch):
+    # Importing the viewer settings must not leak its env defaults into other tests
+    monkeypatch.setenv("NOTIF_DEV_MODE", "0")
+    viewer_settings = importlib.import_module("config.settings_viewer")
+    assert viewer_settings.CACHES == settings.CACHES
+    viewer_cache = CacheHandler(viewer_settings.CACHES)["default"]
+    settings.CARD_RESOLVER_LOCAL_TTL = 0
+
+    monkeypatch.setattr(resolver, "cache", viewer_cache)
+    assert resolver.resolve("resolvido").is_public
+
+    # The dashboard saves the card and invalidates through its own cache client
+    monkeypatch.setattr(resolver, "cache", cache)
+    card.status = "archived"
+    card.save(update_fields=["status"])
+
+    monkeypatch.setattr(resolver, "cache", viewer_cache)
+    assert resolver.resolve("resolvido").status == "archived"
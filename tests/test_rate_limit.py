@@ -0,0 +1,52 @@
+import threading
+import uuid
+
+from apps.common.rate_limit import check_rate_limits, rate_limit, reset_rate_limit
+
+
+def _ident():
+    return uuid.uuid4().hex
+
+
+def test_rate_limit_is_exact_under_concurrency():
+    ident = _ident()
+    barrier = threading.Barrier(40)
+    results = []
+    lock = threading.Lock()
+
+    def worker():
+        barrier.wait()
+        allowed = check_rate_limits("test", ident, [(7, 60), (100, 3600)]).allowed
+        with lock:
+            results.append(allowed)
+
+    threads = [threading.Thread(target=worker) for _ in range(40)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results.count(True) == 7
+    denied = check_rate_limits("test", ident, [(7, 60), (100, 3600)])
+    assert not denied.allowed
+    assert 0 < denied.retry_after <= 60
+
+
+def test_rate_limit_checks_every_window():
+    ident = _ident()
+    rates = [(10, 60), (3, 3600)]
+    assert [check_rate_limits("test", ident, rates).allowed for _ in range(4)] == [True, True, True, False]
+    # The denied hit was not recorded in the minute window either.
+    assert check_rate_limits("test", ident, [(4, 60)]).allowed
+
+
+def test_rate_limit_peek_and_reset():
+    ident = _ident()
+    assert rate_limit("test", ident, limit=2, window_seconds=60).remaining == 1
+    peek = check_rate_limits("test", ident, [(2, 60)], cost=0)
+    assert peek.allowed and peek.remaining == 1
+    assert rate_limit("test", ident, limit=2, window_seconds=60).remaining == 0
+    assert not check_rate_limits("test", ident, [(2, 60)], cost=0).allowed
+
+    reset_rate_limit("test", ident, [(2, 60)])
+    assert rate_limit("test", ident, limit=2, window_seconds=60).allowed
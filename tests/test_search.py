@@ -1,12 +1,28 @@
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from urllib.parse import parse_qs, urlparse
+
 import pytest
 from django.contrib.gis.geos import Point
+from django.core.cache import cache
+from django.core.management import call_command
 from django.urls import reverse
 
 from apps.cards.models import Card
 from apps.search.forms import SearchQuery
-from apps.search.geocoding import GeocodingError, geocode_cep
-from apps.search.models import SearchProfile, SearchCategory
-from apps.search.services import search_profiles
+from apps.search.geocoding import GeocodingError, geocode_address_sp, geocode_cep
+from apps.search.models import CepAddress, SearchProfile, SearchCategory
+from apps.search.services import search_bbox, search_profiles
+from apps.search.tiles import (
+    reset_tile_cache_stats,
+    search_profiles_cached,
+    spheroid_distance_m,
+    tile_cache_stats,
+)
 
 
 @pytest.mark.django_db
@@ -135,6 +151,48 @@ def test_geocode_stub_unknown_cep(client, monkeypatch):
     assert resp.json()["error"] == "CEP não encontrado."
 
 
+@pytest.mark.django_db
+def test_import_ceps_streams_csv_and_json(tmp_path):
+    csv_path = tmp_path / "ceps.csv"
+    csv_path.write_text(
+        "cep;logradouro;bairro;cidade;uf;lat;lng\n"
+        "01001-000;Praça da Sé;Sé;São Paulo;sp;-23,5503;-46,6339\n"
+        "invalid;x;y;z;SP;;\n"
+        "04538-133;Av. Brig. Faria Lima;Itaim Bibi;São Paulo;SP;;\n",
+        encoding="utf-8",
+    )
+    call_command("import_ceps", str(csv_path), batch_size=1, stdout=StringIO())
+    assert CepAddress.objects.count() == 2
+    se_record = CepAddress.objects.get(cep="01001000")
+    assert se_record.uf == "SP" and se_record.source == "dataset"
+    assert se_record.location.y == pytest.approx(-23.5503)
+
+    json_path = tmp_path / "ceps.json"
+    json_path.write_text(
+        '[{"cep": "04538133", "localidade": "São Paulo", "uf": "SP", "latitude": -23.586, "longitude": -46.682}]',
+        encoding="utf-8",
+    )
+    call_command("import_ceps", str(json_path), stdout=StringIO())
+    faria_lima = CepAddress.objects.get(cep="04538133")
+    assert faria_lima.location is not None
+    assert CepAddress.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_cards_cep_lookup_reads_local_table(client, user, monkeypatch):
+    CepAddress.objects.create(cep="01310100", logradouro="Avenida Paulista", bairro="Bela Vista", cidade="São Paulo", uf="SP")
+    cache.delete("cep:01310100")
+
+    def fail_urlopen(*_args, **_kwargs):
+        pytest.fail("ViaCEP should not be called for a known CEP")
+
+    monkeypatch.setattr("urllib.request.urlopen", fail_urlopen)
+    client.force_login(user)
+    resp = client.get(reverse("cards:cep_lookup"), {"cep": "01310-100"})
+    assert resp.status_code == 200
+    assert "Avenida Paulista" in resp.content.decode()
+
+
 class DummyResponse:
     def __init__(self, status_code: int, payload: object):
         self.status_code = status_code
@@ -148,6 +206,7 @@ class DummyResponse:
         return self._payload
 
 
+@pytest.mark.django_db
 def test_geocode_cep_success(monkeypatch, settings):
     def fake_get(url, *_, **kwargs):
         if "viacep" in url:
@@ -169,10 +228,19 @@ def test_geocode_cep_success(monkeypatch, settings):
         return DummyResponse(200, [{"lat": "-23.55052", "lon": "-46.633309"}])
 
     settings.NOMINATIM_USER_AGENT = "stripe-paygo-tests/1.0 (dev@example.com)"
-    monkeypatch.setattr("apps.search.geocoding.requests.get", fake_get)
+    monkeypatch.setattr("apps.search.geocoding._http_get", fake_get)
+    cache.delete("geocode:cep:01000000:missing")
     result = geocode_cep("01000-000")
     assert result == {"lat": -23.55052, "lng": -46.633309}
 
+    # The answer is written back, so the next lookup never leaves the database
+    def fail_get(*_args, **_kwargs):
+        pytest.fail("Remote geocoders should not be called for a known CEP")
+
+    monkeypatch.setattr("apps.search.geocoding._http_get", fail_get)
+    assert geocode_cep("01000000") == result
+    assert CepAddress.objects.get(cep="01000000").cidade == "São Paulo"
+
 
 def test_geocode_cep_invalid_cep():
     with pytest.raises(GeocodingError) as excinfo:
@@ -180,13 +248,14 @@ def test_geocode_cep_invalid_cep():
     assert excinfo.value.status_code == 400
 
 
+@pytest.mark.django_db
 def test_geocode_cep_via_cep_not_found(monkeypatch):
     def fake_get(url, *_, **__):
         if "viacep" in url:
             return DummyResponse(404, {"erro": True})
         pytest.fail("Nominatim should not be called when ViaCEP fails")
 
-    monkeypatch.setattr("apps.search.geocoding.requests.get", fake_get)
+    monkeypatch.setattr("apps.search.geocoding._http_get", fake_get)
     with pytest.raises(GeocodingError) as excinfo:
         geocode_cep("01000-000")
     assert excinfo.value.status_code == 404
@@ -364,3 +433,508 @@ def test_search_results_append_page(client, user):
     html = resp.content.decode()
     assert html.count('class="result-card card"') == 3
     assert 'hx-swap-oob="outerHTML:#results-load-more"' in html
+
+
+@pytest.mark.django_db
+def test_search_results_load_more_uses_cursor(client, user):
+    base_point = Point(-46.63, -23.55, srid=4326)
+    for idx in range(18):
+        card = Card.objects.create(
+            owner=user,
+            title=f"Cursor {idx}",
+            slug=f"cursor-{idx}",
+            nickname=f"cursor{idx}",
+            status="published",
+            mode="appointment",
+        )
+        SearchProfile.objects.create(
+            card=card,
+            category=SearchCategory.CONSULTORIA,
+            origin=Point(base_point.x + (idx * 0.0001), base_point.y + (idx * 0.0001), srid=4326),
+            radius_km=100,
+            active=True,
+        )
+    params = {"lat": base_point.y, "lng": base_point.x, "radius_km": 80}
+
+    first = client.get(reverse("search:results"), params, HTTP_HX_REQUEST="true")
+    cursor = first.context["next_cursor"]
+    assert cursor and f"cursor={cursor}" in first.content.decode()
+
+    resp = client.get(
+        reverse("search:results"),
+        {**params, "cursor": cursor},
+        HTTP_HX_REQUEST="true",
+        HTTP_HX_TARGET="results-list",
+    )
+    assert resp.status_code == 200
+    assert resp.content.decode().count('class="result-card card"') == 3
+    seen = {item["nickname"] for item in first.context["results"]}
+    assert not seen & {item["nickname"] for item in resp.context["results"]}
+
+
+@pytest.mark.django_db
+def test_cards_api_cursor_matches_offset_pages(client, user):
+    origin = Point(-46.63, -23.55, srid=4326)
+    for idx in range(7):
+        card = Card.objects.create(
+            owner=user,
+            title=f"Empate {idx}",
+            slug=f"empate-{idx}",
+            nickname=f"empate{idx}",
+            status="published",
+            mode="appointment",
+        )
+        # Identical origins force the created_at/id tie-breakers
+        SearchProfile.objects.create(
+            card=card,
+            category=SearchCategory.CONSULTORIA,
+            origin=origin if idx % 2 else Point(origin.x + idx * 0.001, origin.y, srid=4326),
+            radius_km=50,
+            active=True,
+        )
+    params = {"lat": origin.y, "lng": origin.x, "radius_km": 20, "limit": 3}
+    url = reverse("search:cards_api")
+
+    by_cursor = []
+    cursor = None
+    while True:
+        payload = client.get(url, {**params, **({"cursor": cursor} if cursor else {})}).json()
+        by_cursor.extend(item["nickname"] for item in payload["results"])
+        cursor = payload["next_cursor"]
+        if not cursor:
+            break
+    by_offset = []
+    for offset in (0, 3, 6):
+        payload = client.get(url, {**params, "offset": offset}).json()
+        by_offset.extend(item["nickname"] for item in payload["results"])
+    assert by_cursor == by_offset
+    assert len(by_cursor) == 7
+
+    resp = client.get(url, {**params, "cursor": "not-a-cursor"})
+    assert resp.status_code == 422
+
+
+@pytest.mark.django_db
+def test_search_engines_return_same_results(user):
+    base_point = Point(-46.63, -23.55, srid=4326)
+    for idx in range(12):
+        card = Card.objects.create(
+            owner=user,
+            title=f"Engine {idx}",
+            slug=f"engine-{idx}",
+            nickname=f"engine{idx}",
+            status="published",
+            mode="appointment",
+        )
+        SearchProfile.objects.create(
+            card=card,
+            category=SearchCategory.CONSULTORIA,
+            origin=Point(base_point.x + (idx * 0.02), base_point.y + (idx * 0.015), srid=4326),
+            radius_km=5 + idx * 2,
+            active=True,
+        )
+
+    for radius in (1, 5, 20, None):
+        query = SearchQuery(latitude=base_point.y, longitude=base_point.x, radius_km=radius, category=None, mode=None, limit=50)
+        scan = [p.id for p in search_profiles(query, engine="scan")]
+        prefilter = [p.id for p in search_profiles(query, engine="prefilter")]
+        coverage = [p.id for p in search_profiles(query, engine="coverage")]
+        assert scan == prefilter == coverage
+
+
+@pytest.mark.django_db
+def test_search_profile_coverage_tracks_origin_and_radius(user):
+    card = Card.objects.create(
+        owner=user,
+        title="Cobertura",
+        slug="cobertura",
+        nickname="cobertura",
+        status="published",
+        mode="appointment",
+    )
+    profile = SearchProfile.objects.create(
+        card=card,
+        category=SearchCategory.MANUTENCAO,
+        origin=Point(-46.63, -23.55, srid=4326),
+        radius_km=5,
+        active=True,
+    )
+    probe = Point(-46.63, -23.55 + 0.07, srid=4326)  # ~7.7 km north
+    assert not SearchProfile.objects.filter(pk=profile.pk, coverage__covers=probe).exists()
+
+    profile.radius_km = 10
+    profile.save()
+    assert SearchProfile.objects.filter(pk=profile.pk, coverage__covers=probe).exists()
+
+    SearchProfile.objects.filter(pk=profile.pk).update(coverage=None)
+    call_command("backfill_search_coverage", batch_size=1, stdout=StringIO())
+    assert SearchProfile.objects.filter(pk=profile.pk, coverage__covers=probe).exists()
+
+
+def test_search_bbox_covers_radius():
+    bbox = search_bbox(-23.55, -46.63, 50)
+    min_lng, min_lat, max_lng, max_lat = bbox.extent
+    # 50 km is roughly 0.45 degrees of latitude and 0.49 degrees of longitude at this latitude
+    assert min_lat < -23.55 - 0.45 and max_lat > -23.55 + 0.45
+    assert min_lng < -46.63 - 0.49 and max_lng > -46.63 + 0.49
+    polar = search_bbox(89.9, 10.0, 50)
+    assert polar.extent[0] == -180.0 and polar.extent[2] == 180.0
+
+
+def test_spheroid_distance_matches_vincenty_reference():
+    # Flinders Peak -> Buninyong, the classic Vincenty test line
+    distance = spheroid_distance_m(-37.95103342, 144.42486789, -37.65282114, 143.92649554)
+    assert distance == pytest.approx(54972.271, abs=0.01)
+    assert spheroid_distance_m(-23.55, -46.63, -23.55, -46.63) == 0.0
+
+
+@pytest.mark.django_db
+def test_tile_cache_matches_database_and_invalidates(user, settings):
+    settings.SEARCH_TILE_CACHE_ENABLED = True
+    settings.SEARCH_TILE_SIZE_DEG = 0.01
+    base_point = Point(-46.63, -23.55, srid=4326)
+    profiles = []
+    for idx in range(10):
+        card = Card.objects.create(
+            owner=user,
+            title=f"Tile {idx}",
+            slug=f"tile-{idx}",
+            nickname=f"tile{idx}",
+            status="published",
+            mode="appointment",
+        )
+        profiles.append(
+            SearchProfile.objects.create(
+                card=card,
+                category=SearchCategory.CONSULTORIA,
+                origin=Point(base_point.x + idx * 0.01, base_point.y - idx * 0.008, srid=4326),
+                radius_km=3 + idx,
+                active=True,
+            )
+        )
+    reset_tile_cache_stats()
+
+    # Two user points inside the same tile share one cache entry
+    for lat, lng in ((-23.5512, -46.6331), (-23.5538, -46.6392)):
+        for radius in (5, 20):
+            query = SearchQuery(latitude=lat, longitude=lng, radius_km=radius, category=None, mode=None, limit=50)
+            expected = [p.id for p in search_profiles(query)]
+            assert [p.id for p in search_profiles_cached(query)] == expected
+    stats = tile_cache_stats()
+    assert stats["misses"] == 2 and stats["hits"] == 2
+
+    query = SearchQuery(latitude=-23.5512, longitude=-46.6331, radius_km=20, category=None, mode=None, limit=50)
+    profiles[0].active = False
+    profiles[0].save(update_fields=["active"])
+    assert profiles[0].id not in [p.id for p in search_profiles_cached(query)]
+
+    card = profiles[1].card
+    card.status = "draft"
+    card.save()
+    assert profiles[1].id not in [p.id for p in search_profiles_cached(query)]
+
+
+@pytest.mark.django_db
+def test_tile_cache_stops_early_and_refills_unlisted(user, settings, monkeypatch):
+    from apps.search import tiles
+    from apps.search.cursors import cursor_for
+
+    settings.SEARCH_TILE_CACHE_ENABLED = True
+    settings.SEARCH_TILE_SIZE_DEG = 0.01
+    base_point = Point(-46.63, -23.55, srid=4326)
+    profiles = []
+    for idx in range(40):
+        card = Card.objects.create(
+            owner=user,
+            title=f"Denso {idx}",
+            slug=f"denso-{idx}",
+            nickname=f"denso{idx}",
+            status="published",
+            mode="appointment",
+        )
+        profiles.append(
+            SearchProfile.objects.create(
+                card=card,
+                category=SearchCategory.CONSULTORIA,
+                origin=Point(base_point.x + idx * 0.004, base_point.y - idx * 0.003, srid=4326),
+                radius_km=50,
+                active=True,
+            )
+        )
+    query = SearchQuery(latitude=-23.5512, longitude=-46.6331, radius_km=None, category=None, mode=None, limit=5)
+    search_profiles_cached(query)
+
+    calls = []
+    real_distance = tiles.spheroid_distance_m
+    monkeypatch.setattr(tiles, "spheroid_distance_m", lambda *args: calls.append(args) or real_distance(*args))
+    first = search_profiles_cached(query)
+    assert [p.id for p in first] == [p.id for p in search_profiles(query)]
+    # Page 1 of a dense tile does not measure every candidate
+    assert len(calls) < 20
+
+    # Cursors are measured by the engine that issued them: tile cursors stay on the tile
+    # path, database cursors are handed back to PostGIS
+    from_db = list(search_profiles(query))
+    query.cursor = cursor_for(first[-1])
+    assert query.cursor.source == "tiles"
+    next_page = [p.id for p in search_profiles_cached(query)]
+    query.cursor = cursor_for(from_db[-1])
+    assert query.cursor.source == "db"
+    assert next_page == [p.id for p in search_profiles(query)] == [p.id for p in search_profiles_cached(query)]
+    # A cursor from another engine restarts at the offset instead of comparing distances
+    query.cursor = cursor_for(first[-1])
+    assert [p.id for p in search_profiles(query)] == [p.id for p in from_db]
+    query.cursor = None
+
+    # Unlisted behind the tile version's back (update() skips the signals): the page is refilled
+    SearchProfile.objects.filter(pk__in=[first[0].pk, first[2].pk]).update(is_listed=False)
+    refilled = search_profiles_cached(query)
+    assert len(refilled) == 5
+    assert [p.id for p in refilled] == [p.id for p in search_profiles(query)]
+
+
+@pytest.mark.django_db
+def test_tile_cache_defers_to_other_engines(user, settings, monkeypatch):
+    from apps.search import tiles
+
+    settings.SEARCH_TILE_CACHE_ENABLED = True
+    settings.SEARCH_ENGINE = "coverage"
+    monkeypatch.setattr(tiles, "_load_candidates", lambda *args: pytest.fail("tile cache used"))
+    query = SearchQuery(latitude=-23.55, longitude=-46.63, radius_km=5, category=None, mode=None, limit=5)
+    assert search_profiles_cached(query) == []
+
+
+@pytest.mark.django_db
+def test_memory_index_matches_database(user):
+    pytest.importorskip("numpy")
+    from apps.search.cursors import cursor_for
+    from apps.search.memory_index import MemorySearchIndex
+
+    base_point = Point(-46.63, -23.55, srid=4326)
+    categories = [SearchCategory.CONSULTORIA, SearchCategory.MANUTENCAO]
+    profiles = []
+    for idx in range(16):
+        card = Card.objects.create(
+            owner=user,
+            title=f"Memória {idx}",
+            slug=f"memoria-{idx}",
+            nickname=f"memoria{idx}",
+            status="published",
+            mode="delivery" if idx % 3 else "appointment",
+        )
+        offset = 0 if idx % 4 == 0 else idx  # some identical origins to exercise tie-breaks
+        profiles.append(
+            SearchProfile.objects.create(
+                card=card,
+                category=categories[idx % 2],
+                origin=Point(base_point.x + offset * 0.012, base_point.y - offset * 0.009, srid=4326),
+                radius_km=4 + idx,
+                active=True,
+            )
+        )
+    index = MemorySearchIndex()
+    index.load()
+    assert len(index) == 16
+
+    for radius in (1, 5, 20, None):
+        for category in (None, SearchCategory.MANUTENCAO):
+            for mode in (None, "delivery"):
+                query = SearchQuery(
+                    latitude=base_point.y, longitude=base_point.x, radius_km=radius,
+                    category=category, mode=mode, limit=4, offset=2,
+                )
+                expected = list(search_profiles(query, extra=1))
+                got = index.search(query, extra=1)
+                assert [p.id for p in got] == [p.id for p in expected]
+                if expected:
+                    # Cursors are only ever replayed against the engine that issued them
+                    query.offset = 0
+                    query.cursor = cursor_for(got[0])
+                    from_memory = [p.id for p in index.search(query)]
+                    query.cursor = cursor_for(expected[0])
+                    assert from_memory == [p.id for p in search_profiles(query)]
+
+    # Unlisted before the next refresh: the page and its extra row are refilled
+    query = SearchQuery(latitude=base_point.y, longitude=base_point.x, radius_km=None, category=None, mode=None, limit=4)
+    first = index.search(query, extra=1)
+    SearchProfile.objects.filter(pk__in=[first[0].pk, first[-1].pk]).update(is_listed=False)
+    refilled = index.search(query, extra=1)
+    assert len(refilled) == 5
+    assert [p.id for p in refilled] == [p.id for p in search_profiles(query, extra=1)]
+    SearchProfile.objects.filter(pk__in=[first[0].pk, first[-1].pk]).update(is_listed=True)
+
+    profiles[0].active = False
+    profiles[0].save(update_fields=["active", "updated_at"])
+    card = profiles[1].card
+    card.status = "archived"
+    card.save()
+    assert index.refresh() == 2
+    assert len(index) == 14
+
+
+class FakeNominatimHandler(BaseHTTPRequestHandler):
+    hits: dict[str, int] = {}
+    lock = threading.Lock()
+
+    def do_GET(self):  # noqa: N802 - http.server API
+        query = parse_qs(urlparse(self.path).query).get("q", [""])[0]
+        with self.lock:
+            self.hits[query] = self.hits.get(query, 0) + 1
+        time.sleep(0.2)  # slow enough for concurrent callers to overlap
+        payload = [] if "desconhecido" in query else [{"lat": "-23.5614", "lon": "-46.6559"}]
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_args):
+        return
+
+
+@pytest.fixture
+def fake_nominatim(settings):
+    FakeNominatimHandler.hits = {}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeNominatimHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    settings.NOMINATIM_URL = f"http://127.0.0.1:{server.server_address[1]}/search"
+    settings.NOMINATIM_RATE_PER_SECOND = 100
+    yield FakeNominatimHandler
+    server.shutdown()
+    server.server_close()
+
+
+def test_geocode_address_single_flight(fake_nominatim):
+    address = f"Av. Paulista {uuid.uuid4().hex[:8]}"
+    results, errors = [], []
+
+    def worker():
+        try:
+            results.append(geocode_address_sp(address))
+        except Exception as exc:  # pragma: no cover - surfaced by the assertion below
+            errors.append(exc)
+
+    threads = [threading.Thread(target=worker) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert results == [{"lat": -23.5614, "lng": -46.6559}] * 6
+    assert sum(fake_nominatim.hits.values()) == 1
+
+
+def test_geocode_address_caches_not_found(fake_nominatim):
+    address = f"Rua desconhecido {uuid.uuid4().hex[:8]}"
+    for _ in range(3):
+        with pytest.raises(GeocodingError) as excinfo:
+            geocode_address_sp(address)
+        assert excinfo.value.status_code == 404
+    assert sum(fake_nominatim.hits.values()) == 1
+
+
+def test_geocode_token_bucket_spaces_requests(fake_nominatim, settings):
+    settings.NOMINATIM_RATE_PER_SECOND = 4
+    settings.NOMINATIM_RATE_BURST = 1
+    cache.delete("geocode:bucket:nominatim")
+    started = time.monotonic()
+    for idx in range(3):
+        geocode_address_sp(f"Rua Augusta {idx} {uuid.uuid4().hex[:8]}")
+    # 4/s with no burst: requests start >= 250 ms apart, the last one takes 200 ms
+    assert time.monotonic() - started >= 0.5 + 0.2 - 0.05
+    assert sum(fake_nominatim.hits.values()) == 3
+
+
+def test_geocode_survives_redis_outage(fake_nominatim, monkeypatch):
+    from redis.exceptions import ConnectionError as RedisConnectionError
+
+    from apps.search import geocoding
+
+    def down(*args, **kwargs):
+        raise RedisConnectionError("Connection refused")
+
+    class DownLock:
+        acquire = release = staticmethod(down)
+
+    monkeypatch.setattr("django_redis.get_redis_connection", down)
+    monkeypatch.setattr(geocoding, "_token_script", None)
+    monkeypatch.setattr(geocoding.cache, "lock", lambda *args, **kwargs: DownLock(), raising=False)
+    # Token bucket and single-flight lock fall back to the local path
+    assert geocode_address_sp(f"Rua Haddock Lobo {uuid.uuid4().hex[:8]}") == {"lat": -23.5614, "lng": -46.6559}
+    assert sum(fake_nominatim.hits.values()) == 1
+
+
+@pytest.mark.django_db
+def test_search_document_follows_card(user):
+    card = Card.objects.create(
+        owner=user,
+        title="Doc Studio",
+        slug="doc-studio",
+        nickname="docstudio",
+        status="published",
+        mode="appointment",
+    )
+    profile = SearchProfile.objects.create(
+        card=card,
+        category=SearchCategory.ESTETICA,
+        origin=Point(-46.63, -23.55, srid=4326),
+        radius_km=10,
+        active=True,
+    )
+    assert (profile.title, profile.nickname, profile.mode, profile.is_listed) == (
+        "Doc Studio", "docstudio", "appointment", True,
+    )
+
+    card.title = "Doc Studio Novo"
+    card.mode = "delivery"
+    card.save(update_fields=["title", "mode"])
+    profile.refresh_from_db()
+    assert (profile.title, profile.mode) == ("Doc Studio Novo", "delivery")
+
+    card.deactivation_marked = True
+    card.save(update_fields=["deactivation_marked"])
+    profile.refresh_from_db()
+    assert profile.is_listed is False
+
+    card.deactivation_marked = False
+    card.save(update_fields=["deactivation_marked"])
+    profile.active = False
+    profile.save(update_fields=["active", "updated_at"])
+    profile.refresh_from_db()
+    assert profile.is_listed is False
+
+
+@pytest.mark.django_db
+def test_check_search_documents_repairs_drift(user):
+    card = Card.objects.create(
+        owner=user,
+        title="Deriva",
+        slug="deriva",
+        nickname="deriva",
+        status="published",
+        mode="appointment",
+    )
+    profile = SearchProfile.objects.create(
+        card=card,
+        category=SearchCategory.TRANSPORTE,
+        origin=Point(-46.63, -23.55, srid=4326),
+        radius_km=10,
+        active=True,
+    )
+    # Simulate drift from a write that bypassed signals
+    SearchProfile.objects.filter(pk=profile.pk).update(title="Antigo", is_listed=False)
+
+    out = StringIO()
+    call_command("check_search_documents", stdout=out)
+    report = json.loads(out.getvalue().split("\n}\n")[0] + "\n}")
+    assert report["drifted"] == 1
+    assert report["by_field"] == {"title": 1, "is_listed": 1}
+    profile.refresh_from_db()
+    assert profile.title == "Antigo"
+
+    call_command("check_search_documents", repair=True, stdout=StringIO())
+    profile.refresh_from_db()
+    assert profile.title == "Deriva" and profile.is_listed is True
@@ -0,0 +1,355 @@
+import datetime as dt
+from zoneinfo import ZoneInfo
+
+import pytest
+from django.core.exceptions import ValidationError
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.cards.models import Card
+from apps.scheduling.models import Appointment, SchedulingService, ServiceAvailability, ServiceOption
+from apps.scheduling.next_slots import compute_next_starts, refresh_next_starts, upcoming_starts
+from apps.scheduling.slots import generate_slots, generate_slots_range, prepare_booking
+
+
+@pytest.fixture
+def service(user):
+    card = Card.objects.create(
+        owner=user,
+        title="Studio",
+        description="",
+        nickname="studio",
+        status="published",
+        mode="appointment",
+    )
+    svc = SchedulingService.objects.create(
+        card=card,
+        name="Sessão",
+        description="",
+        timezone="America/Sao_Paulo",
+        duration_minutes=60,
+        buffer_before=15,
+        buffer_after=15,
+        type="remote",
+        is_active=True,
+    )
+    for weekday in range(5):
+        ServiceAvailability.objects.create(
+            service=svc,
+            rule_type="weekly",
+            weekday=weekday,
+            start_time=dt.time(9, 0),
+            end_time=dt.time(18, 0),
+        )
+    return svc
+
+
+def _local_today(service):
+    return timezone.now().astimezone(ZoneInfo(service.timezone)).date()
+
+
+@pytest.mark.django_db
+def test_generate_slots_range_matches_single_day(service, django_assert_num_queries):
+    start = _local_today(service) + dt.timedelta(days=1)
+    end = start + dt.timedelta(days=30)
+    tz = ZoneInfo(service.timezone)
+    ServiceAvailability.objects.create(service=service, rule_type="holiday", date=start + dt.timedelta(days=2))
+    saturday = start + dt.timedelta(days=7 + (5 - start.weekday()) % 7)
+    ServiceAvailability.objects.create(
+        service=service,
+        rule_type="date_override",
+        date=saturday,
+        start_time=dt.time(10, 0),
+        end_time=dt.time(13, 0),
+    )
+    busy_day = start + dt.timedelta(days=3)
+    while busy_day.weekday() >= 5:
+        busy_day += dt.timedelta(days=1)
+    booked = dt.datetime.combine(busy_day, dt.time(11, 0), tzinfo=tz)
+    Appointment.objects.create(
+        service=service,
+        user_name="Cliente",
+        user_email="cli@example.com",
+        start_at_utc=booked,
+        end_at_utc=booked + dt.timedelta(hours=1),
+        timezone=service.timezone,
+        status="confirmed",
+    )
+
+    with django_assert_num_queries(2):
+        days = generate_slots_range(service, start, end)
+
+    assert list(days) == [start + dt.timedelta(days=i) for i in range(31)]
+    for day, slots in days.items():
+        assert slots == generate_slots(service, day)
+    assert days[start + dt.timedelta(days=2)] == []
+    # 10:00-13:00 override with 15 min buffers on each side leaves only 11:00
+    assert len(days[saturday]) == 1
+    busy_starts = {slot["start_at_utc"] for slot in days[busy_day]}
+    assert busy_starts
+    assert booked.astimezone(dt.timezone.utc).isoformat() not in busy_starts
+
+
+@pytest.mark.django_db
+def test_public_slots_month(client, service):
+    start = _local_today(service) + dt.timedelta(days=1)
+    end = start + dt.timedelta(days=29)
+    with override_settings(ROOT_URLCONF="config.urls_viewer"):
+        url = reverse("public_slots", args=[service.card.nickname])
+        resp = client.get(url, {"service": service.id, "start": start.isoformat(), "end": end.isoformat()})
+        too_long = client.get(
+            url,
+            {"service": service.id, "start": start.isoformat(), "end": (start + dt.timedelta(days=90)).isoformat()},
+        )
+    assert resp.status_code == 200
+    data = resp.json()
+    assert len(data["days"]) == 30
+    assert data["days"][start.isoformat()] == generate_slots(service, start)
+    assert too_long.status_code == 400
+
+
+@pytest.mark.django_db
+def test_prepare_booking_checks_extended_duration(service, django_assert_max_num_queries):
+    day = _local_today(service) + dt.timedelta(days=1)
+    while day.weekday() >= 5:
+        day += dt.timedelta(days=1)
+    tz = ZoneInfo(service.timezone)
+    booked = dt.datetime.combine(day, dt.time(14, 0), tzinfo=tz)
+    Appointment.objects.create(
+        service=service,
+        user_name="Cliente",
+        user_email="cli@example.com",
+        start_at_utc=booked,
+        end_at_utc=booked + dt.timedelta(hours=1),
+        timezone=service.timezone,
+        status="pending",
+    )
+    option = ServiceOption.objects.create(service=service, name="Extra", extra_duration_minutes=60)
+    start = dt.datetime.combine(day, dt.time(12, 0), tzinfo=tz).astimezone(dt.timezone.utc)
+
+    # Options + rules + appointments, each loaded once
+    with django_assert_max_num_queries(3):
+        booking = prepare_booking(service, start)
+    assert booking["end_at"] == start + dt.timedelta(hours=1)
+    with pytest.raises(ValidationError, match="outro agendamento"):
+        prepare_booking(service, start, [str(option.id)])
+    with pytest.raises(ValidationError, match="indisponível"):
+        prepare_booking(service, start + dt.timedelta(minutes=10))
+
+
+def _random_time(rng):
+    return dt.time(rng.randint(0, 23), rng.choice([0, 5, 10, 15, 20, 30, 45, 50]))
+
+
+# Brazil's last DST: started 2018-11-04 00:00 (gap), ended 2019-02-17 00:00 (23h repeated on the 16th)
+DST_DATES = [dt.date(2018, 11, 3), dt.date(2018, 11, 4), dt.date(2018, 11, 5), dt.date(2019, 2, 16), dt.date(2019, 2, 17)]
+
+
+def test_bitmap_slots_match_rule_engine():
+    np = pytest.importorskip("numpy")  # noqa: F841
+    import random
+
+    from apps.scheduling import slots as engine
+    from apps.scheduling.bitmaps import compile_weekly_bitmap
+
+    for seed in range(400):
+        rng = random.Random(seed)
+        service = SchedulingService(
+            timezone="America/Sao_Paulo",
+            duration_minutes=rng.choice([5, 15, 30, 45, 60, 90]),
+            buffer_before=rng.choice([0, 0, 5, 15]),
+            buffer_after=rng.choice([0, 10, 15]),
+        )
+        date = rng.choice(DST_DATES + [dt.date(2019, 6, 10) + dt.timedelta(days=rng.randint(0, 60))])
+        rows = []
+        for _ in range(rng.randint(0, 6)):
+            rows.append(
+                ServiceAvailability(
+                    rule_type="weekly",
+                    weekday=rng.choice([date.weekday(), rng.randint(0, 6)]),
+                    start_time=_random_time(rng),
+                    end_time=_random_time(rng),
+                )
+            )
+        rules = engine._AvailabilityRules()
+        for row in rows:
+            rules.weekly[row.weekday].append((row.start_time, row.end_time))
+        if rng.random() < 0.3:
+            rules.overrides[date].append((_random_time(rng), _random_time(rng)))
+        if rng.random() < 0.05:
+            rules.holidays.add(date)
+        tz = ZoneInfo(service.timezone)
+        day_start = dt.datetime.combine(date, dt.time.min, tzinfo=tz)
+        appointments = []
+        for _ in range(rng.randint(0, 40)):
+            start = day_start + dt.timedelta(minutes=rng.randint(-120, 26 * 60), seconds=rng.choice([0, 0, 0, 30]))
+            appointments.append((start, start + dt.timedelta(minutes=rng.choice([5, 15, 30, 60]))))
+        appointments.sort()
+        min_start = day_start + dt.timedelta(minutes=rng.randint(-600, 20 * 60), seconds=rng.randint(0, 59))
+
+        by_rows = engine._Schedule(service=service, rules=rules, appointments=appointments)
+        compiled = engine._Schedule(
+            service=service,
+            rules=engine._AvailabilityRules(overrides=rules.overrides, holidays=rules.holidays),
+            appointments=appointments,
+            bitmap=compile_weekly_bitmap(rows),
+            _weekly=rules.weekly,
+        )
+        expected = engine._day_slots(service, by_rows, date, min_start)
+        assert engine._day_slots(service, compiled, date, min_start) == expected, seed
+
+
+@pytest.mark.django_db
+def test_bitmap_rebuilt_by_signal_and_equivalent(service, settings, monkeypatch):
+    pytest.importorskip("numpy")
+    frozen = dt.datetime(2018, 10, 20, 12, 0, tzinfo=dt.timezone.utc)
+    monkeypatch.setattr(timezone, "now", lambda: frozen)
+    # Overlapping Sunday rules inside the 2018-11-04 DST gap
+    rule = ServiceAvailability.objects.create(
+        service=service, rule_type="weekly", weekday=6, start_time=dt.time(0, 0), end_time=dt.time(2, 30)
+    )
+    ServiceAvailability.objects.create(
+        service=service, rule_type="weekly", weekday=6, start_time=dt.time(0, 30), end_time=dt.time(1, 15)
+    )
+    service.refresh_from_db()
+    assert service.availability_bitmap is not None
+
+    start, end = dt.date(2018, 10, 25), dt.date(2019, 3, 1)
+    settings.SCHEDULING_BITMAP_SLOTS = True
+    compiled = generate_slots_range(service, start, end)
+    settings.SCHEDULING_BITMAP_SLOTS = False
+    assert compiled == generate_slots_range(service, start, end)
+
+    rule.delete()
+    weekly_before = bytes(service.availability_bitmap)
+    service.refresh_from_db()
+    assert bytes(service.availability_bitmap) != weekly_before
+
+
+def _next_weekday(service, days=1):
+    day = _local_today(service) + dt.timedelta(days=days)
+    while day.weekday() >= 5:
+        day += dt.timedelta(days=1)
+    return day
+
+
+def _uncached(service, day, settings):
+    settings.SCHEDULING_SLOT_CACHE_ENABLED = False
+    try:
+        return generate_slots(service, day)
+    finally:
+        settings.SCHEDULING_SLOT_CACHE_ENABLED = True
+
+
+@pytest.mark.django_db
+def test_slot_cache_invalidated_by_changes(service, settings, django_assert_num_queries):
+    settings.SCHEDULING_SLOT_CACHE_ENABLED = True
+    day = _next_weekday(service)
+    other_day = _next_weekday(service, days=(day - _local_today(service)).days + 1)
+    tz = ZoneInfo(service.timezone)
+    free = generate_slots(service, day)
+    generate_slots(service, other_day)
+    with django_assert_num_queries(0):
+        assert generate_slots(service, day) == free
+
+    booked = dt.datetime.combine(day, dt.time(11, 0), tzinfo=tz)
+    ap = Appointment.objects.create(
+        service=service,
+        user_name="Cliente",
+        user_email="cli@example.com",
+        start_at_utc=booked,
+        end_at_utc=booked + dt.timedelta(hours=1),
+        timezone=service.timezone,
+        status="confirmed",
+    )
+    busy = generate_slots(service, day)
+    assert busy != free and busy == _uncached(service, day, settings)
+
+    # Rescheduling frees the old date and blocks the new one
+    ap.start_at_utc = dt.datetime.combine(other_day, dt.time(11, 0), tzinfo=tz)
+    ap.end_at_utc = ap.start_at_utc + dt.timedelta(hours=1)
+    ap.save()
+    assert generate_slots(service, day) == free
+    assert generate_slots(service, other_day) == _uncached(service, other_day, settings)
+    ap.delete()
+    assert generate_slots(service, other_day) == _uncached(service, other_day, settings)
+
+    holiday = ServiceAvailability.objects.create(service=service, rule_type="holiday", date=day)
+    assert generate_slots(service, day) == []
+    holiday.delete()
+    assert generate_slots(service, day) == free
+
+    service.duration_minutes = 30
+    service.save()
+    assert generate_slots(service, day) == _uncached(service, day, settings) != free
+
+
+@pytest.mark.django_db
+def test_slot_cache_applies_lead_time_after_read(service, settings, monkeypatch, django_assert_num_queries):
+    settings.SCHEDULING_SLOT_CACHE_ENABLED = True
+    day = _next_weekday(service, days=3)
+    tz = ZoneInfo(service.timezone)
+    service.lead_time_min = 60
+    service.save()
+    clock = {"now": dt.datetime.combine(day, dt.time(8, 0), tzinfo=tz)}
+    monkeypatch.setattr(timezone, "now", lambda: clock["now"])
+
+    morning = generate_slots(service, day)
+    clock["now"] = dt.datetime.combine(day, dt.time(12, 30), tzinfo=tz)
+    with django_assert_num_queries(0):
+        afternoon = generate_slots(service, day)
+    assert afternoon == _uncached(service, day, settings)
+    assert afternoon == [
+        slot for slot in morning
+        if dt.datetime.fromisoformat(slot["start_at_utc"]) >= clock["now"] + dt.timedelta(hours=1)
+    ]
+    assert len(afternoon) < len(morning)
+
+
+@pytest.mark.django_db
+def test_next_starts_refresh_and_incremental_drop(service):
+    starts = refresh_next_starts(service)
+    service.refresh_from_db()
+    assert service.next_starts == starts and len(starts) == 5
+    today = _local_today(service)
+    expected = [
+        slot["start_at_utc"]
+        for slots in generate_slots_range(service, today, today + dt.timedelta(days=7)).values()
+        for slot in slots
+    ][:5]
+    assert starts == expected
+
+    first = dt.datetime.fromisoformat(starts[0])
+    ap = Appointment.objects.create(
+        service=service,
+        user_name="Cliente",
+        user_email="cli@example.com",
+        start_at_utc=first,
+        end_at_utc=first + dt.timedelta(hours=1),
+        timezone=service.timezone,
+        status="pending",
+    )
+    service.refresh_from_db()
+    # Dropped in place exactly the stored starts a recompute no longer offers
+    still_free = set(compute_next_starts(service, count=20))
+    assert starts[0] not in service.next_starts
+    assert service.next_starts == [s for s in starts if s in still_free]
+
+    ap.status = "cancelled"
+    ap.save(update_fields=["status", "updated_at"])
+    assert refresh_next_starts(service) == starts
+    service.refresh_from_db()
+    assert [s.isoformat() for s in upcoming_starts(service)] == starts
+
+
+@pytest.mark.django_db
+def test_public_next_slots(client, service, django_assert_num_queries):
+    starts = refresh_next_starts(service)
+    with override_settings(ROOT_URLCONF="config.urls_viewer"):
+        url = reverse("public_next_slots", args=[service.card.nickname])
+        with django_assert_num_queries(2):
+            data = client.get(url).json()
+        fragment = client.get(url, HTTP_HX_REQUEST="true").content.decode()
+    assert data["services"][str(service.id)] == {"next": starts[0], "starts": starts}
+    assert f'id="svc-next-{service.id}"' in fragment and "Próximo horário" in fragment